@@ -0,0 +1,89 @@
+# benchmarks/bench_spatial_sort.py
+"""
+Mide cuánto se solapan los row groups de un GeoParquet según el orden de
+las filas: orden de id (aleatorio en el espacio), Hilbert y orden Z.
+
+Para cada archivo se leen las estadísticas min/max de la columna `bbox`
+por row group y se reporta:
+- solapamiento: suma de las áreas de los bbox de row group / área total
+  (1.0 significa row groups sin solapamiento)
+- row groups leídos: fracción media de row groups que un lector no puede
+  descartar para ventanas de consulta aleatorias (1% del área)
+
+Uso:
+    python benchmarks/bench_spatial_sort.py --rows 200000
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Añadir el directorio src al path de Python
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir / 'src'))
+
+import numpy as np
+import geopandas as gpd
+import pyarrow.parquet as pq
+import shapely
+from spatial_migration.core.transformer import SpatialTransformer
+
+def synthetic_polygons(rows: int, seed: int = 42) -> gpd.GeoDataFrame:
+    """Polígonos sobre Medellín cuyo id no guarda relación con la ubicación"""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(-75.7, -75.4, rows)
+    y = rng.uniform(6.1, 6.4, rows)
+    polygons = shapely.buffer(shapely.points(x, y), rng.uniform(0.0002, 0.002, rows), quad_segs=4)
+    return gpd.GeoDataFrame({'id': np.arange(rows), 'geometry': polygons}, crs='EPSG:4326')
+
+def row_group_boxes(parquet_data) -> np.ndarray:
+    """Lee los bbox (xmin, ymin, xmax, ymax) de cada row group"""
+    metadata = pq.ParquetFile(parquet_data).metadata
+    paths = [metadata.schema.column(i).path for i in range(metadata.num_columns)]
+    index = [paths.index(f'bbox.{field}') for field in ('xmin', 'ymin', 'xmax', 'ymax')]
+    boxes = []
+    for rg in range(metadata.num_row_groups):
+        stats = [metadata.row_group(rg).column(i).statistics for i in index]
+        boxes.append((stats[0].min, stats[1].min, stats[2].max, stats[3].max))
+    return np.array(boxes)
+
+def pruning_stats(boxes: np.ndarray, extent, windows: int = 1000, seed: int = 7):
+    xmin, ymin, xmax, ymax = extent
+    area = (xmax - xmin) * (ymax - ymin)
+    overlap = ((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])).sum() / area
+
+    rng = np.random.default_rng(seed)
+    side_x, side_y = (xmax - xmin) * 0.1, (ymax - ymin) * 0.1
+    qx = rng.uniform(xmin, xmax - side_x, windows)[:, None]
+    qy = rng.uniform(ymin, ymax - side_y, windows)[:, None]
+    hits = (
+        (boxes[:, 0] <= qx + side_x) & (boxes[:, 2] >= qx) &
+        (boxes[:, 1] <= qy + side_y) & (boxes[:, 3] >= qy)
+    )
+    return overlap, hits.mean()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ordenamiento espacial de row groups')
+    parser.add_argument('--rows', type=int, default=200000, help='Número de polígonos')
+    parser.add_argument('--row-group-size', type=int, default=10000, help='Filas por row group')
+    args = parser.parse_args()
+
+    gdf = synthetic_polygons(args.rows)
+    extent = gdf.total_bounds
+    transformer = SpatialTransformer()
+    print(f"{args.rows} polígonos, row groups de {args.row_group_size} filas\n")
+    print(f"{'orden':<10} {'escritura':>10} {'solapamiento':>13} {'row groups leídos':>18}")
+
+    for curve in (None, 'hilbert', 'zorder'):
+        start = time.perf_counter()
+        data = transformer.transform_to_geoparquet(
+            gdf,
+            spatial_sort=curve,
+            row_group_size=args.row_group_size
+        )
+        elapsed = time.perf_counter() - start
+        overlap, touched = pruning_stats(row_group_boxes(data), extent)
+        print(f"{curve or 'id':<10} {elapsed:>9.2f}s {overlap:>12.1f}x {touched:>17.1%}")
+
+if __name__ == "__main__":
+    main()
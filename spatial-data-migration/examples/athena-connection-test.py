@@ -4,7 +4,8 @@ Script para probar la conexión a Amazon Athena y realizar una consulta simple.
 import boto3
 import os
 from dotenv import load_dotenv
-import time
+from spatial_migration.exceptions import AthenaQueryError
+from athena_queries import run_athena_query
 
 def test_athena_connection():
     # Cargar variables de entorno
@@ -22,48 +23,20 @@ def test_athena_connection():
         # Consulta simple para probar la conexión
         query = "SHOW TABLES IN " + os.getenv('ATHENA_DATABASE')
         
-        # Configurar la consulta
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={
-                'Database': os.getenv('ATHENA_DATABASE')
-            },
-            ResultConfiguration={
-                'OutputLocation': f"s3://{os.getenv('ATHENA_OUTPUT_BUCKET')}/{os.getenv('ATHENA_OUTPUT_PREFIX')}"
-            }
-        )
-        
-        # Obtener el ID de la consulta
-        query_execution_id = response['QueryExecutionId']
-        print(f"Ejecutando consulta (ID: {query_execution_id})...")
-        
-        # Esperar por los resultados
-        while True:
-            query_status = athena_client.get_query_execution(QueryExecutionId=query_execution_id)
-            state = query_status['QueryExecution']['Status']['State']
-            
-            if state in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                print(f"Estado final de la consulta: {state}")
-                break
-                
-            print("Esperando resultados...")
-            time.sleep(1)
+        # La consulta se sondea con backoff y se detiene si supera el tiempo máximo
+        print("Ejecutando consulta...")
+        try:
+            rows = run_athena_query(athena_client, os.getenv('ATHENA_DATABASE'), query)
+        except (AthenaQueryError, TimeoutError) as e:
+            print(f"\nError en la consulta: {str(e)}")
+            return False
         
-        # Si la consulta fue exitosa, mostrar resultados
-        if state == 'SUCCEEDED':
-            results = athena_client.get_query_results(QueryExecutionId=query_execution_id)
-            
-            print("\nTablas encontradas:")
-            for row in results['ResultSet']['Rows'][1:]:  # Saltar el encabezado
-                print(f"- {row['Data'][0]['VarCharValue']}")
-                
-            print("\n¡Conexión exitosa a Athena!")
-            return True
+        print("\nTablas encontradas:")
+        for row in rows[1:]:  # Saltar el encabezado
+            print(f"- {row['Data'][0]['VarCharValue']}")
             
-        else:
-            error_details = query_status['QueryExecution']['Status'].get('StateChangeReason', 'No details available')
-            print(f"\nError en la consulta: {error_details}")
-            return False
+        print("\n¡Conexión exitosa a Athena!")
+        return True
             
     except Exception as e:
         print(f"\nError conectando a Athena: {str(e)}")
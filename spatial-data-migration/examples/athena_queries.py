@@ -0,0 +1,30 @@
+# examples/athena_queries.py
+import os
+from spatial_migration.utils.aws import AthenaQueryManager, RateLimiter
+
+# Límite de llamadas a la API de Athena compartido por todas las consultas del script
+ATHENA_LIMITER = RateLimiter(rate=5, burst=5)
+
+def athena_output_location():
+    """Ubicación en S3 de los resultados de Athena"""
+    return f"s3://{os.getenv('ATHENA_OUTPUT_BUCKET')}/{os.getenv('ATHENA_OUTPUT_PREFIX')}"
+
+def run_athena_query(athena_client, database_name, query, timeout=300):
+    """
+    Ejecuta una consulta en Athena y devuelve sus filas
+
+    El estado se sondea con backoff exponencial, las llamadas pasan por
+    ATHENA_LIMITER y la consulta se detiene si supera `timeout` segundos
+    de reloj. Una consulta FAILED o CANCELLED lanza AthenaQueryError.
+
+    Returns:
+        Filas en el formato de get_query_results (la primera es el encabezado)
+    """
+    with AthenaQueryManager(
+        athena_client,
+        database_name,
+        athena_output_location(),
+        rate_limiter=ATHENA_LIMITER,
+        timeout=timeout
+    ) as manager:
+        return manager.execute(query)
@@ -12,40 +12,22 @@ from dotenv import load_dotenv
 import geopandas as gpd
 import pandas as pd
 import boto3
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import pyarrow as pa
 import pyarrow.parquet as pq
-from test_postgres_connection import get_rds_password
+from test_postgres_connection import get_engine
+from athena_queries import run_athena_query
 import time
 
 def check_table_exists(athena_client, database_name, table_name):
     """Verifica si la tabla ya existe en Athena"""
     try:
-        query = f"""
-        SHOW TABLES IN {database_name} LIKE '{table_name}'
-        """
-        
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={'Database': database_name},
-            ResultConfiguration={
-                'OutputLocation': f"s3://{os.getenv('ATHENA_OUTPUT_BUCKET')}/{os.getenv('ATHENA_OUTPUT_PREFIX')}"
-            }
+        rows = run_athena_query(
+            athena_client,
+            database_name,
+            f"SHOW TABLES IN {database_name} LIKE '{table_name}'"
         )
-        
-        # Esperar resultado
-        query_execution_id = response['QueryExecutionId']
-        while True:
-            response = athena_client.get_query_execution(QueryExecutionId=query_execution_id)
-            state = response['QueryExecution']['Status']['State']
-            if state in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                break
-                
-        if state == 'SUCCEEDED':
-            results = athena_client.get_query_results(QueryExecutionId=query_execution_id)
-            return len(results['ResultSet']['Rows']) > 1
-            
-        return False
+        return len(rows) > 1  # Primera fila son headers
     except Exception as e:
         print(f"Error verificando existencia de tabla: {str(e)}")
         return False
@@ -56,41 +38,22 @@ def validate_migration(athena_client, database_name, table_name, expected_count)
         query = f"""
         SELECT COUNT(*) as total_records,
                COUNT(DISTINCT id) as unique_ids,
-               COUNT(CASE WHEN wkt_geometry = 'MULTIPOLYGON Z EMPTY' THEN 1 END) as empty_geoms
+               COUNT(CASE WHEN wkt_geometry IS NULL THEN 1 END) as empty_geoms
         FROM {database_name}.{table_name}
         """
         
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={'Database': database_name},
-            ResultConfiguration={
-                'OutputLocation': f"s3://{os.getenv('ATHENA_OUTPUT_BUCKET')}/{os.getenv('ATHENA_OUTPUT_PREFIX')}"
-            }
-        )
-        
-        # Esperar resultado
-        query_execution_id = response['QueryExecutionId']
-        while True:
-            response = athena_client.get_query_execution(QueryExecutionId=query_execution_id)
-            state = response['QueryExecution']['Status']['State']
-            if state in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                break
-                
-        if state == 'SUCCEEDED':
-            results = athena_client.get_query_results(QueryExecutionId=query_execution_id)
-            total_records = int(results['ResultSet']['Rows'][1]['Data'][0]['VarCharValue'])
-            unique_ids = int(results['ResultSet']['Rows'][1]['Data'][1]['VarCharValue'])
-            empty_geoms = int(results['ResultSet']['Rows'][1]['Data'][2]['VarCharValue'])
-            
-            return {
-                'success': total_records == expected_count,
-                'total_records': total_records,
-                'unique_ids': unique_ids,
-                'empty_geoms': empty_geoms,
-                'expected_count': expected_count
-            }
-            
-        return None
+        rows = run_athena_query(athena_client, database_name, query)
+        total_records = int(rows[1]['Data'][0]['VarCharValue'])
+        unique_ids = int(rows[1]['Data'][1]['VarCharValue'])
+        empty_geoms = int(rows[1]['Data'][2]['VarCharValue'])
+        
+        return {
+            'success': total_records == expected_count,
+            'total_records': total_records,
+            'unique_ids': unique_ids,
+            'empty_geoms': empty_geoms,
+            'expected_count': expected_count
+        }
     except Exception as e:
         print(f"Error en la validación: {str(e)}")
         return None
@@ -109,14 +72,8 @@ def create_athena_table(athena_client, database_name, table_name, s3_location):
     TBLPROPERTIES ('parquet.compression'='SNAPPY');
     """
     
-    response = athena_client.start_query_execution(
-        QueryString=create_table_query,
-        QueryExecutionContext={'Database': database_name},
-        ResultConfiguration={
-            'OutputLocation': f"s3://{os.getenv('ATHENA_OUTPUT_BUCKET')}/{os.getenv('ATHENA_OUTPUT_PREFIX')}"
-        }
-    )
-    return response
+    # Se espera a que la tabla exista antes de validarla
+    return run_athena_query(athena_client, database_name, create_table_query)
 
 def migrate_comisarias(table_name='comisarias_e_inspecciones'):
     """Migración de datos de comisarías e inspecciones"""
@@ -136,22 +93,13 @@ def migrate_comisarias(table_name='comisarias_e_inspecciones'):
         
         # 1. Extraer datos de PostgreSQL y verificar conteos
         print("\nExtrayendo datos de PostgreSQL...")
-        password = get_rds_password()
-        connection_string = (
-            f"postgresql://{os.getenv('PROD_POSTGRES_USER')}:{password}@"
-            f"{os.getenv('PROD_POSTGRES_HOST')}:{os.getenv('PROD_POSTGRES_PORT')}/"
-            f"{os.getenv('PROD_POSTGRES_DB')}"
-        )
-        
-        engine = create_engine(connection_string)
+        engine = get_engine()
         
         # Verificar conteo original
         with engine.connect() as conn:
-            result = conn.execute(text('SELECT COUNT(*) FROM shapes."COMISARIAS_E_INSPECCIONES"'))
-            original_count = result.scalar()
-            
-            result = conn.execute(text('SELECT COUNT(DISTINCT id) FROM shapes."COMISARIAS_E_INSPECCIONES"'))
-            unique_count = result.scalar()
+            # Un solo recorrido de la tabla para ambos conteos
+            result = conn.execute(text('SELECT COUNT(*), COUNT(DISTINCT id) FROM shapes."COMISARIAS_E_INSPECCIONES"'))
+            original_count, unique_count = result.one()
             
         print(f"Registros totales en PostgreSQL: {original_count}")
         print(f"IDs únicos en PostgreSQL: {unique_count}")
@@ -194,7 +142,7 @@ def migrate_comisarias(table_name='comisarias_e_inspecciones'):
         print("\nPreparando datos para migración...")
         df_final = pd.DataFrame({
             'id': gdf.id,
-            'wkt_geometry': gdf.geom.apply(lambda x: x.wkt if x is not None else 'MULTIPOLYGON Z EMPTY'),
+            'wkt_geometry': gdf.geom.to_wkt(rounding_precision=-1),
             'name': gdf.name,
             'shape_area': gdf.shape_area
         })
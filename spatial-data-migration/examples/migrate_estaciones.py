@@ -12,10 +12,9 @@ from dotenv import load_dotenv
 import geopandas as gpd
 import pandas as pd
 import boto3
-from sqlalchemy import create_engine
 import pyarrow as pa
 import pyarrow.parquet as pq
-from test_postgres_connection import get_rds_password
+from test_postgres_connection import get_engine
 
 def migrate_barrios_veredas(table_name='barrios_veredas'):
     """
@@ -30,14 +29,7 @@ def migrate_barrios_veredas(table_name='barrios_veredas'):
         
         # 1. Extraer datos de PostgreSQL
         print("Extrayendo datos de PostgreSQL...")
-        password = get_rds_password()
-        connection_string = (
-            f"postgresql://{os.getenv('PROD_POSTGRES_USER')}:{password}@"
-            f"{os.getenv('PROD_POSTGRES_HOST')}:{os.getenv('PROD_POSTGRES_PORT')}/"
-            f"{os.getenv('PROD_POSTGRES_DB')}"
-        )
-        
-        engine = create_engine(connection_string)
+        engine = get_engine()
         gdf = gpd.read_postgis(
             "SELECT * FROM shapes.barrios_veredas",
             engine,
@@ -66,7 +58,7 @@ def migrate_barrios_veredas(table_name='barrios_veredas'):
         print("Transformando geometrías...")
         # Crear una copia del DataFrame y añadir la columna WKT
         df_final = gdf.copy()
-        df_final['wkt_geometry'] = gdf['geom'].apply(lambda x: x.wkt)
+        df_final['wkt_geometry'] = gdf['geom'].to_wkt(rounding_precision=-1)
         # Eliminar solo la columna 'geom'
         df_final = df_final.drop(columns=['geom'])
         
@@ -12,10 +12,9 @@ from dotenv import load_dotenv
 import geopandas as gpd
 import pandas as pd
 import boto3
-from sqlalchemy import create_engine
 import pyarrow as pa
 import pyarrow.parquet as pq
-from test_postgres_connection import get_rds_password
+from test_postgres_connection import get_engine
 
 def create_athena_table(athena_client, database_name, table_name, s3_location):
     """Crea la tabla en Athena"""
@@ -58,14 +57,7 @@ def migrate_spatial_data():
         
         # 1. Extraer datos de PostgreSQL
         print("Extrayendo datos de PostgreSQL...")
-        password = get_rds_password()
-        connection_string = (
-            f"postgresql://{os.getenv('PROD_POSTGRES_USER')}:{password}@"
-            f"{os.getenv('PROD_POSTGRES_HOST')}:{os.getenv('PROD_POSTGRES_PORT')}/"
-            f"{os.getenv('PROD_POSTGRES_DB')}"
-        )
-        
-        engine = create_engine(connection_string)
+        engine = get_engine()
         gdf = gpd.read_postgis(
             "SELECT * FROM shapes.cuadrantes",
             engine,
@@ -76,7 +68,7 @@ def migrate_spatial_data():
         
         # 2. Transformar geometrías a WKT
         print("Transformando geometrías...")
-        gdf['wkt_geometry'] = gdf['geom'].apply(lambda x: x.wkt)
+        gdf['wkt_geometry'] = gdf['geom'].to_wkt(rounding_precision=-1)
         gdf = gdf.drop(columns=['geom'])
         
         # 3. Preparar datos para Parquet
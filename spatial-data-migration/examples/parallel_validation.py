@@ -0,0 +1,48 @@
+# examples/parallel_validation.py
+import os
+import boto3
+from spatial_migration.config import load_config
+from spatial_migration.utils.aws import AthenaQueryManager
+
+TABLES = [
+    'comunas', 'barrios', 'cuadrantes', 'comisarias_e_inspecciones', 'estaciones'
+]
+
+def main():
+    """Valida varias tablas migradas con consultas de Athena en paralelo"""
+    config = load_config()
+    athena_client = boto3.client('athena', region_name=config.aws.region)
+    output_location = (
+        f"s3://{os.getenv('ATHENA_OUTPUT_BUCKET')}/{os.getenv('ATHENA_OUTPUT_PREFIX')}"
+    )
+
+    with AthenaQueryManager(
+        athena_client,
+        config.aws.glue_database,
+        output_location,
+        max_concurrency=5
+    ) as manager:
+        # Todas las consultas se envían de inmediato y se sondean juntas
+        futures = {
+            table: manager.submit(
+                f"SELECT COUNT(*) AS total_records, "
+                f"COUNT(CASE WHEN wkt_geometry IS NULL THEN 1 END) AS empty_geoms "
+                f"FROM {table}"
+            )
+            for table in TABLES
+        }
+
+        for table, future in futures.items():
+            try:
+                execution = future.result()
+            except Exception as e:
+                print(f"✗ {table}: {str(e)}")
+                continue
+            counts = manager.read_table(execution).to_pylist()[0]
+            print(
+                f"✓ {table}: {counts['total_records']} registros, "
+                f"{counts['empty_geoms']} geometrías vacías"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -9,47 +9,38 @@ sys.path.append(str(root_dir))
 
 from dotenv import load_dotenv
 import geopandas as gpd
-import boto3
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from spatial_migration.config import PostgresConfig
+from spatial_migration.utils.db import get_connection_provider
 
-def get_rds_password():
-    """Obtiene el token de autenticación de AWS RDS"""
-    client = boto3.client('rds',
-                         region_name=os.getenv('AWS_DEFAULT_REGION'),
-                         aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                         aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
-    try:
-        token = client.generate_db_auth_token(
-            DBHostname=os.getenv('PROD_POSTGRES_HOST'),
-            Port=int(os.getenv('PROD_POSTGRES_PORT', '5432')),
-            DBUsername=os.getenv('PROD_POSTGRES_USER'),
-            Region=os.getenv('AWS_DEFAULT_REGION')
-        )
-        return token
-    except Exception as e:
-        print(f"Error generando token de autenticación: {e}")
-        return None
+def get_postgres_config():
+    """Configuración de la base de producción con autenticación IAM de RDS"""
+    return PostgresConfig(
+        host=os.getenv('PROD_POSTGRES_HOST'),
+        port=int(os.getenv('PROD_POSTGRES_PORT', '5432')),
+        database=os.getenv('PROD_POSTGRES_DB'),
+        user=os.getenv('PROD_POSTGRES_USER'),
+        password='',
+        iam_auth=True,
+        region=os.getenv('AWS_DEFAULT_REGION')
+    )
+
+def get_engine():
+    """
+    Engine del pool compartido de la base de producción
+
+    Cada conexión nueva recibe el token IAM vigente, que se renueva antes
+    de vencer, así que el engine sirve para migraciones largas.
+    """
+    return get_connection_provider(get_postgres_config()).engine
 
 def test_postgres_connection():
     # Cargar variables de entorno
     load_dotenv()
     
-    # Obtener el token de autenticación
-    password = get_rds_password()
-    if not password:
-        print("Error: No se pudo obtener el token de autenticación")
-        return False
-    
-    # Crear string de conexión
-    connection_string = (
-        f"postgresql://{os.getenv('PROD_POSTGRES_USER')}:{password}@"
-        f"{os.getenv('PROD_POSTGRES_HOST')}:{os.getenv('PROD_POSTGRES_PORT')}/"
-        f"{os.getenv('PROD_POSTGRES_DB')}"
-    )
-    
     try:
         print("Intentando conectar a PostgreSQL...")
-        engine = create_engine(connection_string)
+        engine = get_engine()
         
         # Probar la conexión
         with engine.connect() as connection:
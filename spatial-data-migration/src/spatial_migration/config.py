@@ -1,4 +1,5 @@
-# Configuraci�n y carga de variables de entornofrom dataclasses import dataclass
+# Configuración y carga de variables de entorno
+from dataclasses import dataclass
 from typing import Optional
 import os
 from dotenv import load_dotenv
@@ -10,6 +11,11 @@ class PostgresConfig:
     database: str
     user: str
     password: str
+    # Autenticación IAM de RDS: el password se reemplaza por un token temporal
+    iam_auth: bool = False
+    region: Optional[str] = None
+    pool_size: int = 5
+    max_overflow: int = 10
     
     @property
     def connection_string(self) -> str:
@@ -38,7 +44,11 @@ def load_config() -> Config:
             port=int(os.getenv('POSTGRES_PORT', '5432')),
             database=os.getenv('POSTGRES_DB', ''),
             user=os.getenv('POSTGRES_USER', ''),
-            password=os.getenv('POSTGRES_PASSWORD', '')
+            password=os.getenv('POSTGRES_PASSWORD', ''),
+            iam_auth=os.getenv('POSTGRES_IAM_AUTH', 'false').lower() in ('1', 'true', 'yes'),
+            region=os.getenv('AWS_REGION') or None,
+            pool_size=int(os.getenv('POSTGRES_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('POSTGRES_MAX_OVERFLOW', '10'))
         ),
         aws=AWSConfig(
             access_key_id=os.getenv('AWS_ACCESS_KEY_ID', ''),
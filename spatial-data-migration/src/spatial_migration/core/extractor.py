@@ -1,53 +1,111 @@
 # Extracci�n de datos de PostgreSQL
 
 # src/spatial_migration/core/extractor.py
-from typing import Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 import geopandas as gpd
-from sqlalchemy import create_engine
+import numpy as np
+import pyarrow as pa
+from sqlalchemy import text
+from .binary_copy import DECODERS, CopyBinaryStream
+from .type_mapping import column_from_text, text_transfer_types
 from ..config import PostgresConfig
 from ..logger import setup_logger
+from ..models.schemas import KeyRange, PostgresTableSchema, SpatialFilter, TableProfile, TileRange
+from ..utils.db import (
+    TABLE_SCHEMA_QUERY,
+    get_connection_provider,
+    split_table_name,
+    table_schema_from_rows
+)
+from ..utils.spatial import quadtree_tiles
 
 logger = setup_logger()
 
+# 'wkt': geometría EWKB más las columnas geometry_wkt y srid por fila
+# 'wkb': geometría una sola vez en binario y SRID leído de geometry_columns
+GEOMETRY_FORMATS = ('wkt', 'wkb')
+
+# 'minmax': rangos de igual amplitud entre min(clave) y max(clave)
+# 'percentile': rangos con la misma cantidad de filas (percentile_disc)
+# 'quadtree': tiles espaciales adaptados a la densidad y al tamaño de las geometrías
+PARTITION_METHODS = ('minmax', 'percentile', 'quadtree')
+
+# Límite usado en el prefiltro && para los lados no acotados de un tile
+TILE_ENVELOPE_LIMIT = 1e15
+
+# 'intersects': ST_Intersects (usa el índice GiST y compara la geometría exacta)
+# 'bbox': sólo el operador && entre cajas, más rápido pero aproximado
+SPATIAL_PREDICATES = ('intersects', 'bbox')
+
 class PostgreSQLExtractor:
     def __init__(self, config: PostgresConfig):
         self.config = config
         self._engine = None
+        self._srid_cache: Dict[Tuple[str, str], Optional[int]] = {}
+        self._schema_cache: Dict[str, PostgresTableSchema] = {}
 
     @property
     def engine(self):
+        # El pool (y el token IAM) se comparte con los demás componentes
         if self._engine is None:
-            self._engine = create_engine(self.config.connection_string)
+            self._engine = get_connection_provider(self.config).engine
         return self._engine
 
-    def extract_table(self, table_name: str, where_clause: Optional[str] = None) -> gpd.GeoDataFrame:
+    def extract_table(
+        self,
+        table_name: str,
+        where_clause: Optional[str] = None,
+        geometry_format: str = 'wkt',
+        params: Optional[Dict[str, Any]] = None,
+        snapshot_id: Optional[str] = None,
+        spatial_filter: Optional[SpatialFilter] = None,
+        columns: Optional[Sequence[str]] = None,
+        exclude_columns: Optional[Sequence[str]] = None
+    ) -> gpd.GeoDataFrame:
         """
         Extrae datos espaciales de PostgreSQL
         
         Args:
             table_name: Nombre de la tabla
             where_clause: Cláusula WHERE opcional
+            geometry_format: 'wkt' (por defecto) agrega las columnas
+                geometry_wkt y srid; 'wkb' transfiere la geometría una
+                sola vez y toma el SRID de geometry_columns
+            params: Parámetros enlazados usados en `where_clause`
+            snapshot_id: Snapshot exportado (ver `exported_snapshot`) sobre
+                el que se lee la tabla
+            spatial_filter: Filtro espacial resuelto en PostGIS con el
+                índice de la columna geometry
+            columns: Columnas a extraer (la geometría se incluye siempre);
+                por defecto todas
+            exclude_columns: Columnas a omitir
         
         Returns:
             GeoDataFrame con los datos extraídos
         """
         try:
-            query = f"""
-            SELECT *,
-                   ST_AsText(geometry) as geometry_wkt,
-                   ST_SRID(geometry) as srid
-            FROM {table_name}
-            """
-            
-            if where_clause:
-                query += f" WHERE {where_clause}"
-
-            gdf = gpd.read_postgis(
-                query,
-                self.engine,
-                geom_col='geometry'
+            where_clause, params = self._apply_spatial_filter(
+                table_name, where_clause, params, spatial_filter
+            )
+            query, text_types = self._extraction_query(
+                table_name, where_clause, geometry_format, columns, exclude_columns
             )
 
+            crs = self._get_crs(table_name, geometry_format)
+
+            with self._connection(snapshot_id) as conn:
+                gdf = restore_text_columns(gpd.read_postgis(
+                    text(query),
+                    conn,
+                    geom_col='geometry',
+                    crs=crs,
+                    params=params
+                ), text_types)
+
             logger.info(f"Extraídos {len(gdf)} registros de {table_name}")
             return gdf
 
@@ -55,154 +113,1236 @@ class PostgreSQLExtractor:
             logger.error(f"Error extrayendo datos de {table_name}: {str(e)}")
             raise
 
-# src/spatial_migration/core/transformer.py
-from typing import Union, BinaryIO
-import geopandas as gpd
-import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
-from io import BytesIO
-from ..logger import setup_logger
+    def extract_table_chunks(
+        self,
+        table_name: str,
+        chunk_size: int = 10000,
+        where_clause: Optional[str] = None,
+        geometry_format: str = 'wkt',
+        params: Optional[Dict[str, Any]] = None,
+        snapshot_id: Optional[str] = None,
+        spatial_filter: Optional[SpatialFilter] = None,
+        columns: Optional[Sequence[str]] = None,
+        exclude_columns: Optional[Sequence[str]] = None
+    ) -> Iterator[gpd.GeoDataFrame]:
+        """
+        Extrae datos espaciales de PostgreSQL por bloques.
 
-logger = setup_logger()
+        Usa un cursor con nombre (server-side), de modo que PostgreSQL
+        entrega las filas de a `chunk_size` y la memoria usada depende
+        del tamaño del bloque y no del tamaño de la tabla.
 
-class SpatialTransformer:
-    def transform_to_parquet(self, gdf: gpd.GeoDataFrame) -> Union[bytes, BinaryIO]:
-        """
-        Transforma GeoDataFrame a formato Parquet
-        
         Args:
-            gdf: GeoDataFrame a transformar
-        
-        Returns:
-            Datos en formato Parquet
+            table_name: Nombre de la tabla
+            chunk_size: Número máximo de registros por bloque
+            where_clause: Cláusula WHERE opcional
+            geometry_format: Formato de transferencia de la geometría
+                ('wkt' o 'wkb', ver `extract_table`)
+            params: Parámetros enlazados usados en `where_clause`
+            snapshot_id: Snapshot exportado sobre el que se lee la tabla
+            spatial_filter: Filtro espacial (ver `extract_table`)
+            columns: Columnas a extraer (ver `extract_table`)
+            exclude_columns: Columnas a omitir
+
+        Yields:
+            GeoDataFrame con a lo sumo `chunk_size` registros
         """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size debe ser mayor que cero")
+
         try:
-            # Convertir geometrías a WKT
-            df = pd.DataFrame(gdf)
-            if 'geometry' in df.columns:
-                df['geometry'] = df['geometry'].apply(lambda x: x.wkt)
-
-            # Convertir a Parquet
-            table = pa.Table.from_pandas(df)
-            
-            buffer = BytesIO()
-            pq.write_table(table, buffer)
-            buffer.seek(0)
-            
-            logger.info(f"Datos transformados a Parquet: {len(df)} registros")
-            return buffer
+            where_clause, params = self._apply_spatial_filter(
+                table_name, where_clause, params, spatial_filter
+            )
+            query, text_types = self._extraction_query(
+                table_name, where_clause, geometry_format, columns, exclude_columns
+            )
+            crs = self._get_crs(table_name, geometry_format)
+            total = 0
+
+            # stream_results hace que el dialecto psycopg2 use un cursor con nombre
+            with self._connection(snapshot_id) as conn:
+                conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+                for chunk in gpd.read_postgis(
+                    text(query),
+                    conn,
+                    geom_col='geometry',
+                    crs=crs,
+                    params=params,
+                    chunksize=chunk_size
+                ):
+                    chunk = restore_text_columns(chunk, text_types)
+                    total += len(chunk)
+                    logger.debug(f"Bloque de {len(chunk)} registros de {table_name}")
+                    yield chunk
+
+            logger.info(f"Extraídos {total} registros de {table_name} por bloques")
 
         except Exception as e:
-            logger.error(f"Error en transformación a Parquet: {str(e)}")
+            logger.error(f"Error extrayendo datos de {table_name}: {str(e)}")
             raise
 
-# src/spatial_migration/core/loader.py
-from typing import Union, BinaryIO, Dict, Any
-import boto3
-from botocore.exceptions import ClientError
-from ..config import AWSConfig
-from ..logger import setup_logger
+    def extract_table_changes(
+        self,
+        table_name: str,
+        watermark_column: str,
+        since: Optional[Any] = None,
+        until: Optional[Any] = None,
+        chunk_size: int = 10000,
+        geometry_format: str = 'wkt',
+        columns: Optional[Sequence[str]] = None,
+        exclude_columns: Optional[Sequence[str]] = None
+    ) -> Iterator[gpd.GeoDataFrame]:
+        """
+        Extrae por bloques las filas modificadas entre dos marcas de agua.
 
-logger = setup_logger()
+        El rango es [since, until] (ver `watermark_clause`): `until` debe
+        tomarse con `get_watermark` antes de extraer, de modo que las filas
+        que se modifiquen durante la extracción queden para la siguiente
+        corrida en lugar de perderse o leerse a medias.
 
-class AWSLoader:
-    def __init__(self, config: AWSConfig):
-        self.config = config
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=config.access_key_id,
-            aws_secret_access_key=config.secret_access_key,
-            region_name=config.region
-        )
-        self.glue_client = boto3.client(
-            'glue',
-            aws_access_key_id=config.access_key_id,
-            aws_secret_access_key=config.secret_access_key,
-            region_name=config.region
+        Args:
+            table_name: Nombre de la tabla
+            watermark_column: Columna de fecha de modificación (por
+                ejemplo fecha_actu o fecha_sinc)
+            since: Marca de la última corrida; None extrae toda la tabla,
+                incluidas las filas sin fecha
+            until: Marca superior de esta corrida
+            chunk_size: Número máximo de registros por bloque
+            geometry_format: Formato de transferencia de la geometría
+            columns: Columnas a extraer (ver `extract_table`)
+            exclude_columns: Columnas a omitir
+
+        Yields:
+            GeoDataFrame con a lo sumo `chunk_size` registros
+        """
+        where_clause, params = watermark_clause(watermark_column, since, until)
+        return self.extract_table_chunks(
+            table_name,
+            chunk_size=chunk_size,
+            where_clause=where_clause,
+            geometry_format=geometry_format,
+            params=params,
+            columns=columns,
+            exclude_columns=exclude_columns
         )
 
-    def load_to_aws(
+    def get_watermark(
         self,
-        parquet_data: Union[bytes, BinaryIO],
         table_name: str,
-        dtypes: Dict[str, Any]
-    ) -> bool:
+        watermark_column: str,
+        since: Optional[Any] = None
+    ) -> Tuple[Optional[Any], int]:
         """
-        Carga datos a AWS (S3 + Glue)
-        
+        Obtiene la marca de agua actual y cuántas filas cambiaron desde `since`.
+
         Args:
-            parquet_data: Datos en formato Parquet
             table_name: Nombre de la tabla
-            dtypes: Tipos de datos de las columnas
-        
+            watermark_column: Columna de fecha de modificación
+            since: Marca de la última corrida (None cuenta toda la tabla)
+
         Returns:
-            bool: True si la carga fue exitosa
+            Tupla (máximo de la columna, filas desde `since` inclusive)
         """
+        where_clause, params = watermark_clause(watermark_column, since)
+        where = f" WHERE {where_clause}" if where_clause else ""
+        query = f"SELECT max({watermark_column}), count(*) FROM {table_name}{where}"
+        with self.engine.connect() as conn:
+            high, changed = conn.execute(text(query), params).one()
+        return high, changed
+
+    def extract_table_parallel(
+        self,
+        table_name: str,
+        workers: int = 4,
+        key_column: str = 'id',
+        partitions: Optional[int] = None,
+        method: str = 'minmax',
+        where_clause: Optional[str] = None,
+        geometry_format: str = 'wkt',
+        consistent: bool = True,
+        snapshot_id: Optional[str] = None,
+        spatial_filter: Optional[SpatialFilter] = None,
+        columns: Optional[Sequence[str]] = None,
+        exclude_columns: Optional[Sequence[str]] = None
+    ) -> Iterator[gpd.GeoDataFrame]:
+        """
+        Extrae una tabla en paralelo dividiéndola por rangos de clave o
+        por tiles espaciales.
+
+        Cada partición se lee en un proceso independiente con su propia
+        conexión; los bloques se entregan a medida que terminan, sin
+        garantizar el orden de la clave.
+
+        Con method='quadtree' la tabla se divide en tiles de un quadtree
+        calculado sobre una muestra (ver `get_tile_ranges`), ponderados por
+        el tamaño de las geometrías; conviene cuando unas pocas geometrías
+        enormes desbalancean los rangos de clave. Se generan más tiles que
+        procesos y se envían del más pesado al más liviano.
+
+        Con `consistent` todos los procesos leen el mismo snapshot
+        exportado por una transacción coordinadora, de modo que el
+        resultado equivale a una única transacción aunque la tabla
+        reciba escrituras durante la extracción.
+
+        Args:
+            table_name: Nombre de la tabla
+            workers: Número de procesos (y conexiones) simultáneos
+            key_column: Columna numérica usada para dividir la tabla
+            partitions: Número de rangos (por defecto igual a `workers`; con
+                'quadtree', cuatro tiles por proceso)
+            method: Forma de dividir la tabla ('minmax', 'percentile' o 'quadtree')
+            where_clause: Cláusula WHERE opcional
+            geometry_format: Formato de transferencia de la geometría
+            consistent: Si es True y no se indica `snapshot_id`, exporta
+                un snapshot propio para esta extracción
+            snapshot_id: Snapshot exportado compartido, por ejemplo entre
+                varias tablas (ver `exported_snapshot`)
+            spatial_filter: Filtro espacial (ver `extract_table`)
+            columns: Columnas a extraer (ver `extract_table`)
+            exclude_columns: Columnas a omitir
+
+        Yields:
+            GeoDataFrame con los registros de un rango
+        """
+        if workers <= 0:
+            raise ValueError("workers debe ser mayor que cero")
+
+        if consistent and snapshot_id is None:
+            with self.exported_snapshot() as own_snapshot_id:
+                yield from self.extract_table_parallel(
+                    table_name,
+                    workers=workers,
+                    key_column=key_column,
+                    partitions=partitions,
+                    method=method,
+                    where_clause=where_clause,
+                    geometry_format=geometry_format,
+                    snapshot_id=own_snapshot_id,
+                    spatial_filter=spatial_filter,
+                    columns=columns,
+                    exclude_columns=exclude_columns
+                )
+            return
+
         try:
-            # Subir a S3
-            s3_key = f"spatial_data/{table_name}/{table_name}.parquet"
-            self.s3_client.upload_fileobj(
-                parquet_data,
-                self.config.bucket,
-                s3_key
+            where_clause, params = self._apply_spatial_filter(
+                table_name, where_clause, None, spatial_filter
             )
-            logger.info(f"Datos cargados a S3: s3://{self.config.bucket}/{s3_key}")
+            if method == 'quadtree':
+                tiles = self.get_tile_ranges(
+                    table_name, partitions or workers * 4, where_clause=where_clause, params=params
+                )
+                table_srid = self.get_srid(table_name)
+                partition_clauses = [tile_clause(tile, 'geometry', table_srid) for tile in tiles]
+                description = f"{len(tiles)} tiles"
+            else:
+                ranges = self.get_key_ranges(
+                    table_name, key_column, partitions or workers, method, where_clause, params
+                )
+                partition_clauses = [key_range_clause(key_column, key_range) for key_range in ranges]
+                description = f"{len(ranges)} rangos de {key_column}"
+            srid = self.get_srid(table_name) if geometry_format == 'wkb' else None
+            # Se resuelve aquí para que los procesos no vuelvan a leer el catálogo
+            selected = self.select_columns(table_name, columns, exclude_columns)
+            self._text_types(table_name, selected)
+            logger.info(f"Extrayendo {table_name} en {description} con {workers} procesos")
+
+            # Los procesos se crean con 'spawn': no heredan las conexiones ni
+            # los locks tomados por otros hilos (por ejemplo del scheduler) y
+            # abren su propio pool, sin tocar el engine compartido
+            total = 0
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _extract_range,
+                        self.config,
+                        table_name,
+                        partition_clause,
+                        partition_params,
+                        where_clause,
+                        geometry_format,
+                        srid,
+                        snapshot_id,
+                        params,
+                        selected,
+                        self._schema_cache.get(table_name)
+                    )
+                    for partition_clause, partition_params in partition_clauses
+                ]
+                for future in as_completed(futures):
+                    chunk = future.result()
+                    total += len(chunk)
+                    yield chunk
 
-            # Crear tabla en Glue
-            self._create_glue_table(table_name, dtypes, s3_key)
-            
-            return True
+            logger.info(f"Extraídos {total} registros de {table_name} en paralelo")
 
         except Exception as e:
-            logger.error(f"Error en carga a AWS: {str(e)}")
+            logger.error(f"Error extrayendo datos de {table_name}: {str(e)}")
             raise
 
-    def _create_glue_table(self, table_name: str, dtypes: Dict[str, Any], s3_key: str):
-        """Crea tabla en el catálogo de Glue"""
+    def extract_table_arrow(
+        self,
+        table_name: str,
+        where_clause: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        snapshot_id: Optional[str] = None,
+        spatial_filter: Optional[SpatialFilter] = None,
+        columns: Optional[Sequence[str]] = None,
+        exclude_columns: Optional[Sequence[str]] = None,
+        piece_size: int = 64 * 1024 * 1024
+    ) -> pa.Table:
+        """
+        Extrae una tabla con COPY binario directamente a Arrow.
+
+        La consulta se ejecuta como `COPY (SELECT ...) TO STDOUT WITH
+        (FORMAT binary)` y el flujo se decodifica por columnas, sin pasar
+        por filas de SQLAlchemy ni columnas object de pandas. La geometría
+        se entrega como columna binaria WKB y el SRID de la tabla queda en
+        los metadatos del esquema.
+
+        Args:
+            table_name: Nombre de la tabla
+            where_clause: Cláusula WHERE opcional
+            params: Parámetros enlazados usados en `where_clause`
+            snapshot_id: Snapshot exportado sobre el que se lee la tabla
+            spatial_filter: Filtro espacial (ver `extract_table`)
+            columns: Columnas a extraer (ver `extract_table`)
+            exclude_columns: Columnas a omitir
+            piece_size: Bytes del flujo COPY que se decodifican de una vez;
+                la tabla resultante tiene un RecordBatch por cada parte
+
+        Returns:
+            pa.Table con los datos extraídos
+        """
         try:
-            columns = self._get_glue_columns(dtypes)
-            
-            self.glue_client.create_table(
-                DatabaseName=self.config.glue_database,
-                TableInput={
-                    'Name': table_name,
-                    'StorageDescriptor': {
-                        'Columns': columns,
-                        'Location': f"s3://{self.config.bucket}/{s3_key}",
-                        'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
-                        'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
-                        'SerdeInfo': {
-                            'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
-                        }
-                    },
-                    'TableType': 'EXTERNAL_TABLE'
-                }
+            where_clause, params = self._apply_spatial_filter(
+                table_name, where_clause, params, spatial_filter
+            )
+            select = self._build_query(
+                table_name,
+                where_clause,
+                'wkb',
+                self.select_columns(table_name, columns, exclude_columns)
+            )
+            if params:
+                # COPY no admite parámetros: se incrustan como literales
+                select = str(text(select).bindparams(**params).compile(
+                    self.engine,
+                    compile_kwargs={'literal_binds': True}
+                ))
+            srid = self.get_srid(table_name)
+
+            with self._connection(snapshot_id) as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    cursor.execute(f"SELECT * FROM ({select}) AS q LIMIT 0")
+                    described = [(col.name, col.type_code) for col in cursor.description]
+
+                    fields = []
+                    projection = []
+                    for name, oid in described:
+                        quoted = quote_identifier(name)
+                        if name == 'geometry':
+                            projection.append(f"ST_AsBinary({quoted}) AS {quoted}")
+                            fields.append((name, 17))
+                        elif oid in DECODERS:
+                            projection.append(quoted)
+                            fields.append((name, oid))
+                        else:
+                            # Tipos sin decodificador binario (numeric, json, ...) viajan como texto
+                            projection.append(f"{quoted}::text AS {quoted}")
+                            fields.append((name, 25))
+
+                    # El flujo se decodifica por partes mientras llega, sin guardarlo entero
+                    stream = CopyBinaryStream(fields, piece_size=piece_size)
+                    cursor.copy_expert(
+                        f"COPY (SELECT {', '.join(projection)} FROM ({select}) AS q) "
+                        f"TO STDOUT WITH (FORMAT binary)",
+                        stream
+                    )
+                finally:
+                    cursor.close()
+
+            table = stream.finish()
+            if srid:
+                table = table.replace_schema_metadata({'srid': str(srid)})
+
+            logger.info(f"Extraídos {table.num_rows} registros de {table_name} con COPY binario")
+            return table
+
+        except Exception as e:
+            logger.error(f"Error extrayendo datos de {table_name}: {str(e)}")
+            raise
+
+    @contextmanager
+    def exported_snapshot(self) -> Iterator[str]:
+        """
+        Abre una transacción coordinadora y exporta su snapshot.
+
+        La transacción (REPEATABLE READ READ ONLY) permanece abierta
+        mientras dure el bloque `with`; cualquier conexión puede leer el
+        mismo estado de la base con `SET TRANSACTION SNAPSHOT`, por lo que
+        sirve tanto para una tabla como para un conjunto de tablas.
+
+        Yields:
+            Identificador del snapshot exportado
+        """
+        with self.engine.connect() as conn:
+            conn.execution_options(
+                isolation_level='REPEATABLE READ',
+                postgresql_readonly=True
+            )
+            snapshot_id = conn.execute(text("SELECT pg_export_snapshot()")).scalar()
+            logger.info(f"Snapshot exportado: {snapshot_id}")
+            try:
+                yield snapshot_id
+            finally:
+                conn.rollback()
+
+    @contextmanager
+    def _connection(self, snapshot_id: Optional[str] = None):
+        """Abre una conexión, adjunta al snapshot exportado si se indica"""
+        with self.engine.connect() as conn:
+            if snapshot_id:
+                conn.execution_options(
+                    isolation_level='REPEATABLE READ',
+                    postgresql_readonly=True
+                )
+                # Debe ser la primera sentencia de la transacción
+                conn.execute(
+                    text("SET TRANSACTION SNAPSHOT :snapshot_id"),
+                    {'snapshot_id': snapshot_id}
+                )
+            yield conn
+
+    def get_key_ranges(
+        self,
+        table_name: str,
+        key_column: str = 'id',
+        partitions: int = 4,
+        method: str = 'minmax',
+        where_clause: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> List[KeyRange]:
+        """
+        Divide el dominio de una clave en rangos contiguos.
+
+        Args:
+            table_name: Nombre de la tabla
+            key_column: Columna usada para dividir la tabla
+            partitions: Número de rangos deseado
+            method: 'minmax' o 'percentile'
+            where_clause: Cláusula WHERE opcional
+            params: Parámetros enlazados usados en `where_clause`
+
+        Returns:
+            Lista de KeyRange que cubre todas las filas; el primero no tiene
+            límite inferior y el último no tiene límite superior
+        """
+        if method not in PARTITION_METHODS:
+            raise ValueError(f"Método de partición no soportado: {method}")
+        if method == 'quadtree':
+            raise ValueError("El método 'quadtree' divide por tiles: usar get_tile_ranges")
+        if partitions <= 0:
+            raise ValueError("partitions debe ser mayor que cero")
+
+        where = f" WHERE {where_clause}" if where_clause else ""
+        if method == 'minmax':
+            query = f"SELECT min({key_column}), max({key_column}) FROM {table_name}{where}"
+            with self.engine.connect() as conn:
+                low, high = conn.execute(text(query), params or {}).one()
+            if low is None:
+                return [KeyRange()]
+            step = (high - low) / partitions
+            bounds = [low + step * i for i in range(1, partitions)]
+            if isinstance(low, int):
+                bounds = [int(b) for b in bounds]
+        elif partitions > 1:
+            fractions = ", ".join(str(i / partitions) for i in range(1, partitions))
+            query = (
+                f"SELECT percentile_disc(ARRAY[{fractions}]::float8[]) "
+                f"WITHIN GROUP (ORDER BY {key_column}) FROM {table_name}{where}"
             )
-            logger.info(f"Tabla {table_name} creada en Glue")
+            with self.engine.connect() as conn:
+                bounds = conn.execute(text(query), params or {}).scalar() or []
+        else:
+            bounds = []
 
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'AlreadyExistsException':
-                logger.warning(f"La tabla {table_name} ya existe en Glue, actualizando...")
-                # Aquí podrías implementar la lógica para actualizar la tabla
+        return split_key_range(bounds)
+
+    def count_rows(
+        self,
+        table_name: str,
+        where_clause: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Cuenta las filas de una tabla (o de un origen derivado) que cumplen una condición"""
+        where = f" WHERE {where_clause}" if where_clause else ""
+        with self.engine.connect() as conn:
+            return conn.execute(
+                text(f"SELECT count(*) FROM {table_name}{where}"), params or {}
+            ).scalar()
+
+    def estimate_rows(self, table_name: str) -> Optional[int]:
+        """
+        Filas de una tabla según pg_class.reltuples, sin recorrerla
+
+        Returns:
+            Estimación del último ANALYZE, o None si la tabla nunca se
+            analizó o el origen es una subconsulta
+        """
+        if table_name.startswith('('):
+            return None
+        with self.engine.connect() as conn:
+            reltuples = conn.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table_name AS regclass)"),
+                {'table_name': table_name}
+            ).scalar()
+        # reltuples es -1 (o 0 en versiones anteriores) si nunca se analizó la tabla
+        return int(reltuples) if reltuples and reltuples > 0 else None
+
+    def get_tile_ranges(
+        self,
+        table_name: str,
+        tiles: int = 16,
+        sample_size: int = 10000,
+        where_clause: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        geom_col: str = 'geometry'
+    ) -> List[TileRange]:
+        """
+        Divide la extensión de una tabla en tiles de un quadtree.
+
+        La densidad se estima con una muestra TABLESAMPLE SYSTEM de unas
+        `sample_size` filas (según pg_class.reltuples); cada geometría de la
+        muestra pesa su tamaño en bytes, de modo que las geometrías grandes
+        reciben tiles propios. Cada fila pertenece al tile que contiene la
+        esquina inferior izquierda de su caja, por lo que las geometrías que
+        cruzan el borde entre tiles se extraen una sola vez.
+
+        Args:
+            table_name: Nombre de la tabla
+            tiles: Número de partes en que se reparte el peso (ver
+                `quadtree_tiles`)
+            sample_size: Filas aproximadas de la muestra
+            where_clause: Cláusula WHERE opcional
+            params: Parámetros enlazados usados en `where_clause`
+            geom_col: Columna geométrica
+
+        Returns:
+            Lista de TileRange que cubre todas las filas, ordenada por peso
+            decreciente; si hay más de un tile, el último toma las filas
+            con geometría nula o vacía
+        """
+        if tiles <= 0:
+            raise ValueError("tiles debe ser mayor que cero")
+        if table_name.startswith('('):
+            # TABLESAMPLE y pg_class necesitan una tabla, no una subconsulta
+            raise ValueError("El particionado quadtree requiere una tabla como origen")
+
+        where = f" AND ({where_clause})" if where_clause else ""
+        with self.engine.connect() as conn:
+            reltuples = conn.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table_name AS regclass)"),
+                {'table_name': table_name}
+            ).scalar()
+            # reltuples es -1 (o 0) si la tabla nunca se analizó: se lee completa
+            if not reltuples or reltuples <= sample_size:
+                percent = 100.0
             else:
-                raise
-
-    def _get_glue_columns(self, dtypes: Dict[str, Any]) -> list:
-        """Convierte tipos de pandas a tipos de Glue"""
-        type_mapping = {
-            'int64': 'bigint',
-            'float64': 'double',
-            'object': 'string',
-            'bool': 'boolean',
-            'datetime64[ns]': 'timestamp'
+                percent = 100.0 * sample_size / reltuples
+            query = (
+                f"SELECT ST_XMin({geom_col}), ST_YMin({geom_col}), ST_MemSize({geom_col}) "
+                f"FROM {table_name} TABLESAMPLE SYSTEM (:sample_percent) REPEATABLE (0) "
+                f"WHERE {geom_col} IS NOT NULL AND NOT ST_IsEmpty({geom_col}){where}"
+            )
+            rows = conn.execute(
+                text(query), {**(params or {}), 'sample_percent': percent}
+            ).all()
+
+        x, y, weights = (np.array([row[i] for row in rows], dtype=float) for i in range(3))
+        ranges = quadtree_tiles(x, y, weights, max_tiles=tiles)
+        if len(ranges) > 1:
+            ranges.append(TileRange(null_only=True))
+        logger.info(
+            f"{table_name}: {len(ranges)} tiles a partir de una muestra de {len(rows)} filas"
+        )
+        return ranges
+
+    def profile_table(
+        self,
+        table_name: str,
+        key_column: str = 'id',
+        geom_col: str = 'geometry',
+        estimate: bool = False
+    ) -> TableProfile:
+        """
+        Perfila una tabla antes de migrarla.
+
+        En modo exacto todos los indicadores salen de una sola consulta de
+        agregación, es decir, de un único recorrido de la tabla. En modo
+        estimado sólo se leen el catálogo y las estadísticas del último
+        ANALYZE (pg_class.reltuples, pg_stats, geometry_columns y
+        ST_EstimatedExtent), sin recorrer la tabla; la cantidad de
+        geometrías inválidas no puede estimarse y queda en None.
+
+        Args:
+            table_name: Nombre de la tabla, opcionalmente con esquema
+            key_column: Columna que identifica las filas
+            geom_col: Columna geométrica
+            estimate: Usar las estadísticas en lugar de recorrer la tabla
+
+        Returns:
+            TableProfile con conteos, extensión, tipos de geometría y SRID
+        """
+        try:
+            if estimate:
+                profile = self._estimate_profile(table_name, key_column, geom_col)
+            else:
+                profile = self._scan_profile(table_name, key_column, geom_col)
+            logger.info(
+                f"Perfil de {table_name}{' (estimado)' if estimate else ''}: "
+                f"{profile.row_count} registros, {profile.distinct_keys} claves distintas"
+            )
+            return profile
+
+        except Exception as e:
+            logger.error(f"Error perfilando {table_name}: {str(e)}")
+            raise
+
+    def _scan_profile(self, table_name: str, key_column: str, geom_col: str) -> TableProfile:
+        query = f"""
+            WITH profile AS (
+                SELECT count(*) AS row_count,
+                       count(DISTINCT {key_column}) AS distinct_keys,
+                       count(*) FILTER (WHERE {geom_col} IS NULL) AS null_geometries,
+                       count(*) FILTER (
+                           WHERE {geom_col} IS NOT NULL AND NOT ST_IsValid({geom_col})
+                       ) AS invalid_geometries,
+                       ST_Extent({geom_col}) AS extent,
+                       array_agg(DISTINCT GeometryType({geom_col}))
+                           FILTER (WHERE {geom_col} IS NOT NULL) AS geometry_types,
+                       array_agg(DISTINCT ST_SRID({geom_col}))
+                           FILTER (WHERE {geom_col} IS NOT NULL) AS srids
+                FROM {table_name}
+            )
+            SELECT row_count, distinct_keys, null_geometries, invalid_geometries,
+                   ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent),
+                   geometry_types, srids
+            FROM profile
+        """
+        with self.engine.connect() as conn:
+            row = conn.execute(text(query)).one()
+        return TableProfile(
+            table_name=table_name,
+            row_count=row[0],
+            distinct_keys=row[1],
+            null_geometries=row[2],
+            invalid_geometries=row[3],
+            extent=tuple(row[4:8]) if row[4] is not None else None,
+            geometry_types=sorted(row[8] or []),
+            srids=sorted(row[9] or [])
+        )
+
+    def _estimate_profile(self, table_name: str, key_column: str, geom_col: str) -> TableProfile:
+        schema, _, table = table_name.rpartition('.')
+        query = text("""
+            SELECT c.reltuples,
+                   k.n_distinct,
+                   g.null_frac,
+                   gc.type,
+                   gc.srid,
+                   ST_XMin(e.extent), ST_YMin(e.extent), ST_XMax(e.extent), ST_YMax(e.extent)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_stats k
+              ON k.schemaname = n.nspname AND k.tablename = c.relname AND k.attname = :key_column
+            LEFT JOIN pg_stats g
+              ON g.schemaname = n.nspname AND g.tablename = c.relname AND g.attname = :geom_col
+            LEFT JOIN geometry_columns gc
+              ON gc.f_table_schema = n.nspname AND gc.f_table_name = c.relname
+             AND gc.f_geometry_column = :geom_col
+            CROSS JOIN LATERAL (
+                SELECT ST_EstimatedExtent(n.nspname, c.relname, :geom_col) AS extent
+            ) e
+            WHERE n.nspname = COALESCE(:schema, current_schema())
+              AND c.relname = :table
+        """)
+        with self.engine.connect() as conn:
+            row = conn.execute(query, {
+                'schema': schema or None,
+                'table': table,
+                'key_column': key_column,
+                'geom_col': geom_col
+            }).one()
+
+        reltuples, n_distinct, null_frac = row[0], row[1], row[2]
+        # reltuples es -1 (o 0 en versiones anteriores) si nunca se analizó la tabla
+        row_count = int(reltuples) if reltuples and reltuples > 0 else None
+        distinct_keys = None
+        if n_distinct is not None:
+            # Un n_distinct negativo es la fracción de filas distintas
+            if n_distinct < 0 and row_count is not None:
+                distinct_keys = round(-n_distinct * row_count)
+            elif n_distinct >= 0:
+                distinct_keys = int(n_distinct)
+
+        return TableProfile(
+            table_name=table_name,
+            row_count=row_count,
+            distinct_keys=distinct_keys,
+            null_geometries=(
+                round(null_frac * row_count)
+                if null_frac is not None and row_count is not None else None
+            ),
+            invalid_geometries=None,
+            extent=tuple(row[5:9]) if row[5] is not None else None,
+            geometry_types=[row[3]] if row[3] else [],
+            srids=[row[4]] if row[4] else [],
+            estimated=True
+        )
+
+    def get_table_schema(self, table_name: str, refresh: bool = False) -> PostgresTableSchema:
+        """
+        Obtiene el schema de una tabla desde information_schema y geometry_columns.
+
+        El schema se lee una sola vez por tabla (`refresh` lo vuelve a leer)
+        y también completa el cache de SRID de sus columnas geométricas.
+
+        Args:
+            table_name: Nombre de la tabla, opcionalmente con esquema
+            refresh: Ignorar el schema guardado
+
+        Returns:
+            PostgresTableSchema con las columnas en el orden de la tabla
+        """
+        if refresh or table_name not in self._schema_cache:
+            schema, table = split_table_name(table_name)
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(
+                    TABLE_SCHEMA_QUERY,
+                    {'schema': schema, 'table': table}
+                ).mappings().all()
+            table_schema = table_schema_from_rows(table_name, rows)
+            self._schema_cache[table_name] = table_schema
+            for column, srid in table_schema.geometry_columns.items():
+                self._srid_cache[(table_name, column)] = srid
+        return self._schema_cache[table_name]
+
+    def source_query(
+        self,
+        table_name: str,
+        geom_col: str = 'geometry',
+        dedup_key: Optional[Sequence[str]] = None
+    ) -> str:
+        """
+        Origen de extracción con la geometría renombrada y sin duplicados.
+
+        La extracción espera la geometría en una columna 'geometry'; para
+        tablas con otro nombre (por ejemplo 'geom') o con filas repetidas
+        se arma una subconsulta que puede usarse como `table_name` en los
+        demás métodos. Su schema y su SRID quedan en cache, así que la
+        proyección de columnas y los tipos de PostgreSQL siguen funcionando.
+
+        Args:
+            table_name: Tabla de origen, opcionalmente con esquema
+            geom_col: Columna geométrica de la tabla
+            dedup_key: Columnas que identifican una fila; se conserva una
+                fila por clave (SELECT DISTINCT ON)
+
+        Returns:
+            La tabla misma si no hace falta transformarla, o la expresión
+            '(SELECT ...) AS alias'
+        """
+        table_schema = self.get_table_schema(table_name)
+        if geom_col not in table_schema.columns:
+            raise ValueError(f"La columna {geom_col} no existe en {table_name}")
+        if geom_col != 'geometry' and 'geometry' in table_schema.columns:
+            raise ValueError(f"{table_name} ya tiene una columna geometry además de {geom_col}")
+        keys = [dedup_key] if isinstance(dedup_key, str) else list(dedup_key or ())
+        unknown = sorted(set(keys) - set(table_schema.columns))
+        if unknown:
+            raise ValueError(f"Columnas inexistentes en {table_name}: {unknown}")
+        if geom_col == 'geometry' and not keys:
+            return table_name
+
+        def rename(column: str) -> str:
+            return 'geometry' if column == geom_col else column
+
+        select = ", ".join(
+            f"{quote_identifier(c)} AS geometry" if c == geom_col else quote_identifier(c)
+            for c in table_schema.columns
+        )
+        query = "SELECT "
+        if keys:
+            key_list = ", ".join(quote_identifier(k) for k in keys)
+            query += f"DISTINCT ON ({key_list}) {select} FROM {table_name} ORDER BY {key_list}"
+        else:
+            query += f"{select} FROM {table_name}"
+        source = f"({query}) AS {quote_identifier(split_table_name(table_name)[1])}"
+
+        geometry_columns = {
+            rename(c): srid for c, srid in (table_schema.geometry_columns or {}).items()
         }
-        
-        columns = []
-        for column, dtype in dtypes.items():
-            columns.append({
-                'Name': column,
-                'Type': type_mapping.get(str(dtype), 'string')
-            })
-        
-        return columns
\ No newline at end of file
+        self._schema_cache[source] = replace(
+            table_schema,
+            table_name=source,
+            columns={rename(c): t for c, t in table_schema.columns.items()},
+            geometry_column='geometry',
+            nullable={rename(c): n for c, n in (table_schema.nullable or {}).items()} or None,
+            geometry_columns=geometry_columns
+        )
+        for column, srid in geometry_columns.items():
+            self._srid_cache[(source, column)] = srid
+        return source
+
+    def select_columns(
+        self,
+        table_name: str,
+        columns: Optional[Sequence[str]] = None,
+        exclude_columns: Optional[Sequence[str]] = None
+    ) -> Optional[List[str]]:
+        """
+        Resuelve la proyección de una extracción contra el schema de la tabla
+
+        Args:
+            table_name: Nombre de la tabla
+            columns: Columnas a incluir (None incluye todas)
+            exclude_columns: Columnas a omitir
+
+        Returns:
+            Lista de columnas en el orden de la tabla, o None si no se
+            pidió proyección (SELECT * sin leer el catálogo)
+        """
+        if columns is None and not exclude_columns:
+            return None
+        return project_columns(self.get_table_schema(table_name), columns, exclude_columns)
+
+    def get_srid(self, table_name: str, geom_col: str = 'geometry') -> Optional[int]:
+        """
+        Obtiene el SRID declarado de una columna geométrica.
+
+        Se consulta `geometry_columns` una sola vez por tabla y columna en
+        lugar de calcular ST_SRID para cada fila.
+
+        Args:
+            table_name: Nombre de la tabla, opcionalmente con esquema
+            geom_col: Nombre de la columna geométrica
+
+        Returns:
+            SRID de la columna, o None si no está registrado
+        """
+        key = (table_name, geom_col)
+        if key not in self._srid_cache:
+            schema, _, table = table_name.rpartition('.')
+            query = text("""
+                SELECT srid
+                FROM geometry_columns
+                WHERE f_table_schema = COALESCE(:schema, current_schema())
+                  AND f_table_name = :table
+                  AND f_geometry_column = :geom_col
+            """)
+            with self.engine.connect() as conn:
+                srid = conn.execute(
+                    query,
+                    {'schema': schema or None, 'table': table, 'geom_col': geom_col}
+                ).scalar()
+            # PostGIS registra SRID 0 cuando la columna no tiene restricción
+            self._srid_cache[key] = srid or None
+        return self._srid_cache[key]
+
+    def _apply_spatial_filter(
+        self,
+        table_name: str,
+        where_clause: Optional[str],
+        params: Optional[Dict[str, Any]],
+        spatial_filter: Optional[SpatialFilter]
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Agrega el predicado de un filtro espacial a la cláusula WHERE"""
+        if spatial_filter is None:
+            return where_clause, params
+        # La columna se califica con la tabla para no confundirla con la
+        # de la tabla de referencia dentro del EXISTS
+        clause, filter_params = spatial_filter_clause(
+            spatial_filter,
+            f"{source_alias(table_name)}.geometry",
+            self.get_srid(table_name)
+        )
+        clauses = [f"({c})" for c in (where_clause, clause) if c]
+        return " AND ".join(clauses), {**(params or {}), **filter_params}
+
+    def _get_crs(self, table_name: str, geometry_format: str) -> Optional[str]:
+        """Devuelve el CRS a asignar según el formato de geometría"""
+        if geometry_format != 'wkb':
+            return None
+        srid = self.get_srid(table_name)
+        return f"EPSG:{srid}" if srid else None
+
+    def _extraction_query(
+        self,
+        table_name: str,
+        where_clause: Optional[str],
+        geometry_format: str,
+        columns: Optional[Sequence[str]],
+        exclude_columns: Optional[Sequence[str]]
+    ) -> Tuple[str, Dict[str, pa.DataType]]:
+        """Consulta de extracción y columnas que viajan como texto (ver `_text_types`)"""
+        if geometry_format not in GEOMETRY_FORMATS:
+            raise ValueError(f"Formato de geometría no soportado: {geometry_format}")
+        selected = self.select_columns(table_name, columns, exclude_columns)
+        text_types = self._text_types(table_name, selected)
+        query = self._build_query(table_name, where_clause, geometry_format, selected, text_types)
+        return query, text_types
+
+    def _text_types(
+        self,
+        table_name: str,
+        columns: Optional[List[str]] = None
+    ) -> Dict[str, pa.DataType]:
+        """
+        Columnas numeric y bigint de una extracción, que se leen como texto
+        (ver `text_transfer_types`). Una subconsulta sin schema en cache,
+        como las consultas del manifiesto, se lee sin convertir.
+        """
+        if table_name.startswith('(') and table_name not in self._schema_cache:
+            return {}
+        text_types = text_transfer_types(self.get_table_schema(table_name))
+        if columns is not None:
+            text_types = {c: t for c, t in text_types.items() if c in columns}
+        return text_types
+
+    def _build_query(
+        self,
+        table_name: str,
+        where_clause: Optional[str] = None,
+        geometry_format: str = 'wkt',
+        columns: Optional[List[str]] = None,
+        text_types: Optional[Dict[str, pa.DataType]] = None
+    ) -> str:
+        """Construye la consulta de extracción de una tabla"""
+        if geometry_format not in GEOMETRY_FORMATS:
+            raise ValueError(f"Formato de geometría no soportado: {geometry_format}")
+
+        text_types = text_types or {}
+        if text_types and not columns:
+            columns = list(self.get_table_schema(table_name).columns)
+        select = ", ".join(
+            f"{quote_identifier(c)}::text AS {quote_identifier(c)}" if c in text_types
+            else quote_identifier(c)
+            for c in columns
+        ) if columns else "*"
+        if geometry_format == 'wkb':
+            # La geometría viaja una sola vez como EWKB, sin WKT ni SRID por fila
+            query = f"""
+            SELECT {select}
+            FROM {table_name}
+            """
+        else:
+            query = f"""
+            SELECT {select},
+                   ST_AsText(geometry) as geometry_wkt,
+                   ST_SRID(geometry) as srid
+            FROM {table_name}
+            """
+
+        if where_clause:
+            query += f" WHERE {where_clause}"
+
+        return query
+
+def quote_identifier(name: str) -> str:
+    """Cita un nombre de columna para usarlo en SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+def restore_text_columns(
+    gdf: gpd.GeoDataFrame,
+    text_types: Dict[str, pa.DataType]
+) -> gpd.GeoDataFrame:
+    """Reconstruye con su tipo exacto las columnas leídas como texto"""
+    for column, target in text_types.items():
+        if column in gdf.columns:
+            gdf[column] = column_from_text(gdf[column], target)
+    return gdf
+
+def source_alias(table_name: str) -> str:
+    """Nombre con el que se califican las columnas de un origen (tabla o '(subconsulta) AS alias')"""
+    if table_name.startswith('('):
+        return table_name.rpartition(' AS ')[2]
+    return table_name
+
+def project_columns(
+    table_schema: PostgresTableSchema,
+    columns: Optional[Sequence[str]] = None,
+    exclude_columns: Optional[Sequence[str]] = None,
+    geom_col: str = 'geometry'
+) -> List[str]:
+    """
+    Calcula las columnas a extraer a partir de conjuntos de inclusión y exclusión.
+
+    La columna geométrica se incluye siempre, porque la extracción la
+    necesita para construir el GeoDataFrame.
+
+    Args:
+        table_schema: Schema de la tabla (ver `get_table_schema`)
+        columns: Columnas a incluir (None incluye todas)
+        exclude_columns: Columnas a omitir
+        geom_col: Columna geométrica
+
+    Returns:
+        Lista de columnas en el orden de la tabla
+    """
+    include = set(columns) if columns is not None else None
+    exclude = set(exclude_columns or ())
+    unknown = sorted(((include or set()) | exclude) - set(table_schema.columns))
+    if unknown:
+        raise ValueError(f"Columnas inexistentes en {table_schema.table_name}: {unknown}")
+    if geom_col in exclude:
+        raise ValueError(f"La columna {geom_col} no puede excluirse")
+
+    return [
+        name for name in table_schema.columns
+        if name == geom_col or ((include is None or name in include) and name not in exclude)
+    ]
+
+def split_key_range(bounds: List[Any]) -> List[KeyRange]:
+    """
+    Convierte una lista de límites en rangos contiguos sin huecos.
+
+    Los límites repetidos (claves muy concentradas) se descartan para no
+    generar rangos vacíos.
+
+    Args:
+        bounds: Límites interiores, en orden creciente
+
+    Returns:
+        Lista de KeyRange de len(límites únicos) + 1 elementos
+    """
+    unique_bounds = sorted(set(b for b in bounds if b is not None))
+    edges = [None] + unique_bounds + [None]
+    return [KeyRange(lower, upper) for lower, upper in zip(edges[:-1], edges[1:])]
+
+def key_range_clause(key_column: str, key_range: KeyRange) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Genera el predicado SQL de un rango con parámetros enlazados.
+
+    Args:
+        key_column: Columna de la clave
+        key_range: Rango a filtrar
+
+    Returns:
+        Tupla (cláusula o None si el rango es ilimitado, parámetros)
+    """
+    conditions = []
+    params: Dict[str, Any] = {}
+    if key_range.lower is not None:
+        conditions.append(f"{key_column} >= :range_lower")
+        params['range_lower'] = key_range.lower
+    if key_range.upper is not None:
+        conditions.append(f"{key_column} < :range_upper")
+        params['range_upper'] = key_range.upper
+    return (" AND ".join(conditions) or None), params
+
+def tile_clause(
+    tile: TileRange,
+    geom_column: str = 'geometry',
+    srid: Optional[int] = None
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Genera el predicado SQL de un tile con parámetros enlazados.
+
+    Una fila pertenece al tile si la esquina inferior izquierda de su
+    caja (ST_XMin, ST_YMin) cae en el intervalo semiabierto del tile; como
+    los tiles no se solapan, cada fila pertenece a uno solo aunque su
+    geometría cruce varios. Con `srid` se agrega además un prefiltro &&
+    con la caja del tile, que es condición necesaria y permite usar el
+    índice GiST.
+
+    Args:
+        tile: Tile a filtrar
+        geom_column: Columna geométrica
+        srid: SRID de la columna (sin él no se agrega el prefiltro)
+
+    Returns:
+        Tupla (cláusula o None si el tile es ilimitado, parámetros)
+    """
+    if tile.null_only:
+        return f"({geom_column} IS NULL OR ST_IsEmpty({geom_column}))", {}
+
+    conditions = []
+    params: Dict[str, Any] = {}
+    bounds = (
+        ('tile_xmin', tile.xmin, 'ST_XMin', '>='),
+        ('tile_ymin', tile.ymin, 'ST_YMin', '>='),
+        ('tile_xmax', tile.xmax, 'ST_XMin', '<'),
+        ('tile_ymax', tile.ymax, 'ST_YMin', '<'),
+    )
+    for name, value, function, operator in bounds:
+        if value is not None:
+            conditions.append(f"{function}({geom_column}) {operator} :{name}")
+            params[name] = value
+    if not conditions:
+        return None, params
+
+    if srid is not None:
+        limits = (-TILE_ENVELOPE_LIMIT, -TILE_ENVELOPE_LIMIT, TILE_ENVELOPE_LIMIT, TILE_ENVELOPE_LIMIT)
+        for (name, value, _, _), limit in zip(bounds, limits):
+            params[f"{name}_env"] = limit if value is None else value
+        params['tile_srid'] = srid
+        conditions.insert(0, (
+            f"{geom_column} && ST_MakeEnvelope(:tile_xmin_env, :tile_ymin_env, "
+            f":tile_xmax_env, :tile_ymax_env, :tile_srid)"
+        ))
+    return " AND ".join(conditions), params
+
+def spatial_filter_clause(
+    spatial_filter: SpatialFilter,
+    geom_column: str = 'geometry',
+    table_srid: Optional[int] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Compila un filtro espacial a un predicado de PostGIS con parámetros.
+
+    La geometría del filtro se construye una sola vez en el servidor
+    (ST_MakeEnvelope, ST_GeomFromText o ST_GeomFromWKB) y, si su SRID
+    difiere del de la tabla, se transforma el filtro y no la columna, de
+    modo que el predicado puede usar el índice GiST de la tabla.
+
+    Args:
+        spatial_filter: Filtro con exactamente uno de bbox, geometry o table
+        geom_column: Columna geométrica de la tabla filtrada
+        table_srid: SRID de la columna (se asume para el filtro si éste
+            no indica el suyo)
+
+    Returns:
+        Tupla (cláusula, parámetros)
+    """
+    if spatial_filter.predicate not in SPATIAL_PREDICATES:
+        raise ValueError(f"Predicado espacial no soportado: {spatial_filter.predicate}")
+    sources = [
+        source for source in (spatial_filter.bbox, spatial_filter.geometry, spatial_filter.table)
+        if source is not None
+    ]
+    if len(sources) != 1:
+        raise ValueError("El filtro espacial debe indicar uno solo de bbox, geometry o table")
+
+    def predicate(shape: str) -> str:
+        if spatial_filter.predicate == 'bbox':
+            return f"{geom_column} && {shape}"
+        return f"ST_Intersects({geom_column}, {shape})"
+
+    params: Dict[str, Any] = {}
+    transform = (
+        spatial_filter.srid is not None
+        and table_srid is not None
+        and spatial_filter.srid != table_srid
+    )
+
+    if spatial_filter.table is not None:
+        shape = f"sf_ref.{spatial_filter.table_geom_col}"
+        if transform:
+            shape = f"ST_Transform({shape}, :sf_table_srid)"
+            params['sf_table_srid'] = table_srid
+        ref_where = f" AND ({spatial_filter.table_where})" if spatial_filter.table_where else ""
+        params.update(spatial_filter.table_params or {})
+        clause = (
+            f"EXISTS (SELECT 1 FROM {spatial_filter.table} AS sf_ref "
+            f"WHERE {predicate(shape)}{ref_where})"
+        )
+        return clause, params
+
+    params['sf_srid'] = spatial_filter.srid or table_srid or 0
+    if spatial_filter.bbox is not None:
+        params.update(zip(('sf_xmin', 'sf_ymin', 'sf_xmax', 'sf_ymax'), spatial_filter.bbox))
+        shape = "ST_MakeEnvelope(:sf_xmin, :sf_ymin, :sf_xmax, :sf_ymax, :sf_srid)"
+    else:
+        geometry = spatial_filter.geometry
+        if isinstance(geometry, (bytes, bytearray, memoryview)):
+            # En hexadecimal el parámetro es texto y también sirve en COPY
+            params['sf_geometry'] = bytes(geometry).hex()
+            shape = "ST_GeomFromWKB(decode(:sf_geometry, 'hex'), :sf_srid)"
+        else:
+            params['sf_geometry'] = geometry
+            shape = "ST_GeomFromText(:sf_geometry, :sf_srid)"
+
+    if transform:
+        shape = f"ST_Transform({shape}, :sf_table_srid)"
+        params['sf_table_srid'] = table_srid
+    return predicate(shape), params
+
+def watermark_clause(
+    watermark_column: str,
+    since: Optional[Any] = None,
+    until: Optional[Any] = None
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Genera el predicado SQL de un rango de marcas de agua [since, until].
+
+    El límite inferior es inclusivo: con una columna de tipo date, las
+    filas modificadas más tarde el mismo día que la marca guardada tienen
+    ese mismo valor y con `>` no se leerían nunca. Las filas con el valor
+    exacto de la marca se vuelven a leer en la corrida siguiente; como en
+    cualquier archivo de cambios, la versión vigente de cada clave es la
+    de mayor valor en la columna.
+
+    Sin `since` se incluyen también las filas con la columna en NULL, de
+    modo que la primera corrida equivale a una extracción completa.
+
+    Args:
+        watermark_column: Columna de fecha de modificación
+        since: Límite inferior inclusivo
+        until: Límite superior inclusivo
+
+    Returns:
+        Tupla (cláusula o None si el rango es ilimitado, parámetros)
+    """
+    params: Dict[str, Any] = {}
+    if since is not None:
+        conditions = [f"{watermark_column} >= :watermark_since"]
+        params['watermark_since'] = since
+        if until is not None:
+            conditions.append(f"{watermark_column} <= :watermark_until")
+            params['watermark_until'] = until
+        return " AND ".join(conditions), params
+    if until is not None:
+        params['watermark_until'] = until
+        return (
+            f"({watermark_column} <= :watermark_until OR {watermark_column} IS NULL)",
+            params
+        )
+    return None, params
+
+def _extract_range(
+    config: PostgresConfig,
+    table_name: str,
+    partition_clause: Optional[str],
+    partition_params: Dict[str, Any],
+    where_clause: Optional[str],
+    geometry_format: str,
+    srid: Optional[int],
+    snapshot_id: Optional[str] = None,
+    where_params: Optional[Dict[str, Any]] = None,
+    columns: Optional[List[str]] = None,
+    table_schema: Optional[PostgresTableSchema] = None
+) -> gpd.GeoDataFrame:
+    """
+    Extrae una partición (rango de clave o tile) en un proceso hijo (ver
+    extract_table_parallel). El extractor usa el pool del proceso hijo, que
+    se reutiliza entre las particiones que le tocan.
+    """
+    extractor = PostgreSQLExtractor(config)
+    extractor._srid_cache[(table_name, 'geometry')] = srid
+    if table_schema is not None:
+        extractor._schema_cache[table_name] = table_schema
+    params = {**partition_params, **(where_params or {})}
+    clauses = [f"({c})" for c in (where_clause, partition_clause) if c]
+    return extractor.extract_table(
+        table_name,
+        where_clause=" AND ".join(clauses) or None,
+        geometry_format=geometry_format,
+        params=params,
+        snapshot_id=snapshot_id,
+        columns=columns
+    )
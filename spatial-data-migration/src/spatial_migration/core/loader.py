@@ -1,11 +1,38 @@
-# Carga a S3 y configuraci�n de Gluefrom typing import Union, BinaryIO, Dict, Any
+# Carga a S3 y configuración de Glue
+import base64
+import hashlib
+import io
+import json
+import shutil
+from datetime import datetime, timezone
+from typing import Union, BinaryIO, Callable, Dict, Any, List, Optional, Set
 import boto3
+import numpy as np
+import pyarrow as pa
 from botocore.exceptions import ClientError
 from ..config import AWSConfig
 from ..logger import setup_logger
+from ..utils.aws import (
+    DEFAULT_PART_SIZE,
+    RateLimiter,
+    S3MultipartWriter,
+    copy_prefix,
+    list_objects
+)
+from .type_mapping import glue_type
 
 logger = setup_logger()
 
+# Campos de get_table que acepta TableInput (los demás son de sólo lectura)
+GLUE_TABLE_INPUT_KEYS = (
+    'Name', 'Description', 'Owner', 'Retention', 'StorageDescriptor',
+    'PartitionKeys', 'TableType', 'Parameters'
+)
+
+# Definición de Glue guardada junto a cada respaldo (Athena ignora los
+# objetos cuyo nombre empieza con guion bajo)
+GLUE_DEFINITION_FILE = '_glue_table.json'
+
 class AWSLoader:
     def __init__(self, config: AWSConfig):
         self.config = config
@@ -26,7 +53,9 @@ class AWSLoader:
         self,
         parquet_data: Union[bytes, BinaryIO],
         table_name: str,
-        dtypes: Dict[str, Any]
+        dtypes: Dict[str, Any],
+        s3_key: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None
     ) -> bool:
         """
         Carga datos a AWS (S3 + Glue)
@@ -35,22 +64,40 @@ class AWSLoader:
             parquet_data: Datos en formato Parquet
             table_name: Nombre de la tabla
             dtypes: Tipos de datos de las columnas
+            s3_key: Clave del archivo (por defecto el snapshot de la tabla,
+                que reemplaza a los demás archivos del prefijo)
+            rate_limiter: Límite de bytes por segundo compartido con otras
+                cargas; la subida se hace por partes para respetarlo
         
         Returns:
             bool: True si la carga fue exitosa
         """
         try:
             # Subir a S3
-            s3_key = f"spatial_data/{table_name}/{table_name}.parquet"
-            self.s3_client.upload_fileobj(
-                parquet_data,
-                self.config.bucket,
-                s3_key
-            )
+            snapshot = s3_key is None
+            s3_key = s3_key or self._s3_key(table_name)
+            if rate_limiter is None:
+                self.s3_client.upload_fileobj(
+                    parquet_data,
+                    self.config.bucket,
+                    s3_key
+                )
+            else:
+                if isinstance(parquet_data, (bytes, bytearray)):
+                    parquet_data = io.BytesIO(parquet_data)
+                with S3MultipartWriter(
+                    self.s3_client,
+                    self.config.bucket,
+                    s3_key,
+                    rate_limiter=rate_limiter
+                ) as stream:
+                    shutil.copyfileobj(parquet_data, stream, stream.part_size)
             logger.info(f"Datos cargados a S3: s3://{self.config.bucket}/{s3_key}")
+            if snapshot:
+                self._remove_stale_objects(table_name, {s3_key})
 
             # Crear tabla en Glue
-            self._create_glue_table(table_name, dtypes, s3_key)
+            self._create_glue_table(table_name, dtypes)
             
             return True
 
@@ -58,51 +105,473 @@ class AWSLoader:
             logger.error(f"Error en carga a AWS: {str(e)}")
             raise
 
-    def _create_glue_table(self, table_name: str, dtypes: Dict[str, Any], s3_key: str):
+    def load_stream_to_aws(
+        self,
+        write_parquet: Callable[[BinaryIO], Dict[str, Any]],
+        table_name: str,
+        part_size: int = DEFAULT_PART_SIZE,
+        max_concurrency: int = 4,
+        s3_key: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> bool:
+        """
+        Carga datos a AWS escribiendo el Parquet directamente en S3
+        
+        `write_parquet` recibe un `S3MultipartWriter` y debe escribir en él
+        el archivo completo; las partes se suben en paralelo mientras se
+        siguen produciendo datos, sin archivo temporal local.
+        
+        Args:
+            write_parquet: Función que escribe el Parquet en el archivo
+                recibido y devuelve los tipos de las columnas
+            table_name: Nombre de la tabla
+            part_size: Bytes por parte de la carga multiparte
+            max_concurrency: Partes que se suben en simultáneo
+            s3_key: Clave del archivo (por defecto el snapshot de la tabla,
+                que reemplaza a los demás archivos del prefijo)
+            rate_limiter: Límite de bytes por segundo compartido con otras cargas
+        
+        Returns:
+            bool: True si la carga fue exitosa
+        """
+        try:
+            snapshot = s3_key is None
+            s3_key = s3_key or self._s3_key(table_name)
+            with S3MultipartWriter(
+                self.s3_client,
+                self.config.bucket,
+                s3_key,
+                part_size=part_size,
+                max_concurrency=max_concurrency,
+                rate_limiter=rate_limiter
+            ) as stream:
+                dtypes = write_parquet(stream)
+            logger.info(f"Datos cargados a S3: s3://{self.config.bucket}/{s3_key}")
+            if snapshot:
+                self._remove_stale_objects(table_name, {s3_key})
+
+            # Crear tabla en Glue
+            self._create_glue_table(table_name, dtypes)
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Error en carga a AWS: {str(e)}")
+            raise
+
+    def load_object(
+        self,
+        data: bytes,
+        s3_key: str,
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> Dict[str, str]:
+        """
+        Sube un archivo completo verificando su checksum SHA-256 en S3
+
+        S3 rechaza el objeto si el contenido recibido no coincide con el
+        checksum enviado, de modo que un objeto presente está completo.
+
+        Args:
+            data: Contenido del archivo
+            s3_key: Clave del archivo
+            rate_limiter: Límite de bytes por segundo compartido con otras cargas
+
+        Returns:
+            Diccionario con 'checksum' (SHA-256 en hexadecimal) y 'etag'
+        """
+        digest = hashlib.sha256(data).digest()
+        if rate_limiter is not None:
+            rate_limiter.acquire(len(data))
+        response = self.s3_client.put_object(
+            Bucket=self.config.bucket,
+            Key=s3_key,
+            Body=data,
+            ChecksumSHA256=base64.b64encode(digest).decode('ascii')
+        )
+        return {'checksum': digest.hex(), 'etag': response['ETag']}
+
+    def publish_chunks(self, table_name: str, job_id: str, max_concurrency: int = 16) -> int:
+        """
+        Pasa los bloques de una corrida reanudable al prefijo de la tabla
+        
+        Los bloques se copian server-side desde el prefijo de staging y
+        después se borran los demás objetos del prefijo (el snapshot, los
+        bloques de corridas anteriores, los archivos de cambios y la marca
+        de agua), así que la tabla sólo ve filas duplicadas mientras dura
+        la copia. El staging se conserva hasta `delete_staging`: si la
+        corrida se interrumpe antes, publicarla de nuevo es seguro.
+        
+        Args:
+            table_name: Nombre de la tabla
+            job_id: Identificador de la corrida
+            max_concurrency: Copias simultáneas
+        
+        Returns:
+            Cantidad de archivos publicados
+        """
+        staging = self._staging_prefix(table_name, job_id)
+        staged = list_objects(self.s3_client, self.config.bucket, staging)
+        if not staged:
+            raise ValueError(f"La corrida {job_id} de {table_name} no tiene bloques en {staging}")
+
+        prefix = self._s3_prefix(table_name)
+        copy_prefix(
+            self.s3_client,
+            self.config.bucket,
+            staging,
+            prefix,
+            max_concurrency=max_concurrency
+        )
+        self._remove_stale_objects(
+            table_name,
+            {f"{prefix}{obj['Key'][len(staging):]}" for obj in staged}
+        )
+        logger.info(
+            f"Publicados {len(staged)} bloques de la corrida {job_id} "
+            f"en s3://{self.config.bucket}/{prefix}"
+        )
+        return len(staged)
+
+    def delete_staging(self, table_name: str, job_id: str):
+        """Borra los bloques de una corrida del prefijo de staging"""
+        staged = list_objects(
+            self.s3_client,
+            self.config.bucket,
+            self._staging_prefix(table_name, job_id)
+        )
+        self.delete_objects([obj['Key'] for obj in staged])
+
+    def register_table(self, table_name: str, dtypes: Dict[str, Any]):
+        """Crea la tabla de Glue sobre los archivos ya cargados en el prefijo de la tabla"""
+        self._create_glue_table(table_name, dtypes)
+
+    def delete_objects(self, s3_keys: List[str]):
+        """Borra objetos de S3 (las claves inexistentes se ignoran)"""
+        # delete_objects acepta hasta 1000 claves por llamada
+        for start in range(0, len(s3_keys), 1000):
+            batch = s3_keys[start:start + 1000]
+            response = self.s3_client.delete_objects(
+                Bucket=self.config.bucket,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            errors = response.get('Errors') or []
+            if errors:
+                raise RuntimeError(f"No se pudieron borrar {len(errors)} objetos: {errors[0]}")
+        if s3_keys:
+            logger.info(f"Borrados {len(s3_keys)} objetos de s3://{self.config.bucket}")
+
+    def backup_table(
+        self,
+        table_name: str,
+        backup_id: Optional[str] = None,
+        max_concurrency: int = 16
+    ) -> Optional[str]:
+        """
+        Respalda los archivos actuales de una tabla con una copia server-side
+        
+        Los objetos del prefijo de la tabla (snapshot, archivos de cambios,
+        marca de agua) se copian dentro de S3 a
+        spatial_data/_backups/<tabla>/<backup_id>/, sin pasar por este
+        host, junto con la definición de la tabla en Glue.
+        
+        Args:
+            table_name: Nombre de la tabla
+            backup_id: Identificador del respaldo (por defecto la fecha UTC)
+            max_concurrency: Copias simultáneas
+        
+        Returns:
+            Identificador del respaldo, o None si la tabla no tiene archivos
+        """
+        try:
+            backup_id = backup_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+            prefix = self._backup_prefix(table_name, backup_id)
+            objects, _ = copy_prefix(
+                self.s3_client,
+                self.config.bucket,
+                self._s3_prefix(table_name),
+                prefix,
+                max_concurrency=max_concurrency
+            )
+            if not objects:
+                logger.info(f"La tabla {table_name} no tiene archivos que respaldar")
+                return None
+
+            table_input = self._glue_table_input(table_name)
+            if table_input is not None:
+                self.s3_client.put_object(
+                    Bucket=self.config.bucket,
+                    Key=f"{prefix}{GLUE_DEFINITION_FILE}",
+                    Body=json.dumps(table_input, default=str).encode('utf-8')
+                )
+            logger.info(f"Respaldo {backup_id} de {table_name}: s3://{self.config.bucket}/{prefix}")
+            return backup_id
+
+        except Exception as e:
+            logger.error(f"Error respaldando {table_name}: {str(e)}")
+            raise
+
+    def list_backups(self, table_name: str) -> List[str]:
+        """Identificadores de los respaldos de una tabla, del más antiguo al más reciente"""
+        prefix = self._backup_prefix(table_name, '')
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        backups = []
+        for page in paginator.paginate(Bucket=self.config.bucket, Prefix=prefix, Delimiter='/'):
+            for common in page.get('CommonPrefixes', []):
+                backups.append(common['Prefix'][len(prefix):].rstrip('/'))
+        return sorted(backups)
+
+    def restore_table(self, table_name: str, backup_id: Optional[str] = None) -> str:
+        """
+        Restaura una tabla apuntando su ubicación de Glue a un respaldo
+        
+        No se copian datos: la tabla pasa a leer el prefijo del respaldo,
+        con las columnas que tenía al respaldarse. La próxima migración de
+        la tabla vuelve a apuntarla a su prefijo habitual.
+        
+        Args:
+            table_name: Nombre de la tabla
+            backup_id: Respaldo a restaurar (por defecto el más reciente)
+        
+        Returns:
+            Nueva ubicación de la tabla
+        """
+        try:
+            if backup_id is None:
+                backups = self.list_backups(table_name)
+                if not backups:
+                    raise ValueError(f"La tabla {table_name} no tiene respaldos")
+                backup_id = backups[-1]
+            prefix = self._backup_prefix(table_name, backup_id)
+
+            try:
+                response = self.s3_client.get_object(
+                    Bucket=self.config.bucket,
+                    Key=f"{prefix}{GLUE_DEFINITION_FILE}"
+                )
+                table_input = json.loads(response['Body'].read())
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+                    raise
+                table_input = self._glue_table_input(table_name)
+                if table_input is None:
+                    raise ValueError(
+                        f"El respaldo {backup_id} no tiene la definición de {table_name} "
+                        "y la tabla no existe en Glue"
+                    )
+
+            location = f"s3://{self.config.bucket}/{prefix}"
+            table_input['Name'] = table_name
+            table_input['StorageDescriptor']['Location'] = location
+            try:
+                self.glue_client.update_table(
+                    DatabaseName=self.config.glue_database,
+                    TableInput=table_input
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'EntityNotFoundException':
+                    raise
+                self.glue_client.create_table(
+                    DatabaseName=self.config.glue_database,
+                    TableInput=table_input
+                )
+            logger.info(f"Tabla {table_name} restaurada desde el respaldo {backup_id}: {location}")
+            return location
+
+        except Exception as e:
+            logger.error(f"Error restaurando {table_name}: {str(e)}")
+            raise
+
+    def _glue_table_input(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Definición actual de la tabla en Glue como TableInput, o None si no existe"""
+        try:
+            table = self.glue_client.get_table(
+                DatabaseName=self.config.glue_database,
+                Name=table_name
+            )['Table']
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'EntityNotFoundException':
+                return None
+            raise
+        return {key: table[key] for key in GLUE_TABLE_INPUT_KEYS if key in table}
+
+    def load_watermark(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Lee la marca de agua guardada por la última carga incremental
+        
+        Args:
+            table_name: Nombre de la tabla
+        
+        Returns:
+            Diccionario con 'column' y 'value', o None si no hay marca
+        """
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.config.bucket,
+                Key=self._watermark_key(table_name)
+            )
+            return json.loads(response['Body'].read())
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return None
+            raise
+
+    def save_watermark(self, table_name: str, column: str, value: Any):
+        """
+        Guarda la marca de agua junto a los archivos de la tabla
+        
+        Args:
+            table_name: Nombre de la tabla
+            column: Columna de fecha de modificación
+            value: Máximo de la columna incluido en la carga
+        """
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        key = self._watermark_key(table_name)
+        self.s3_client.put_object(
+            Bucket=self.config.bucket,
+            Key=key,
+            Body=json.dumps({'column': column, 'value': value}).encode('utf-8')
+        )
+        logger.info(f"Marca de agua de {table_name}: {column} = {value}")
+
+    def load_replication_lsn(self, slot_name: str) -> int:
+        """
+        Lee el LSN del último lote de replicación persistido
+        
+        Args:
+            slot_name: Nombre del slot de replicación
+        
+        Returns:
+            LSN como entero, o 0 si el slot nunca se consumió
+        """
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.config.bucket,
+                Key=self._replication_key(slot_name)
+            )
+            return int(json.loads(response['Body'].read())['lsn'])
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return 0
+            raise
+
+    def save_replication_lsn(self, slot_name: str, lsn: int):
+        """
+        Guarda el LSN hasta el que los cambios ya están en S3
+        
+        Args:
+            slot_name: Nombre del slot de replicación
+            lsn: LSN final del último lote cargado
+        """
+        self.s3_client.put_object(
+            Bucket=self.config.bucket,
+            Key=self._replication_key(slot_name),
+            Body=json.dumps({'lsn': lsn}).encode('utf-8')
+        )
+
+    def delta_key(self, table_name: str, run_id: str) -> str:
+        """Clave de S3 de un archivo de cambios, junto al snapshot de la tabla"""
+        return f"{self._s3_prefix(table_name)}{table_name}_delta_{run_id}.parquet"
+
+    def chunk_key(self, table_name: str, job_id: str, index: int) -> str:
+        """Clave de S3 de un bloque de una corrida reanudable, en el staging de la corrida"""
+        return f"{self._staging_prefix(table_name, job_id)}{table_name}_{job_id}_{index:05d}.parquet"
+
+    def _s3_prefix(self, table_name: str) -> str:
+        """Prefijo de S3 con todos los archivos de una tabla"""
+        return f"spatial_data/{table_name}/"
+
+    def _s3_key(self, table_name: str) -> str:
+        """Clave de S3 del archivo Parquet de una tabla"""
+        return f"{self._s3_prefix(table_name)}{table_name}.parquet"
+
+    def _staging_prefix(self, table_name: str, job_id: str) -> str:
+        """Prefijo de los bloques de una corrida reanudable, fuera del prefijo que lee la tabla"""
+        return f"spatial_data/_staging/{table_name}/{job_id}/"
+
+    def _remove_stale_objects(self, table_name: str, keep: Set[str]):
+        """
+        Borra los objetos del prefijo de la tabla que no están en `keep`
+        
+        Se usa al escribir un snapshot completo: los archivos de cambios y
+        los bloques anteriores ya están incluidos en él, y la marca de agua
+        también se borra para que la próxima carga incremental parta de
+        este snapshot y no de la historia reemplazada.
+        """
+        prefix = self._s3_prefix(table_name)
+        stale = [
+            obj['Key'] for obj in list_objects(self.s3_client, self.config.bucket, prefix)
+            if obj['Key'] not in keep
+        ]
+        self.delete_objects(stale)
+
+    def _backup_prefix(self, table_name: str, backup_id: str) -> str:
+        """Prefijo de un respaldo, fuera del prefijo que lee la tabla"""
+        prefix = f"spatial_data/_backups/{table_name}/"
+        return f"{prefix}{backup_id}/" if backup_id else prefix
+
+    def _watermark_key(self, table_name: str) -> str:
+        # Athena ignora los objetos cuyo nombre empieza con guion bajo
+        return f"{self._s3_prefix(table_name)}_watermark.json"
+
+    def _replication_key(self, slot_name: str) -> str:
+        return f"spatial_data/_replication/{slot_name}.json"
+
+    def _create_glue_table(self, table_name: str, dtypes: Dict[str, Any]):
         """Crea tabla en el catálogo de Glue"""
+        table_input = {
+            'Name': table_name,
+            'StorageDescriptor': {
+                'Columns': self._get_glue_columns(dtypes),
+                # La ubicación es el prefijo para incluir los archivos de cambios
+                'Location': f"s3://{self.config.bucket}/{self._s3_prefix(table_name)}",
+                'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
+                'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
+                'SerdeInfo': {
+                    'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
+                }
+            },
+            'TableType': 'EXTERNAL_TABLE'
+        }
         try:
-            columns = self._get_glue_columns(dtypes)
-            
             self.glue_client.create_table(
                 DatabaseName=self.config.glue_database,
-                TableInput={
-                    'Name': table_name,
-                    'StorageDescriptor': {
-                        'Columns': columns,
-                        'Location': f"s3://{self.config.bucket}/{s3_key}",
-                        'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
-                        'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
-                        'SerdeInfo': {
-                            'SerializationLibrary': 'org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe'
-                        }
-                    },
-                    'TableType': 'EXTERNAL_TABLE'
-                }
+                TableInput=table_input
             )
             logger.info(f"Tabla {table_name} creada en Glue")
 
         except ClientError as e:
             if e.response['Error']['Code'] == 'AlreadyExistsException':
                 logger.warning(f"La tabla {table_name} ya existe en Glue, actualizando...")
-                # Aquí podrías implementar la lógica para actualizar la tabla
+                # Actualiza las columnas y vuelve a apuntar al prefijo vigente,
+                # por ejemplo después de restaurar un respaldo
+                self.glue_client.update_table(
+                    DatabaseName=self.config.glue_database,
+                    TableInput=table_input
+                )
             else:
                 raise
 
     def _get_glue_columns(self, dtypes: Dict[str, Any]) -> list:
-        """Convierte tipos de pandas a tipos de Glue"""
-        type_mapping = {
-            'int64': 'bigint',
-            'float64': 'double',
-            'object': 'string',
-            'bool': 'boolean',
-            'datetime64[ns]': 'timestamp'
-        }
-        
+        """Convierte tipos Arrow (o tipos de pandas) a tipos de Glue"""
         columns = []
         for column, dtype in dtypes.items():
             columns.append({
                 'Name': column,
-                'Type': type_mapping.get(str(dtype), 'string')
+                'Type': self._get_glue_type(self._arrow_dtype(dtype))
             })
         
         return columns
+
+    def _arrow_dtype(self, dtype: Any) -> pa.DataType:
+        """Tipo Arrow equivalente a un tipo de pandas; 'object' y otros pasan a texto"""
+        if isinstance(dtype, pa.DataType):
+            return dtype
+        try:
+            return pa.from_numpy_dtype(np.dtype(dtype))
+        except (TypeError, pa.ArrowException):
+            return pa.string()
+
+    def _get_glue_type(self, arrow_type: pa.DataType) -> str:
+        """Convierte un tipo Arrow (por ejemplo de un esquema Parquet) a tipo de Glue"""
+        return glue_type(arrow_type)
@@ -0,0 +1,370 @@
+# Consumo de cambios por replicación lógica
+
+# src/spatial_migration/core/replication.py
+import json
+import select
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import pandas as pd
+import pyarrow as pa
+import shapely
+import psycopg2
+from psycopg2.extras import LogicalReplicationConnection
+from ..config import PostgresConfig
+from ..logger import setup_logger
+from ..models.schemas import ChangeBatch, PostgresTableSchema
+from ..utils.db import get_connection_provider
+from .transformer import encode_geometry
+from .type_mapping import arrow_column_types
+
+logger = setup_logger()
+
+# Acciones de wal2json (format-version 2) que se registran en los archivos de cambios
+CHANGE_ACTIONS = {'I': 'insert', 'U': 'update', 'D': 'delete'}
+
+# Columnas agregadas a cada fila de cambio
+OPERATION_COLUMN = '_op'
+LSN_COLUMN = '_lsn'
+
+# Sufijo de la tabla de cambios de cada tabla de destino
+CHANGES_TABLE_SUFFIX = '_changes'
+
+def format_lsn(lsn: int) -> str:
+    """Formatea un LSN entero como lo muestra PostgreSQL (por ejemplo 0/16B3748)"""
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+class ChangeBatcher:
+    """
+    Agrupa los mensajes de wal2json en lotes acotados.
+
+    Los cambios de una transacción se acumulan hasta su COMMIT, de modo
+    que un lote siempre termina en un límite de transacción y su LSN final
+    es un punto de reanudación válido. Un lote se cierra al superar
+    `max_rows` filas o `max_bytes` bytes de mensajes, o cuando el cambio
+    más antiguo lleva `max_latency` segundos esperando.
+    """
+
+    def __init__(
+        self,
+        tables: List[str],
+        max_rows: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_latency: float = 60,
+        start_lsn: int = 0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.tables = set(tables)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.last_commit_lsn = start_lsn
+        self._start_lsn = start_lsn
+        self._clock = clock
+
+        self._transaction: List[Dict[str, Any]] = []
+        self._transaction_bytes = 0
+        self._changes: Dict[str, List[Dict[str, Any]]] = {}
+        self._rows = 0
+        self._bytes = 0
+        self._first_change_at: Optional[float] = None
+        self._batch_start_lsn: Optional[int] = None
+
+    @property
+    def pending(self) -> bool:
+        """Indica si hay cambios confirmados que aún no se entregaron"""
+        return self._rows > 0
+
+    def add(self, payload: str, lsn: int) -> Optional[ChangeBatch]:
+        """
+        Procesa un mensaje de wal2json
+
+        Args:
+            payload: Mensaje JSON (format-version 2)
+            lsn: LSN del mensaje (data_start)
+
+        Returns:
+            ChangeBatch si el COMMIT de este mensaje completó un lote
+        """
+        message = json.loads(payload)
+        action = message['action']
+
+        if action == 'B':
+            self._transaction = []
+            self._transaction_bytes = 0
+        elif action in CHANGE_ACTIONS:
+            table = f"{message['schema']}.{message['table']}"
+            if table in self.tables:
+                self._transaction.append(self._change_row(table, message, lsn))
+                self._transaction_bytes += len(payload)
+        elif action == 'C':
+            return self._commit(lsn)
+        return None
+
+    def poll(self) -> Optional[ChangeBatch]:
+        """Cierra el lote pendiente si superó la latencia máxima"""
+        if self._first_change_at is None:
+            return None
+        if self._clock() - self._first_change_at >= self.max_latency:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[ChangeBatch]:
+        """Entrega los cambios confirmados acumulados, si los hay"""
+        if not self._rows:
+            return None
+        batch = ChangeBatch(
+            start_lsn=self._batch_start_lsn,
+            end_lsn=self.last_commit_lsn,
+            changes=self._changes
+        )
+        self._changes = {}
+        self._rows = 0
+        self._bytes = 0
+        self._first_change_at = None
+        self._batch_start_lsn = None
+        return batch
+
+    def _commit(self, lsn: int) -> Optional[ChangeBatch]:
+        transaction, self._transaction = self._transaction, []
+        size, self._transaction_bytes = self._transaction_bytes, 0
+
+        # Transacciones ya incluidas antes del último checkpoint
+        if lsn <= self._start_lsn:
+            return None
+        self.last_commit_lsn = lsn
+        if not transaction:
+            return None
+
+        if self._batch_start_lsn is None:
+            self._batch_start_lsn = transaction[0][LSN_COLUMN]
+            self._first_change_at = self._clock()
+        for row in transaction:
+            self._changes.setdefault(row.pop('_table'), []).append(row)
+        self._rows += len(transaction)
+        self._bytes += size
+
+        if (
+            self._rows >= self.max_rows
+            or self._bytes >= self.max_bytes
+            or self._clock() - self._first_change_at >= self.max_latency
+        ):
+            return self.flush()
+        return None
+
+    def _change_row(self, table: str, message: Dict[str, Any], lsn: int) -> Dict[str, Any]:
+        # Los DELETE sólo traen la identidad (clave) de la fila
+        columns = message.get('columns') or message.get('identity') or []
+        row = {'_table': table, OPERATION_COLUMN: message['action'], LSN_COLUMN: lsn}
+        for column in columns:
+            value = column['value']
+            if value is not None and column['type'].split('.')[-1].startswith('geometry'):
+                # La salida de texto de PostGIS es EWKB en hexadecimal
+                value = shapely.from_wkb(value)
+            row[column['name']] = value
+        return row
+
+class LogicalReplicationSource:
+    """
+    Fuente de cambios de un slot de replicación lógica con wal2json.
+
+    `stream` entrega lotes de cambios de las tablas indicadas. El avance
+    del slot (`send_feedback`) se confirma recién cuando se pide el lote
+    siguiente, es decir, después de que quien consume persistió el lote
+    anterior y su checkpoint; si el proceso se detiene antes, PostgreSQL
+    vuelve a enviar esos cambios en la próxima corrida.
+    """
+
+    def __init__(
+        self,
+        config: PostgresConfig,
+        slot_name: str,
+        tables: List[str],
+        max_rows: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_latency: float = 60,
+        status_interval: float = 10
+    ):
+        self.config = config
+        self.slot_name = slot_name
+        self.tables = tables
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.status_interval = status_interval
+
+    def connect(self):
+        """Abre una conexión de replicación lógica"""
+        # Las conexiones de replicación no pueden venir del pool, pero usan
+        # las mismas credenciales (y el mismo token IAM)
+        return psycopg2.connect(
+            connection_factory=LogicalReplicationConnection,
+            **get_connection_provider(self.config).connection_params()
+        )
+
+    def create_slot(self) -> bool:
+        """
+        Crea el slot de replicación si no existe
+
+        Returns:
+            bool: True si el slot se creó en esta llamada
+        """
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.create_replication_slot(self.slot_name, output_plugin='wal2json')
+                logger.info(f"Slot de replicación {self.slot_name} creado")
+                return True
+            except psycopg2.errors.DuplicateObject:
+                return False
+        finally:
+            conn.close()
+
+    def stream(
+        self,
+        start_lsn: int = 0,
+        stop: Optional[threading.Event] = None
+    ) -> Iterator[ChangeBatch]:
+        """
+        Consume el slot y entrega lotes de cambios
+
+        Args:
+            start_lsn: LSN del último lote persistido; las transacciones
+                confirmadas hasta ese LSN se descartan
+            stop: Evento para terminar el consumo (el lote pendiente se
+                entrega antes de salir)
+
+        Yields:
+            ChangeBatch con los cambios por tabla
+        """
+        batcher = ChangeBatcher(
+            self.tables,
+            max_rows=self.max_rows,
+            max_bytes=self.max_bytes,
+            max_latency=self.max_latency,
+            start_lsn=start_lsn
+        )
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.start_replication(
+                slot_name=self.slot_name,
+                decode=True,
+                start_lsn=start_lsn,
+                status_interval=self.status_interval,
+                options={
+                    'format-version': '2',
+                    'include-types': '1',
+                    # Los numeric llegan como texto, sin pasar por float
+                    'numeric-data-types-as-string': '1',
+                    'add-tables': ','.join(self.tables)
+                }
+            )
+            logger.info(
+                f"Consumiendo slot {self.slot_name} desde {format_lsn(start_lsn)} "
+                f"para {', '.join(self.tables)}"
+            )
+
+            confirmed = start_lsn
+            while stop is None or not stop.is_set():
+                message = cursor.read_message()
+                if message is not None:
+                    batch = batcher.add(message.payload, message.data_start)
+                else:
+                    batch = batcher.poll()
+                    if batch is None:
+                        if not batcher.pending and batcher.last_commit_lsn > confirmed:
+                            # Sin cambios pendientes: el slot puede liberar el WAL
+                            # de las transacciones que no tocaron estas tablas
+                            confirmed = batcher.last_commit_lsn
+                            cursor.send_feedback(flush_lsn=confirmed)
+                        select.select([cursor], [], [], min(self.max_latency, self.status_interval))
+                        continue
+
+                if batch is not None:
+                    yield batch
+                    confirmed = batch.end_lsn
+                    cursor.send_feedback(flush_lsn=confirmed)
+
+            batch = batcher.flush()
+            if batch is not None:
+                yield batch
+                cursor.send_feedback(flush_lsn=batch.end_lsn)
+
+        except Exception as e:
+            logger.error(f"Error consumiendo el slot {self.slot_name}: {str(e)}")
+            raise
+        finally:
+            conn.close()
+
+def changes_table(table_name: str) -> str:
+    """Nombre de la tabla de cambios de una tabla de destino"""
+    return f"{table_name}{CHANGES_TABLE_SUFFIX}"
+
+def change_schema(table_schema: PostgresTableSchema) -> pa.Schema:
+    """
+    Esquema fijo de los archivos de cambios de una tabla
+
+    Las columnas llevan los tipos Arrow del snapshot derivados de
+    PostgreSQL (ver `arrow_column_types`), precedidas por _op y _lsn. La
+    geometría va como WKT, y como texto las columnas sin correspondencia
+    exacta y los arreglos, que wal2json entrega como literal de PostgreSQL.
+
+    Args:
+        table_schema: Schema de la tabla de origen
+
+    Returns:
+        pa.Schema de los archivos de cambios
+    """
+    column_types = arrow_column_types(table_schema)
+    fields = [pa.field(OPERATION_COLUMN, pa.string()), pa.field(LSN_COLUMN, pa.int64())]
+    for column in table_schema.columns:
+        target = column_types.get(column, pa.string())
+        if pa.types.is_list(target):
+            target = pa.string()
+        fields.append(pa.field(column, target))
+    return pa.schema(fields)
+
+def changes_to_table(rows: List[Dict[str, Any]], schema: pa.Schema) -> pa.Table:
+    """
+    Convierte las filas de cambio de una tabla al esquema de sus archivos de cambios
+
+    wal2json entrega las fechas y los números como texto; cada columna se
+    convierte al tipo del esquema en lugar de inferirlo lote a lote. Las
+    columnas que no trae un DELETE (sólo la identidad) quedan nulas, y
+    las que no están en el esquema se descartan.
+
+    Args:
+        rows: Filas de un ChangeBatch para una tabla
+        schema: Esquema de `change_schema`
+
+    Returns:
+        pa.Table con el esquema indicado
+    """
+    arrays = [_change_array([row.get(field.name) for row in rows], field.type) for field in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _change_array(values: List[Any], target: pa.DataType) -> pa.Array:
+    """Columna de cambios con el tipo indicado, convertida desde texto si hace falta"""
+    if pa.types.is_binary(target):
+        # bytea llega en hexadecimal (\x...)
+        return pa.array(
+            [bytes.fromhex(v[2:]) if isinstance(v, str) else v for v in values],
+            type=target
+        )
+    if any(isinstance(value, shapely.Geometry) for value in values):
+        # Misma codificación que el snapshot: WKT con la precisión completa
+        return pa.array(encode_geometry(pd.Series(values, dtype=object), 'wkt'), type=target)
+    try:
+        return pa.array(values, type=target)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        text = [None if value is None else _change_text(value) for value in values]
+        return pa.array(text, type=pa.string()).cast(target)
+
+def _change_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
@@ -1,42 +1,575 @@
-# Transformaci�n de datos espaciales
+# Transformación de datos espaciales
 
-from typing import Union, BinaryIO
+import json
+from tempfile import SpooledTemporaryFile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union, BinaryIO
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
+import shapely
+from geopandas.array import GeometryDtype
 from io import BytesIO
 from ..logger import setup_logger
+from ..utils.pipeline import StageTimer, map_ordered
+from ..utils.spatial import spatial_sort_key
+from .type_mapping import apply_column_types, dictionary_columns
 
 logger = setup_logger()
 
+GEOMETRY_ENCODINGS = ('wkt', 'wkb')
+
+GEOPARQUET_VERSION = '1.1.0'
+
+BBOX_FIELDS = ('xmin', 'ymin', 'xmax', 'ymax')
+
+# Tamaño a partir del cual el Parquet en construcción pasa de memoria a disco
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+# Filas por row group cuando se ordena espacialmente y no se indica otro valor:
+# row groups pequeños cubren regiones compactas y sus estadísticas filtran mejor
+SPATIAL_ROW_GROUP_SIZE = 10000
+
+def encode_geometry(geometries: gpd.GeoSeries, encoding: str = 'wkt') -> np.ndarray:
+    """
+    Codifica una serie de geometrías a WKT o WKB de una sola vez.
+
+    Usa las funciones vectorizadas de shapely 2 sobre el arreglo completo
+    en lugar de llamar a `.wkt` fila por fila. Las geometrías nulas quedan
+    como None (nulo en Parquet) en vez de un valor de relleno como
+    'MULTIPOLYGON EMPTY'.
+
+    Args:
+        geometries: Serie de geometrías
+        encoding: 'wkt' (texto) o 'wkb' (binario)
+
+    Returns:
+        Arreglo de objetos con str/bytes o None por geometría
+    """
+    if encoding not in GEOMETRY_ENCODINGS:
+        raise ValueError(f"Codificación de geometría no soportada: {encoding}")
+
+    values = np.asarray(geometries.values, dtype=object)
+    if encoding == 'wkb':
+        return shapely.to_wkb(values)
+    # rounding_precision=-1 conserva la precisión completa, igual que `.wkt`
+    return shapely.to_wkt(values, rounding_precision=-1)
+
+def geometry_columns(df: pd.DataFrame) -> List[str]:
+    """Devuelve las columnas de un DataFrame con tipo geometría"""
+    return [col for col in df.columns if isinstance(df[col].dtype, GeometryDtype)]
+
+def bbox_covering(geometries: gpd.GeoSeries) -> pa.StructArray:
+    """
+    Calcula la columna de cobertura `bbox` de GeoParquet 1.1.
+
+    Args:
+        geometries: Serie de geometrías
+
+    Returns:
+        StructArray {xmin, ymin, xmax, ymax} por fila, nulo si la geometría es nula
+    """
+    values = np.asarray(geometries.values, dtype=object)
+    bounds = shapely.bounds(values)
+    mask = shapely.is_missing(values)
+    return pa.StructArray.from_arrays(
+        [pa.array(bounds[:, i], type=pa.float64()) for i in range(4)],
+        names=list(BBOX_FIELDS),
+        mask=pa.array(mask)
+    )
+
+def geometry_statistics(gdf: gpd.GeoDataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Tipos de geometría y extensión de cada columna geométrica.
+
+    Returns:
+        Diccionario columna -> {'geometry_types': set, 'bbox': lista o None}
+    """
+    statistics = {}
+    for col in geometry_columns(gdf):
+        present = gdf[col][~gdf[col].isna()]
+        statistics[col] = {'geometry_types': set(), 'bbox': None}
+        if len(present):
+            suffixes = np.where(present.has_z, ' Z', '')
+            statistics[col]['geometry_types'] = set(present.geom_type + suffixes)
+            statistics[col]['bbox'] = [float(v) for v in present.total_bounds]
+    return statistics
+
+def merge_geometry_statistics(
+    total: Dict[str, Dict[str, Any]],
+    statistics: Dict[str, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Acumula en `total` las estadísticas de un bloque (ver `geometry_statistics`)"""
+    for col, current in statistics.items():
+        merged = total.setdefault(col, {'geometry_types': set(), 'bbox': None})
+        merged['geometry_types'] |= current['geometry_types']
+        if current['bbox'] is None:
+            continue
+        if merged['bbox'] is None:
+            merged['bbox'] = list(current['bbox'])
+        else:
+            merged['bbox'] = (
+                [min(a, b) for a, b in zip(merged['bbox'][:2], current['bbox'][:2])]
+                + [max(a, b) for a, b in zip(merged['bbox'][2:], current['bbox'][2:])]
+            )
+    return total
+
+def apply_geometry_statistics(
+    metadata: Dict[str, Any],
+    statistics: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Completa los tipos de geometría y la extensión de los metadatos `geo`"""
+    for col, current in statistics.items():
+        column = metadata['columns'][col]
+        column['geometry_types'] = sorted(current['geometry_types'])
+        if current['bbox'] is not None:
+            column['bbox'] = current['bbox']
+    return metadata
+
+def geo_metadata(
+    gdf: gpd.GeoDataFrame,
+    covering: bool = True,
+    statistics: bool = True
+) -> Dict[str, Any]:
+    """
+    Construye los metadatos `geo` de GeoParquet 1.1 para un GeoDataFrame.
+
+    Args:
+        gdf: GeoDataFrame con al menos una columna de geometría
+        covering: Si se declara la columna `bbox` como cobertura de la
+            geometría principal
+        statistics: Si se calculan los tipos de geometría y la extensión;
+            sin ellos los tipos quedan como desconocidos (lista vacía) y
+            se omite `bbox`, por ejemplo para completarlos al cerrar un
+            archivo escrito por bloques (ver `apply_geometry_statistics`)
+
+    Returns:
+        Diccionario serializable a JSON
+    """
+    columns = {}
+    for col in geometry_columns(gdf):
+        geometries = gdf[col]
+        columns[col] = {
+            'encoding': 'WKB',
+            'geometry_types': [],
+            'crs': geometries.crs.to_json_dict() if geometries.crs else None
+        }
+
+    primary = gdf.geometry.name
+    if covering:
+        columns[primary]['covering'] = {
+            'bbox': {field: ['bbox', field] for field in BBOX_FIELDS}
+        }
+
+    metadata = {
+        'version': GEOPARQUET_VERSION,
+        'primary_column': primary,
+        'columns': columns
+    }
+    if statistics:
+        apply_geometry_statistics(metadata, geometry_statistics(gdf))
+    return metadata
+
 class SpatialTransformer:
-    def transform_to_parquet(self, gdf: gpd.GeoDataFrame) -> Union[bytes, BinaryIO]:
+    def transform_to_parquet(
+        self,
+        gdf: gpd.GeoDataFrame,
+        geometry_encoding: str = 'wkt',
+        spatial_sort: Optional[str] = None,
+        row_group_size: Optional[int] = None,
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        dictionary_encoding: bool = False
+    ) -> Union[bytes, BinaryIO]:
         """
         Transforma GeoDataFrame a formato Parquet
         
         Args:
             gdf: GeoDataFrame a transformar
+            geometry_encoding: Codificación de las columnas de geometría
+                ('wkt' por defecto o 'wkb')
+            spatial_sort: Curva para agrupar las filas por cercanía
+                ('hilbert' o 'zorder'); None conserva el orden original
+            row_group_size: Máximo de filas por row group
+            column_types: Tipos Arrow por columna derivados de PostgreSQL
+                (ver `type_mapping.arrow_column_types`)
+            dictionary_encoding: Codificar como diccionario las columnas de
+                texto de baja cardinalidad
         
         Returns:
             Datos en formato Parquet
         """
+        if gdf.empty:
+            raise ValueError("No hay registros para transformar")
+
         try:
-            # Convertir geometrías a WKT
-            df = pd.DataFrame(gdf)
-            if 'geometry' in df.columns:
-                df['geometry'] = df['geometry'].apply(lambda x: x.wkt)
+            if spatial_sort:
+                gdf = self.sort_spatially(gdf, spatial_sort)
 
             # Convertir a Parquet
-            table = pa.Table.from_pandas(df)
+            table = self.to_arrow_table(gdf, geometry_encoding, column_types=column_types)
+            if dictionary_encoding:
+                table = self._encode_dictionaries(table, geometry_columns(gdf))
             
             buffer = BytesIO()
-            pq.write_table(table, buffer)
+            pq.write_table(
+                table,
+                buffer,
+                row_group_size=self._row_group_size(row_group_size, spatial_sort)
+            )
             buffer.seek(0)
             
-            logger.info(f"Datos transformados a Parquet: {len(df)} registros")
+            logger.info(f"Datos transformados a Parquet: {table.num_rows} registros")
             return buffer
 
         except Exception as e:
             logger.error(f"Error en transformación a Parquet: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def transform_chunks_to_parquet(
+        self,
+        chunks: Iterable[gpd.GeoDataFrame],
+        output_format: str = 'parquet',
+        geometry_encoding: str = 'wkt',
+        row_group_size: Optional[int] = None,
+        spool_max_size: int = SPOOL_MAX_SIZE,
+        spatial_sort: Optional[str] = None,
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        dictionary_encoding: bool = False,
+        transform_workers: int = 0,
+        timer: Optional[StageTimer] = None
+    ) -> BinaryIO:
+        """
+        Transforma un flujo de GeoDataFrames en un único archivo Parquet.
+
+        El archivo se escribe con `write_chunks` en un
+        `SpooledTemporaryFile`, que pasa a disco al superar
+        `spool_max_size`, y se devuelve abierto y al inicio para que
+        `AWSLoader` lo suba sin otra copia.
+
+        Args:
+            chunks: Iterable de GeoDataFrames con el mismo esquema
+            output_format: 'parquet' (geometría según `geometry_encoding`)
+                o 'geoparquet'
+            geometry_encoding: Codificación de la geometría en modo 'parquet'
+            row_group_size: Máximo de filas por row group (por defecto un
+                row group por bloque)
+            spool_max_size: Bytes que se mantienen en memoria antes de
+                pasar a un archivo temporal
+            spatial_sort: Curva de ordenamiento espacial (ver `write_chunks`)
+            column_types: Tipos Arrow por columna (ver `write_chunks`)
+            dictionary_encoding: Ver `write_chunks`
+            transform_workers: Hilos de transformación (ver `write_chunks`)
+            timer: Acumulador del tiempo de las etapas
+
+        Returns:
+            Archivo temporal con los datos en formato Parquet
+        """
+        sink = SpooledTemporaryFile(max_size=spool_max_size)
+        try:
+            self.write_chunks(
+                chunks,
+                sink,
+                output_format=output_format,
+                geometry_encoding=geometry_encoding,
+                row_group_size=row_group_size,
+                spatial_sort=spatial_sort,
+                column_types=column_types,
+                dictionary_encoding=dictionary_encoding,
+                transform_workers=transform_workers,
+                timer=timer
+            )
+        except Exception:
+            sink.close()
+            raise
+
+        sink.seek(0)
+        return sink
+
+    def write_chunks(
+        self,
+        chunks: Iterable[gpd.GeoDataFrame],
+        sink: BinaryIO,
+        output_format: str = 'parquet',
+        geometry_encoding: str = 'wkt',
+        row_group_size: Optional[int] = None,
+        spatial_sort: Optional[str] = None,
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        dictionary_encoding: bool = False,
+        transform_workers: int = 0,
+        timer: Optional[StageTimer] = None,
+        schema: Optional[pa.Schema] = None
+    ) -> pa.Schema:
+        """
+        Escribe un flujo de GeoDataFrames como Parquet en un archivo abierto.
+
+        Cada bloque se agrega como uno o más row groups con
+        `pq.ParquetWriter`, de modo que sólo un bloque está en memoria a la
+        vez. El destino sólo necesita `write` y `tell`, por lo que puede
+        ser un `S3MultipartWriter` que sube las partes mientras se
+        escriben los siguientes bloques. El destino no se cierra.
+
+        En GeoParquet los tipos de geometría y la extensión se acumulan
+        bloque a bloque y los metadatos `geo` se escriben en el pie al
+        cerrar el archivo, con el mismo contenido que en
+        `transform_to_geoparquet`.
+
+        Args:
+            chunks: Iterable de GeoDataFrames con el mismo esquema
+            sink: Archivo de destino
+            output_format: 'parquet' o 'geoparquet'
+            geometry_encoding: Codificación de la geometría en modo 'parquet'
+            row_group_size: Máximo de filas por row group
+            spatial_sort: Curva de ordenamiento espacial; se aplica dentro
+                de cada bloque, ya que el archivo se escribe sin reunir la
+                tabla completa
+            column_types: Tipos Arrow por columna derivados de PostgreSQL;
+                fijan el esquema del archivo aunque un bloque traiga
+                enteros con nulos o decimales inferidos por pandas
+            dictionary_encoding: Codificar como diccionario las columnas de
+                texto de baja cardinalidad; se decide con el primer bloque
+                y los siguientes se convierten al mismo esquema
+            transform_workers: Hilos que convierten los bloques a Arrow
+                (ordenamiento y codificación de la geometría) mientras se
+                escribe el bloque anterior; 0 convierte cada bloque en el
+                mismo hilo que escribe
+            timer: Acumulador del tiempo de las etapas de transformación y
+                escritura
+            schema: Esquema fijo del archivo, por ejemplo el de otro archivo
+                de la misma tabla; los bloques se convierten a él y no se
+                decide la codificación por diccionario
+
+        Returns:
+            Esquema Arrow del archivo escrito
+        """
+        if output_format not in ('parquet', 'geoparquet'):
+            raise ValueError(f"Formato de salida no soportado: {output_format}")
+
+        def prepare(gdf: gpd.GeoDataFrame) -> Optional[Tuple[pa.Table, List[str], Dict[str, Any]]]:
+            if gdf.empty:
+                return None
+            if spatial_sort:
+                gdf = self.sort_spatially(gdf, spatial_sort)
+            if output_format == 'geoparquet':
+                table = self.to_geoarrow_table(gdf, statistics=False, column_types=column_types)
+                return table, geometry_columns(gdf), geometry_statistics(gdf)
+            table = self.to_arrow_table(
+                gdf, geometry_encoding, preserve_index=False, column_types=column_types
+            )
+            return table, geometry_columns(gdf), {}
+
+        if transform_workers > 0:
+            prepared = map_ordered(
+                prepare, chunks, workers=transform_workers, name='transformación', timer=timer
+            )
+        else:
+            prepared = map(prepare, chunks)
+
+        writer = None
+        total = 0
+        statistics: Dict[str, Dict[str, Any]] = {}
+        row_group_size = self._row_group_size(row_group_size, spatial_sort)
+        try:
+            for entry in prepared:
+                if entry is None:
+                    continue
+                table, geometry_names, chunk_statistics = entry
+                started = time.perf_counter()
+
+                if writer is None:
+                    geo = table.schema.metadata.get(b'geo') if table.schema.metadata else None
+                    if schema is not None:
+                        table = table.cast(schema)
+                    elif dictionary_encoding:
+                        table = self._encode_dictionaries(table, geometry_names)
+                    # Los lectores toman los metadatos del esquema Arrow
+                    # guardado al abrir el archivo; en GeoParquet no se
+                    # guarda para que valgan los `geo` completos del pie
+                    writer = pq.ParquetWriter(sink, table.schema, store_schema=geo is None)
+                elif table.schema != writer.schema:
+                    # Columnas sin valores en un bloque llegan con tipo null
+                    table = table.cast(writer.schema)
+
+                writer.write_table(table, row_group_size=row_group_size)
+                merge_geometry_statistics(statistics, chunk_statistics)
+                total += table.num_rows
+                if timer is not None:
+                    timer.add('escritura', time.perf_counter() - started)
+
+            if writer is None:
+                raise ValueError("No hay registros para transformar")
+            if geo is not None:
+                metadata = apply_geometry_statistics(json.loads(geo), statistics)
+                writer.add_key_value_metadata({'geo': json.dumps(metadata)})
+            writer.close()
+
+            logger.info(f"Datos transformados a Parquet por bloques: {total} registros")
+            return writer.schema
+
+        except Exception as e:
+            if hasattr(prepared, 'close'):
+                # Detiene los hilos de transformación y la etapa anterior
+                prepared.close()
+            if writer is not None:
+                writer.close()
+            logger.error(f"Error en transformación a Parquet: {str(e)}")
+            raise
+
+    def sort_spatially(self, gdf: gpd.GeoDataFrame, curve: str = 'hilbert') -> gpd.GeoDataFrame:
+        """
+        Ordena un GeoDataFrame sobre una curva de Hilbert o de orden Z
+        
+        Las filas cercanas en el espacio quedan contiguas, de modo que cada
+        row group cubre una región compacta y las estadísticas min/max
+        (por ejemplo de la columna `bbox`) permiten descartar row groups.
+        
+        Args:
+            gdf: GeoDataFrame a ordenar
+            curve: 'hilbert' (por defecto) o 'zorder'
+        
+        Returns:
+            GeoDataFrame ordenado con un índice nuevo
+        """
+        keys = spatial_sort_key(gdf.geometry, curve)
+        order = np.argsort(keys, kind='stable')
+        return gdf.iloc[order].reset_index(drop=True)
+
+    def _encode_dictionaries(self, table: pa.Table, geometry_names: List[str]) -> pa.Table:
+        """Codifica como diccionario el texto de baja cardinalidad, sin tocar la geometría"""
+        encoded = dictionary_columns(table, exclude=geometry_names + ['geometry_wkt'])
+        if encoded:
+            logger.debug(f"Columnas codificadas como diccionario: {', '.join(encoded)}")
+        return apply_column_types(table, encoded)
+
+    def _row_group_size(self, row_group_size: Optional[int], spatial_sort: Optional[str]) -> Optional[int]:
+        """Tamaño de row group a usar: el indicado o uno compacto si se ordena"""
+        if row_group_size is None and spatial_sort:
+            return SPATIAL_ROW_GROUP_SIZE
+        return row_group_size
+
+    def to_arrow_table(
+        self,
+        gdf: gpd.GeoDataFrame,
+        geometry_encoding: str = 'wkt',
+        preserve_index: Optional[bool] = None,
+        column_types: Optional[Dict[str, pa.DataType]] = None
+    ) -> pa.Table:
+        """
+        Convierte un GeoDataFrame en tabla Arrow con la geometría codificada
+        
+        Args:
+            gdf: GeoDataFrame a convertir
+            geometry_encoding: 'wkt' o 'wkb'
+            preserve_index: Igual que en `pa.Table.from_pandas`
+            column_types: Tipos Arrow a aplicar a las columnas no geométricas
+        
+        Returns:
+            pa.Table lista para escribir en Parquet
+        """
+        # Codificar todas las columnas de geometría de forma vectorizada
+        df = pd.DataFrame(gdf)
+        columns = geometry_columns(df)
+        for col in columns:
+            df[col] = encode_geometry(df[col], geometry_encoding)
+
+        table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+
+        # Un bloque sin ninguna geometría no permite inferir el tipo de la columna
+        geometry_type = pa.binary() if geometry_encoding == 'wkb' else pa.string()
+        for col in columns:
+            index = table.schema.get_field_index(col)
+            if pa.types.is_null(table.schema.field(index).type):
+                table = table.set_column(index, col, table.column(col).cast(geometry_type))
+
+        if column_types:
+            table = apply_column_types(
+                table, {col: t for col, t in column_types.items() if col not in columns}
+            )
+        return table
+
+    def transform_to_geoparquet(
+        self,
+        gdf: gpd.GeoDataFrame,
+        covering: bool = True,
+        spatial_sort: Optional[str] = None,
+        row_group_size: Optional[int] = None,
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        dictionary_encoding: bool = False
+    ) -> Union[bytes, BinaryIO]:
+        """
+        Transforma GeoDataFrame a GeoParquet 1.1
+        
+        Las geometrías se escriben en WKB con los metadatos `geo` (CRS,
+        tipos de geometría y extensión). Con `covering` se agrega la columna
+        `bbox` por fila, cuyas estadísticas de min/max por row group
+        permiten a los lectores descartar bloques por extensión.
+        
+        Args:
+            gdf: GeoDataFrame a transformar
+            covering: Si se agrega la columna de cobertura `bbox`
+            spatial_sort: Curva para agrupar las filas por cercanía
+                ('hilbert' o 'zorder')
+            row_group_size: Máximo de filas por row group
+            column_types: Tipos Arrow por columna derivados de PostgreSQL
+            dictionary_encoding: Codificar como diccionario las columnas de
+                texto de baja cardinalidad
+        
+        Returns:
+            Datos en formato GeoParquet
+        """
+        if gdf.empty:
+            raise ValueError("No hay registros para transformar")
+
+        try:
+            if spatial_sort:
+                gdf = self.sort_spatially(gdf, spatial_sort)
+            table = self.to_geoarrow_table(gdf, covering, column_types=column_types)
+            if dictionary_encoding:
+                table = self._encode_dictionaries(table, geometry_columns(gdf))
+
+            buffer = BytesIO()
+            pq.write_table(
+                table,
+                buffer,
+                row_group_size=self._row_group_size(row_group_size, spatial_sort)
+            )
+            buffer.seek(0)
+
+            logger.info(f"Datos transformados a GeoParquet: {table.num_rows} registros")
+            return buffer
+
+        except Exception as e:
+            logger.error(f"Error en transformación a GeoParquet: {str(e)}")
+            raise
+
+    def to_geoarrow_table(
+        self,
+        gdf: gpd.GeoDataFrame,
+        covering: bool = True,
+        statistics: bool = True,
+        column_types: Optional[Dict[str, pa.DataType]] = None
+    ) -> pa.Table:
+        """
+        Convierte un GeoDataFrame en una tabla Arrow con esquema GeoParquet
+        
+        Args:
+            gdf: GeoDataFrame a convertir
+            covering: Si se agrega la columna de cobertura `bbox`
+            statistics: Si los metadatos incluyen tipos de geometría y
+                extensión (ver `geo_metadata`)
+            column_types: Tipos Arrow a aplicar a las columnas no geométricas
+        
+        Returns:
+            pa.Table con geometrías WKB y metadatos `geo`
+        """
+        if 'bbox' in gdf.columns and covering:
+            raise ValueError("La columna 'bbox' está reservada para la cobertura GeoParquet")
+
+        table = self.to_arrow_table(gdf, 'wkb', preserve_index=False, column_types=column_types)
+        if covering:
+            table = table.append_column('bbox', bbox_covering(gdf.geometry))
+
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'geo'] = json.dumps(geo_metadata(gdf, covering, statistics)).encode('utf-8')
+        return table.replace_schema_metadata(metadata)
\ No newline at end of file
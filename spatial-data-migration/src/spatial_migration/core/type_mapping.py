@@ -0,0 +1,236 @@
+# Correspondencia de tipos PostgreSQL -> Arrow -> Glue
+
+# src/spatial_migration/core/type_mapping.py
+import re
+from typing import Dict, Iterable, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from ..models.schemas import PostgresTableSchema
+
+# Tipos con correspondencia directa (nombres de information_schema y de udt_name)
+PG_ARROW_TYPES: Dict[str, pa.DataType] = {
+    'smallint': pa.int16(),
+    'int2': pa.int16(),
+    'integer': pa.int32(),
+    'int4': pa.int32(),
+    'bigint': pa.int64(),
+    'int8': pa.int64(),
+    'real': pa.float32(),
+    'float4': pa.float32(),
+    'double precision': pa.float64(),
+    'float8': pa.float64(),
+    'boolean': pa.bool_(),
+    'bool': pa.bool_(),
+    'date': pa.date32(),
+    'timestamp without time zone': pa.timestamp('us'),
+    'timestamp': pa.timestamp('us'),
+    'timestamp with time zone': pa.timestamp('us', tz='UTC'),
+    'timestamptz': pa.timestamp('us', tz='UTC'),
+    'text': pa.string(),
+    'character varying': pa.string(),
+    'varchar': pa.string(),
+    'character': pa.string(),
+    'bpchar': pa.string(),
+    'uuid': pa.string(),
+    'json': pa.string(),
+    'jsonb': pa.string(),
+    'bytea': pa.binary(),
+}
+
+# Precisión máxima de decimal en Athena/Glue
+MAX_DECIMAL_PRECISION = 38
+
+# Una columna de texto se codifica como diccionario si sus valores
+# distintos no superan esta fracción de las filas del bloque
+DICTIONARY_MAX_RATIO = 0.1
+
+# Filas mínimas de un bloque para decidir la codificación por diccionario
+DICTIONARY_MIN_ROWS = 1000
+
+_NUMERIC = re.compile(r'numeric\((\d+),\s*(\d+)\)')
+_LENGTH = re.compile(r'\(\d+\)$')
+
+def arrow_type(pg_type: str) -> Optional[pa.DataType]:
+    """
+    Tipo Arrow de un tipo de columna de PostgreSQL.
+
+    Args:
+        pg_type: Tipo como lo entrega `get_table_schema` (por ejemplo
+            'integer', 'numeric(12,2)', 'character varying(80)' o 'int2[]')
+
+    Returns:
+        Tipo Arrow, o None si no hay una correspondencia exacta (geometría,
+        numeric sin precisión, tipos propios): la columna conserva el
+        tipo que infiere Arrow
+    """
+    if pg_type.endswith('[]'):
+        item = arrow_type(pg_type[:-2])
+        return pa.list_(item) if item is not None else None
+
+    numeric = _NUMERIC.fullmatch(pg_type)
+    if numeric:
+        precision, scale = int(numeric.group(1)), int(numeric.group(2))
+        if precision <= MAX_DECIMAL_PRECISION:
+            return pa.decimal128(precision, scale)
+        return None
+
+    return PG_ARROW_TYPES.get(_LENGTH.sub('', pg_type))
+
+def arrow_column_types(table_schema: PostgresTableSchema) -> Dict[str, pa.DataType]:
+    """
+    Tipos Arrow de las columnas de una tabla con correspondencia exacta.
+
+    Las columnas geométricas se omiten: su tipo depende de la codificación
+    elegida al escribir (WKT o WKB).
+
+    Args:
+        table_schema: Schema de la tabla (ver `PostgreSQLExtractor.get_table_schema`)
+
+    Returns:
+        Diccionario columna -> tipo Arrow
+    """
+    geometry_columns = table_schema.geometry_columns or {}
+    column_types = {}
+    for column, pg_type in table_schema.columns.items():
+        if column in geometry_columns:
+            continue
+        target = arrow_type(pg_type)
+        if target is not None:
+            column_types[column] = target
+    return column_types
+
+def text_transfer_types(table_schema: PostgresTableSchema) -> Dict[str, pa.DataType]:
+    """
+    Columnas que se extraen como texto y su tipo Arrow exacto.
+
+    pandas convierte a float64 los numeric y los bigint con nulos, que
+    así pierden precisión (2.675 pasa a 2.67499..., un bigint por encima
+    de 2^53 cambia de valor). Leídas como texto se reconstruyen con
+    `column_from_text` sin pasar por float.
+
+    Args:
+        table_schema: Schema de la tabla
+
+    Returns:
+        Diccionario columna -> tipo Arrow (int64 o decimal128)
+    """
+    types = {}
+    for column, pg_type in table_schema.columns.items():
+        target = arrow_type(pg_type)
+        if target is not None and (pa.types.is_int64(target) or pa.types.is_decimal(target)):
+            types[column] = target
+    return types
+
+def column_from_text(values: pd.Series, target: pa.DataType) -> pd.Series:
+    """Reconstruye una columna extraída como texto con su tipo Arrow exacto"""
+    array = pa.array(values, type=pa.string(), from_pandas=True).cast(target)
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=values.index, name=values.name)
+
+def apply_column_types(table: pa.Table, column_types: Dict[str, pa.DataType]) -> pa.Table:
+    """
+    Convierte las columnas de una tabla Arrow a los tipos indicados.
+
+    pandas pierde los tipos exactos (enteros con nulos pasan a float64,
+    numeric a objetos Decimal, etc.); la conversión los restituye y falla
+    si algún valor no cabe en el tipo de destino. Un decimal que llega
+    como float se convierte desde su representación decimal más corta.
+
+    Args:
+        table: Tabla a convertir
+        column_types: Tipo Arrow por columna; las columnas ausentes no cambian
+
+    Returns:
+        pa.Table con los tipos indicados
+    """
+    for column, target in column_types.items():
+        index = table.schema.get_field_index(column)
+        if index < 0 or table.schema.field(index).type == target:
+            continue
+        values = table.column(index)
+        if pa.types.is_decimal(target) and pa.types.is_floating(values.type):
+            values = _float_to_decimal(values, target)
+        table = table.set_column(index, column, values.cast(target))
+    return table
+
+def _float_to_decimal(values: pa.ChunkedArray, target: pa.DataType) -> pa.ChunkedArray:
+    # El cast directo redondea el valor binario del float (2.675 queda en
+    # 2.67); se pasa por el texto más corto que lo representa y se redondea
+    # a la escala como PostgreSQL (la mitad se aleja del cero)
+    scale = MAX_DECIMAL_PRECISION - (target.precision - target.scale)
+    exact = values.cast(pa.string()).cast(pa.decimal128(MAX_DECIMAL_PRECISION, scale))
+    return pc.round(exact, ndigits=target.scale, round_mode='half_towards_infinity')
+
+def dictionary_columns(
+    table: pa.Table,
+    exclude: Iterable[str] = (),
+    max_ratio: float = DICTIONARY_MAX_RATIO,
+    min_rows: int = DICTIONARY_MIN_ROWS
+) -> Dict[str, pa.DataType]:
+    """
+    Detecta las columnas de texto de baja cardinalidad.
+
+    Args:
+        table: Bloque de datos de referencia
+        exclude: Columnas a no considerar (por ejemplo la geometría en WKT)
+        max_ratio: Fracción máxima de valores distintos sobre las filas
+        min_rows: Filas mínimas para decidir; en bloques más chicos no se
+            codifica ninguna columna
+
+    Returns:
+        Diccionario columna -> tipo diccionario, para `apply_column_types`
+    """
+    if table.num_rows < min_rows:
+        return {}
+    exclude = set(exclude)
+    encoded = {}
+    for field in table.schema:
+        if field.name in exclude:
+            continue
+        if not (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            continue
+        distinct = pc.count_distinct(table.column(field.name)).as_py()
+        if distinct <= max_ratio * table.num_rows:
+            encoded[field.name] = pa.dictionary(pa.int32(), field.type)
+    return encoded
+
+def glue_type(data_type: pa.DataType) -> str:
+    """
+    Tipo de Glue (Hive) de un tipo Arrow.
+
+    Args:
+        data_type: Tipo Arrow, por ejemplo de un esquema Parquet
+
+    Returns:
+        Tipo de Glue; 'string' si no hay uno más específico
+    """
+    if pa.types.is_dictionary(data_type):
+        return glue_type(data_type.value_type)
+    if pa.types.is_struct(data_type):
+        fields = ','.join(f"{field.name}:{glue_type(field.type)}" for field in data_type)
+        return f"struct<{fields}>"
+    if pa.types.is_list(data_type) or pa.types.is_large_list(data_type):
+        return f"array<{glue_type(data_type.value_type)}>"
+    if pa.types.is_decimal(data_type):
+        return f"decimal({data_type.precision},{data_type.scale})"
+    if pa.types.is_binary(data_type) or pa.types.is_large_binary(data_type):
+        return 'binary'
+    if pa.types.is_boolean(data_type):
+        return 'boolean'
+    if pa.types.is_int8(data_type):
+        return 'tinyint'
+    if pa.types.is_int16(data_type):
+        return 'smallint'
+    if pa.types.is_int32(data_type):
+        return 'int'
+    if pa.types.is_integer(data_type):
+        return 'bigint'
+    if pa.types.is_float32(data_type):
+        return 'float'
+    if pa.types.is_floating(data_type):
+        return 'double'
+    if pa.types.is_date(data_type):
+        return 'date'
+    if pa.types.is_timestamp(data_type):
+        return 'timestamp'
+    return 'string'
@@ -8,7 +8,8 @@ from .custom_exceptions import (
     TransformationError,
     LoadError,
     ValidationError,
-    ConfigurationError
+    ConfigurationError,
+    AthenaQueryError
 )
 
 __all__ = [
@@ -16,5 +17,6 @@ __all__ = [
     'TransformationError',
     'LoadError',
     'ValidationError',
-    'ConfigurationError'
+    'ConfigurationError',
+    'AthenaQueryError'
 ]
@@ -18,3 +18,7 @@ class ValidationError(Exception):
 class ConfigurationError(Exception):
     """Raised when hay un error en la configuración."""
     pass
+
+class AthenaQueryError(Exception):
+    """Raised when una consulta de Athena termina en FAILED o CANCELLED."""
+    pass
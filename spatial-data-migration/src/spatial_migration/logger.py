@@ -5,8 +5,16 @@ import sys
 from datetime import datetime
 
 def setup_logger() -> logging.Logger:
-    """Configura y retorna el logger principal"""
+    """
+    Configura y retorna el logger principal
+
+    Cada módulo lo llama al importarse; los handlers se agregan sólo la
+    primera vez, así cada mensaje se escribe una vez en consola y en un
+    único archivo de log por proceso.
+    """
     logger = logging.getLogger('spatial_migration')
+    if logger.handlers:
+        return logger
     logger.setLevel(logging.INFO)
 
     # Crear formateador
@@ -1,54 +1,786 @@
 # Punto de entrada principal
 
-from typing import Optional, Dict, Any
-from .core.extractor import PostgreSQLExtractor
+import argparse
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+import json
+import math
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, BinaryIO, Iterator, List, Tuple, Union
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .core.extractor import PostgreSQLExtractor, key_range_clause
 from .core.transformer import SpatialTransformer
 from .core.loader import AWSLoader
-from .config import Config
+from .core.type_mapping import arrow_column_types
+from .core.replication import (
+    LogicalReplicationSource,
+    change_schema,
+    changes_table,
+    changes_to_table,
+    format_lsn
+)
+from .exceptions import ValidationError
+from .models.schemas import ChunkRecord, KeyRange, MigrationConfig, SpatialFilter
+from .utils.aws import DEFAULT_PART_SIZE
+from .utils.ledger import DEFAULT_LEDGER_PATH, JobLedger
+from .utils.pipeline import DEFAULT_QUEUE_SIZE, StageTimer, prefetch
+from .utils.validators import DataValidator
+from .config import Config, load_config
 from .logger import setup_logger
 
 logger = setup_logger()
 
+# Filas por archivo en las migraciones con checkpoint
+CHECKPOINT_CHUNK_SIZE = 100000
+
 class SpatialDataMigration:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, migration_config: Optional[MigrationConfig] = None):
         self.config = config
+        self.migration_config = migration_config
         self.extractor = PostgreSQLExtractor(config.postgres)
         self.transformer = SpatialTransformer()
         self.loader = AWSLoader(config.aws)
 
-    def run_migration(self, table_name: str, options: Optional[Dict[str, Any]] = None) -> bool:
+    def run_migration(
+        self,
+        table_name: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> bool:
         """
         Ejecuta el proceso completo de migración.
         
         Args:
-            table_name: Nombre de la tabla a migrar
-            options: Opciones adicionales de migración
+            table_name: Nombre de la tabla a migrar; sin tabla se migra la
+                descrita por `migration_config` (ver `_config_source`)
+            options: Opciones adicionales de migración; con un
+                `migration_config`, sus valores son los valores por defecto
+                (ver `_config_options`) y las opciones indicadas aquí tienen
+                prioridad:
+                geometry_format: 'wkt' (por defecto) o 'wkb'
+                extraction_mode: 'single' (por defecto), 'chunked' o 'parallel';
+                    los dos últimos transforman bloque a bloque
+                chunk_size: Registros por bloque en modo 'chunked' (con
+                    checkpoint, filas por rango; por defecto 100000)
+                row_group_size: Máximo de filas por row group
+                spatial_sort: 'hilbert' o 'zorder' para agrupar las filas por
+                    cercanía antes de escribir (por defecto sin ordenar)
+                stream_upload: En los modos por bloques, escribir el Parquet
+                    directamente en S3 por partes (por defecto True) en vez
+                    de un archivo temporal
+                part_size: Bytes por parte de la carga multiparte
+                upload_concurrency: Partes que se suben en simultáneo
+                workers: Procesos de extracción en modo 'parallel'
+                key_column: Clave usada para dividir la tabla (por defecto 'id')
+                partition_method: 'minmax' (por defecto), 'percentile' o
+                    'quadtree' (tiles espaciales, para geometrías de tamaño muy
+                    desigual)
+                consistent_snapshot: Lectura paralela sobre un único snapshot
+                    exportado (por defecto True)
+                output_format: 'parquet' (por defecto, geometría WKT) o
+                    'geoparquet' (GeoParquet 1.1 con WKB y columna bbox)
+                incremental: Extraer sólo las filas modificadas desde la
+                    última corrida y cargarlas como un archivo de cambios
+                    junto al snapshot (por defecto False). Una migración
+                    completa reemplaza los archivos de cambios y reinicia
+                    la marca de agua
+                watermark_column: Columna de fecha de modificación usada en
+                    modo incremental (por defecto 'fecha_actu')
+                watermark_overlap: Segundos (o timedelta) anteriores a la
+                    marca guardada que se vuelven a leer, para las filas
+                    que confirman después de leerse la marca con un valor
+                    anterior (por defecto 0: sólo se relee la marca)
+                spatial_filter: SpatialFilter (o diccionario con sus campos)
+                    para migrar sólo las filas que lo intersectan
+                columns: Columnas a migrar, validadas contra el catálogo (la
+                    geometría se incluye siempre); por defecto todas
+                exclude_columns: Columnas a no migrar
+                type_mapping: Escribir cada columna con el tipo Arrow/Glue
+                    derivado de su tipo en PostgreSQL (smallint, decimal,
+                    date, timestamp...) y el texto de baja cardinalidad
+                    como diccionario, en vez de los tipos que infiere
+                    pandas (por defecto True)
+                pipeline: En los modos por bloques, extraer, transformar y
+                    escribir en etapas concurrentes con colas acotadas (por
+                    defecto True); el modo 'single' es una sola consulta y
+                    sigue siendo secuencial
+                queue_size: Bloques que cada etapa adelanta a la siguiente
+                transform_workers: Hilos que convierten los bloques a Arrow
+                target_table: Nombre de la tabla en S3 y Glue (por defecto
+                    `table_name`; obligatorio si el origen es una subconsulta)
+                upload_limiter: RateLimiter en bytes por segundo, compartido
+                    entre migraciones para acotar el ancho de banda de subida
+                checkpoint: Migrar por rangos de `key_column`, un archivo por
+                    rango, registrando cada rango cargado en un ledger
+                    SQLite; si la corrida se interrumpe, la siguiente retoma
+                    sólo los rangos pendientes (por defecto False)
+                ledger_path: Archivo del ledger (por defecto
+                    'migration_ledger.db')
+                chunk_retries: Reintentos de un rango fallido antes de
+                    abandonar la corrida (por defecto 2)
+                retry_delay: Segundos antes del primer reintento; se
+                    duplica en cada uno (por defecto 1)
+                publish_concurrency: Copias simultáneas al publicar los
+                    bloques de la corrida completada (por defecto 16)
+                validate_data: Validar las geometrías de cada bloque al
+                    extraerlo (por defecto False)
+                invalid_geometries: Qué hacer con las geometrías inválidas
+                    al validar: 'skip' (por defecto) omite esas filas y las
+                    informa en el log; 'raise' detiene la migración
+                create_backup: Antes de escribir, respaldar los archivos
+                    actuales de la tabla con una copia server-side en S3
+                    (ver `AWSLoader.backup_table`; por defecto False)
+                backup_concurrency: Copias simultáneas del respaldo
         
         Returns:
             bool: True si la migración fue exitosa
         """
+        options = options or {}
+        if self.migration_config is not None:
+            config_options = self._config_options(self.migration_config)
+            if table_name is None:
+                table_name, config_options['target_table'] = self._config_source(
+                    self.migration_config
+                )
+            options = {**config_options, **options}
+        elif table_name is None:
+            raise ValueError("Indicar table_name o crear la migración con un MigrationConfig")
+        target = options.get('target_table') or table_name
         try:
-            logger.info(f"Iniciando migración de tabla {table_name}")
+            logger.info(f"Iniciando migración de tabla {target}")
+            mode = options.get('extraction_mode', 'single')
+            output_format = options.get('output_format', 'parquet')
 
-            # Extracción
-            gdf = self.extractor.extract_table(table_name)
-            logger.info(f"Extraídos {len(gdf)} registros de {table_name}")
+            if options.get('create_backup'):
+                self.loader.backup_table(
+                    target,
+                    max_concurrency=options.get('backup_concurrency', 16)
+                )
 
-            # Transformación
-            parquet_data = self.transformer.transform_to_parquet(gdf)
-            logger.info("Datos transformados a formato Parquet")
+            if options.get('incremental'):
+                success = self._run_incremental(table_name, target, output_format, options)
+            elif options.get('checkpoint'):
+                success = self._run_checkpointed(table_name, target, output_format, options)
+            elif mode != 'single' and options.get('stream_upload', True):
+                # Extracción, transformación y carga por bloques: las partes
+                # se suben a S3 mientras se escriben los row groups siguientes
+                chunks, stages = self._pipeline(
+                    self._extract_chunks(table_name, options), target, options
+                )
+                success = self.loader.load_stream_to_aws(
+                    lambda stream: self._schema_dtypes(self.transformer.write_chunks(
+                        chunks,
+                        stream,
+                        output_format=output_format,
+                        **self._layout(table_name, options),
+                        **stages
+                    )),
+                    target,
+                    part_size=options.get('part_size', DEFAULT_PART_SIZE),
+                    max_concurrency=options.get('upload_concurrency', 4),
+                    rate_limiter=options.get('upload_limiter')
+                )
+                self._log_stages(target, stages)
+            else:
+                if mode == 'single':
+                    # Extracción
+                    gdf = self._extract(table_name, options)
+                    logger.info(f"Extraídos {len(gdf)} registros de {target}")
+                    if options.get('validate_data'):
+                        gdf = self._validate(gdf, target, options.get('invalid_geometries', 'skip'))
 
-            # Carga
-            success = self.loader.load_to_aws(
-                parquet_data,
-                table_name,
-                gdf.dtypes
-            )
+                    # Transformación
+                    parquet_data, dtypes = self._transform(table_name, gdf, output_format, options)
+                else:
+                    # Extracción y transformación por bloques a un archivo temporal
+                    chunks, stages = self._pipeline(
+                        self._extract_chunks(table_name, options), target, options
+                    )
+                    parquet_data = self.transformer.transform_chunks_to_parquet(
+                        chunks,
+                        output_format=output_format,
+                        **self._layout(table_name, options),
+                        **stages
+                    )
+                    self._log_stages(target, stages)
+                    dtypes = self._parquet_dtypes(parquet_data)
+                logger.info("Datos transformados a formato Parquet")
+
+                # Carga
+                try:
+                    success = self.loader.load_to_aws(
+                        parquet_data,
+                        target,
+                        dtypes,
+                        rate_limiter=options.get('upload_limiter')
+                    )
+                finally:
+                    parquet_data.close()
 
             if success:
-                logger.info(f"Migración de {table_name} completada exitosamente")
+                logger.info(f"Migración de {target} completada exitosamente")
             return success
 
         except Exception as e:
-            logger.error(f"Error en la migración de {table_name}: {str(e)}")
+            logger.error(f"Error en la migración de {target}: {str(e)}")
+            raise
+
+    def run_replication(
+        self,
+        slot_name: str,
+        tables: Union[List[str], Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        stop: Optional[threading.Event] = None
+    ):
+        """
+        Sincroniza tablas de forma continua desde un slot de replicación lógica.
+
+        Los cambios de cada tabla (INSERT, UPDATE y DELETE, con las columnas
+        _op y _lsn) se escriben en una tabla aparte, `<destino>_changes`,
+        con su propio prefijo, de modo que no se mezclan con el snapshot.
+        Sus archivos tienen un esquema fijo con los tipos del snapshot (ver
+        `change_schema`), y la tabla de Glue se registra una sola vez al
+        iniciar; cada lote sólo sube archivos. Después de subir un lote se
+        guarda su LSN final y recién entonces se confirma al slot, por lo
+        que al reiniciar se retoma desde el último lote cargado. El nombre
+        del archivo deriva del LSN inicial del lote: si un lote se repite
+        tras una caída, reemplaza al anterior.
+
+        Args:
+            slot_name: Slot de replicación (plugin wal2json)
+            tables: Tablas a sincronizar, con esquema (por ejemplo
+                shapes.comunas), o diccionario origen -> tabla de destino;
+                con una lista el destino es el nombre sin esquema
+            options: Opciones de la sincronización:
+                max_batch_rows: Filas máximas por lote (por defecto 10000)
+                max_batch_bytes: Bytes máximos de mensajes por lote
+                max_latency: Segundos máximos que un cambio espera a ser
+                    cargado (por defecto 60)
+                create_slot: Crear el slot si no existe (por defecto True)
+                upload_limiter: RateLimiter en bytes por segundo
+            stop: Evento para detener la sincronización
+        """
+        options = options or {}
+        if not isinstance(tables, dict):
+            tables = {table: table.split('.')[-1] for table in tables}
+        source = LogicalReplicationSource(
+            self.config.postgres,
+            slot_name,
+            list(tables),
+            max_rows=options.get('max_batch_rows', 10000),
+            max_bytes=options.get('max_batch_bytes', 64 * 1024 * 1024),
+            max_latency=options.get('max_latency', 60)
+        )
+        try:
+            schemas = {}
+            for table_name, target in tables.items():
+                schemas[table_name] = change_schema(self.extractor.get_table_schema(table_name))
+                self.loader.register_table(
+                    changes_table(target), self._schema_dtypes(schemas[table_name])
+                )
+
+            if options.get('create_slot', True):
+                source.create_slot()
+            start_lsn = self.loader.load_replication_lsn(slot_name)
+
+            for batch in source.stream(start_lsn, stop=stop):
+                run_id = f"lsn_{batch.start_lsn:016X}"
+                for table_name, rows in batch.changes.items():
+                    buffer = BytesIO()
+                    pq.write_table(changes_to_table(rows, schemas[table_name]), buffer)
+                    self.loader.load_object(
+                        buffer.getvalue(),
+                        self.loader.delta_key(changes_table(tables[table_name]), run_id),
+                        rate_limiter=options.get('upload_limiter')
+                    )
+                self.loader.save_replication_lsn(slot_name, batch.end_lsn)
+                logger.info(
+                    f"Cargados {batch.row_count} cambios hasta {format_lsn(batch.end_lsn)}"
+                )
+
+        except Exception as e:
+            logger.error(f"Error en la replicación del slot {slot_name}: {str(e)}")
             raise
+
+    def _run_incremental(
+        self,
+        table_name: str,
+        target: str,
+        output_format: str,
+        options: Dict[str, Any]
+    ) -> bool:
+        """
+        Carga las filas modificadas desde la marca de agua guardada.
+
+        La primera corrida (sin marca) escribe el snapshot completo, que
+        reemplaza lo que hubiera en el prefijo de la tabla; las siguientes
+        escriben un archivo de cambios nuevo en el mismo prefijo, de modo
+        que la tabla de Glue los incluye sin volver a exportar. Una fila
+        modificada aparece en más de un archivo; la versión vigente es la de
+        mayor valor en la columna de la marca. Cada corrida vuelve a leer
+        las filas con el valor de la marca guardada (más `watermark_overlap`
+        hacia atrás), de modo que no se pierden las modificadas el mismo
+        día en una columna date. La marca sólo avanza después de subir el
+        archivo.
+        """
+        column = options.get('watermark_column', 'fecha_actu')
+        state = self.loader.load_watermark(target)
+        if state and state['column'] != column:
+            raise ValueError(
+                f"La marca de agua de {target} usa {state['column']}, no {column}"
+            )
+        since = state['value'] if state else None
+        overlap = options.get('watermark_overlap')
+        if since is not None and overlap:
+            if not isinstance(overlap, timedelta):
+                overlap = timedelta(seconds=overlap)
+            since = datetime.fromisoformat(since) - overlap
+
+        until, changed = self.extractor.get_watermark(table_name, column, since)
+        if not changed:
+            logger.info(f"Sin cambios en {target} desde {column} = {since}")
+            return True
+        logger.info(f"{changed} registros de {target} con {column} desde {since}")
+
+        if since is None:
+            s3_key = None
+        else:
+            run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+            s3_key = self.loader.delta_key(target, run_id)
+
+        chunks = self.extractor.extract_table_changes(
+            table_name,
+            column,
+            since=since,
+            until=until,
+            chunk_size=options.get('chunk_size', 10000),
+            geometry_format=options.get('geometry_format', 'wkt'),
+            columns=options.get('columns'),
+            exclude_columns=options.get('exclude_columns')
+        )
+        chunks, stages = self._pipeline(chunks, target, options)
+        success = self.loader.load_stream_to_aws(
+            lambda stream: self._schema_dtypes(self.transformer.write_chunks(
+                chunks,
+                stream,
+                output_format=output_format,
+                **self._layout(table_name, options),
+                **stages
+            )),
+            target,
+            part_size=options.get('part_size', DEFAULT_PART_SIZE),
+            max_concurrency=options.get('upload_concurrency', 4),
+            s3_key=s3_key,
+            rate_limiter=options.get('upload_limiter')
+        )
+        self._log_stages(target, stages)
+        if success and until is not None:
+            self.loader.save_watermark(target, column, until)
+        return success
+
+    def _run_checkpointed(
+        self,
+        table_name: str,
+        target: str,
+        output_format: str,
+        options: Dict[str, Any]
+    ) -> bool:
+        """
+        Migra la tabla por rangos de clave con un ledger para reanudar.
+
+        Cada rango se extrae, se escribe como un archivo propio en el
+        prefijo de staging de la corrida (fuera del que lee la tabla) y
+        recién después se registra en el ledger; un rango que falla se
+        reintenta solo, y si la corrida se abandona, la siguiente con las
+        mismas opciones retoma los rangos pendientes. Todos los archivos
+        usan el esquema del primero. Al completar la corrida los bloques se
+        publican en el prefijo de la tabla, reemplazando sus archivos
+        anteriores (ver `AWSLoader.publish_chunks`), se crea la tabla de
+        Glue y se borra el staging de esta corrida y de las reemplazadas.
+        """
+        key_column = options.get('key_column', 'id')
+        signature = json.dumps({
+            'source': table_name,
+            'key_column': key_column,
+            'output_format': output_format,
+            'geometry_format': options.get('geometry_format', 'wkt'),
+            'columns': options.get('columns'),
+            'exclude_columns': options.get('exclude_columns'),
+            'spatial_filter': options.get('spatial_filter')
+        }, sort_keys=True, default=str)
+
+        with JobLedger(options.get('ledger_path', DEFAULT_LEDGER_PATH)) as ledger:
+            job = ledger.open_job(
+                target,
+                signature,
+                lambda: self._checkpoint_ranges(table_name, key_column, options)
+            )
+            pending = ledger.chunks(job.job_id, pending_only=True)
+            logger.info(f"{target}: {len(pending)} de {job.chunk_count} rangos pendientes")
+
+            retries = options.get('chunk_retries', 2)
+            for chunk in pending:
+                for attempt in range(retries + 1):
+                    try:
+                        self._load_checkpoint_chunk(
+                            ledger, chunk, table_name, target, key_column, output_format, options
+                        )
+                        break
+                    except Exception as e:
+                        ledger.fail_chunk(job.job_id, chunk.index, str(e))
+                        if attempt == retries:
+                            raise
+                        delay = options.get('retry_delay', 1.0) * 2 ** attempt
+                        logger.warning(
+                            f"Rango {chunk.index} de {target} falló ({str(e)}); "
+                            f"reintento en {delay:.1f} s"
+                        )
+                        time.sleep(delay)
+
+            schema = ledger.get_schema(job.job_id)
+            if schema is None:
+                raise ValueError("No hay registros para transformar")
+            self.loader.publish_chunks(
+                target,
+                job.job_id,
+                max_concurrency=options.get('publish_concurrency', 16)
+            )
+            self.loader.register_table(target, self._schema_dtypes(schema))
+
+            # El staging se borra recién con la corrida completada en el ledger
+            for old_job in ledger.complete_job(job.job_id):
+                self.loader.delete_staging(target, old_job.job_id)
+            self.loader.delete_staging(target, job.job_id)
+            rows = sum(chunk.row_count or 0 for chunk in ledger.chunks(job.job_id))
+
+        logger.info(f"{target}: {rows} registros en {job.chunk_count} rangos")
+        return True
+
+    def _checkpoint_ranges(
+        self,
+        table_name: str,
+        key_column: str,
+        options: Dict[str, Any]
+    ) -> List[KeyRange]:
+        """
+        Rangos de clave de una corrida nueva, de unas `chunk_size` filas cada uno
+
+        La cantidad de filas sale de pg_class.reltuples; sólo si la tabla
+        nunca se analizó (o el origen es una subconsulta) se cuentan.
+        """
+        chunk_size = options.get('chunk_size', CHECKPOINT_CHUNK_SIZE)
+        partitions = options.get('partitions')
+        if not partitions:
+            rows = self.extractor.estimate_rows(table_name)
+            if rows is None:
+                logger.warning(f"{table_name} no tiene estadísticas: contando sus filas")
+                rows = self.extractor.count_rows(table_name)
+            partitions = max(1, math.ceil(rows / chunk_size))
+        return self.extractor.get_key_ranges(
+            table_name,
+            key_column=key_column,
+            partitions=partitions,
+            method=options.get('partition_method', 'percentile')
+        )
+
+    def _load_checkpoint_chunk(
+        self,
+        ledger: JobLedger,
+        chunk: ChunkRecord,
+        table_name: str,
+        target: str,
+        key_column: str,
+        output_format: str,
+        options: Dict[str, Any]
+    ):
+        """Extrae, escribe y sube un rango, y lo registra en el ledger"""
+        clause, params = key_range_clause(key_column, chunk.key_range)
+        gdf = self.extractor.extract_table(
+            table_name,
+            where_clause=clause,
+            params=params,
+            geometry_format=options.get('geometry_format', 'wkt'),
+            spatial_filter=self._spatial_filter(options),
+            columns=options.get('columns'),
+            exclude_columns=options.get('exclude_columns')
+        )
+        if options.get('validate_data'):
+            gdf = self._validate(
+                gdf, f"{target}, rango {chunk.index}", options.get('invalid_geometries', 'skip')
+            )
+        if gdf.empty:
+            ledger.commit_chunk(chunk.job_id, chunk.index, 0)
+            return
+
+        schema = ledger.get_schema(chunk.job_id)
+        buffer = BytesIO()
+        written = self.transformer.write_chunks(
+            iter([gdf]),
+            buffer,
+            output_format=output_format,
+            schema=schema,
+            **self._layout(table_name, options)
+        )
+        if schema is None:
+            ledger.set_schema(chunk.job_id, written)
+
+        s3_key = self.loader.chunk_key(target, chunk.job_id, chunk.index)
+        result = self.loader.load_object(
+            buffer.getvalue(), s3_key, rate_limiter=options.get('upload_limiter')
+        )
+        ledger.commit_chunk(
+            chunk.job_id, chunk.index, len(gdf), result['checksum'], s3_key, result['etag']
+        )
+        logger.info(f"Rango {chunk.index} de {target}: {len(gdf)} registros en {s3_key}")
+
+    def _extract(self, table_name: str, options: Dict[str, Any]) -> gpd.GeoDataFrame:
+        """Extrae la tabla completa en una sola consulta"""
+        return self.extractor.extract_table(
+            table_name,
+            geometry_format=options.get('geometry_format', 'wkt'),
+            spatial_filter=self._spatial_filter(options),
+            columns=options.get('columns'),
+            exclude_columns=options.get('exclude_columns')
+        )
+
+    def _extract_chunks(self, table_name: str, options: Dict[str, Any]) -> Iterator[gpd.GeoDataFrame]:
+        """Extrae la tabla por bloques según el modo indicado en las opciones"""
+        geometry_format = options.get('geometry_format', 'wkt')
+        mode = options.get('extraction_mode', 'single')
+
+        if mode == 'chunked':
+            return self.extractor.extract_table_chunks(
+                table_name,
+                chunk_size=options.get('chunk_size', 10000),
+                geometry_format=geometry_format,
+                spatial_filter=self._spatial_filter(options),
+                columns=options.get('columns'),
+                exclude_columns=options.get('exclude_columns')
+            )
+
+        if mode == 'parallel':
+            return self.extractor.extract_table_parallel(
+                table_name,
+                workers=options.get('workers', 4),
+                key_column=options.get('key_column', 'id'),
+                method=options.get('partition_method', 'minmax'),
+                geometry_format=geometry_format,
+                consistent=options.get('consistent_snapshot', True),
+                spatial_filter=self._spatial_filter(options),
+                columns=options.get('columns'),
+                exclude_columns=options.get('exclude_columns')
+            )
+
+        raise ValueError(f"Modo de extracción no soportado: {mode}")
+
+    def _spatial_filter(self, options: Dict[str, Any]) -> Optional[SpatialFilter]:
+        """Filtro espacial de las opciones, aceptando también un diccionario"""
+        spatial_filter = options.get('spatial_filter')
+        if isinstance(spatial_filter, dict):
+            return SpatialFilter(**spatial_filter)
+        return spatial_filter
+
+    def _transform(
+        self,
+        table_name: str,
+        gdf: gpd.GeoDataFrame,
+        output_format: str,
+        options: Dict[str, Any]
+    ) -> Tuple[BinaryIO, Dict[str, Any]]:
+        """Transforma un GeoDataFrame completo y devuelve los tipos para Glue"""
+        layout = self._layout(table_name, options)
+        if output_format == 'geoparquet':
+            parquet_data = self.transformer.transform_to_geoparquet(gdf, **layout)
+        elif output_format == 'parquet':
+            parquet_data = self.transformer.transform_to_parquet(gdf, **layout)
+        else:
+            raise ValueError(f"Formato de salida no soportado: {output_format}")
+        # Los tipos de Glue salen del esquema escrito (decimales, fechas, WKB, bbox)
+        return parquet_data, self._parquet_dtypes(parquet_data)
+
+    def _pipeline(
+        self,
+        chunks: Iterator[gpd.GeoDataFrame],
+        target: str,
+        options: Dict[str, Any]
+    ) -> Tuple[Iterator[gpd.GeoDataFrame], Dict[str, Any]]:
+        """
+        Solapa la extracción, la transformación y la escritura de los bloques
+
+        La extracción corre en su propio hilo y adelanta a lo sumo
+        `queue_size` bloques; la conversión a Arrow corre en
+        `transform_workers` hilos con el mismo límite, y la subida ya se
+        hace en paralelo con partes acotadas (S3MultipartWriter). Cada
+        etapa espera cuando la siguiente se atrasa, así la memoria queda
+        acotada y el tiempo total se acerca al de la etapa más lenta.
+        Con `validate_data` cada bloque se valida dentro de la etapa de
+        extracción, antes de entrar en la cola.
+
+        Returns:
+            Tupla (bloques, argumentos de etapa para write_chunks)
+        """
+        if options.get('validate_data'):
+            chunks = self._validate_chunks(chunks, target, options.get('invalid_geometries', 'skip'))
+        if not options.get('pipeline', True):
+            return chunks, {}
+        timer = StageTimer()
+        chunks = prefetch(
+            chunks,
+            options.get('queue_size', DEFAULT_QUEUE_SIZE),
+            name='extracción',
+            timer=timer
+        )
+        return chunks, {'transform_workers': options.get('transform_workers', 1), 'timer': timer}
+
+    def _config_options(self, migration_config: MigrationConfig) -> Dict[str, Any]:
+        """
+        Opciones por defecto de run_migration derivadas de un MigrationConfig
+
+        `batch_size` fija las filas de cada bloque extraído y de cada row
+        group: la extracción es por bloques con un cursor server-side y la
+        escritura va directo a S3, de modo que la memoria queda acotada a
+        unos pocos bloques sin importar el tamaño de la tabla.
+        `validate_data` valida las geometrías de cada bloque en línea y
+        `create_backup` respalda la tabla de destino antes de escribirla.
+        """
+        if migration_config.batch_size <= 0:
+            raise ValueError("batch_size debe ser mayor que cero")
+        return {
+            'extraction_mode': 'chunked',
+            'chunk_size': migration_config.batch_size,
+            'row_group_size': migration_config.batch_size,
+            'validate_data': migration_config.validate_data,
+            'create_backup': migration_config.create_backup
+        }
+
+    def _config_source(self, migration_config: MigrationConfig) -> Tuple[str, str]:
+        """
+        Origen de la extracción y tabla de destino de un MigrationConfig
+
+        Una columna geométrica con otro nombre se renombra a 'geometry'
+        con una subconsulta (ver `PostgreSQLExtractor.source_query`).
+
+        Returns:
+            Tupla (origen de la extracción, tabla de destino)
+        """
+        source = migration_config.source_table
+        table_name = source.table_name
+        if source.geometry_column and source.geometry_column != 'geometry':
+            table_name = self.extractor.source_query(table_name, geom_col=source.geometry_column)
+        return table_name, migration_config.target_table.table_name
+
+    def _validate(
+        self,
+        gdf: gpd.GeoDataFrame,
+        description: str,
+        invalid_geometries: str = 'skip'
+    ) -> gpd.GeoDataFrame:
+        """
+        Valida las geometrías de un bloque; las advertencias sólo se registran
+
+        Returns:
+            El bloque sin las filas con geometrías inválidas ('skip')
+
+        Raises:
+            ValidationError: Si hay geometrías inválidas y se pidió 'raise'
+        """
+        if invalid_geometries not in ('skip', 'raise'):
+            raise ValueError(f"Tratamiento de geometrías inválidas no soportado: {invalid_geometries}")
+        results = DataValidator.validate_spatial_data(gdf)
+        for warning in results['warnings']:
+            logger.warning(f"{description}: {warning}")
+        if results['is_valid']:
+            return gdf
+        if invalid_geometries == 'raise':
+            raise ValidationError(f"{description}: {'; '.join(results['errors'])}")
+        invalid = gdf.geometry.notna() & ~gdf.geometry.is_valid
+        logger.warning(f"{description}: se omiten {int(invalid.sum())} filas con geometrías inválidas")
+        return gdf[~invalid]
+
+    def _validate_chunks(
+        self,
+        chunks: Iterator[gpd.GeoDataFrame],
+        target: str,
+        invalid_geometries: str = 'skip'
+    ) -> Iterator[gpd.GeoDataFrame]:
+        """Valida cada bloque a medida que se extrae, dentro de la etapa de extracción"""
+        skipped = 0
+        try:
+            for index, gdf in enumerate(chunks):
+                valid = self._validate(gdf, f"{target}, bloque {index}", invalid_geometries)
+                skipped += len(gdf) - len(valid)
+                if not valid.empty:
+                    yield valid
+        finally:
+            # Libera el cursor de la extracción si la migración se detiene
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+        if skipped:
+            logger.warning(f"{target}: {skipped} filas omitidas por geometrías inválidas")
+
+    def _log_stages(self, table_name: str, stages: Dict[str, Any]):
+        """Registra el tiempo de trabajo de cada etapa del pipeline"""
+        if 'timer' in stages:
+            logger.info(f"Etapas de {table_name}: {stages['timer'].summary()}")
+
+    def _layout(self, table_name: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Opciones de escritura del Parquet, con los tipos derivados de PostgreSQL"""
+        layout = {
+            'spatial_sort': options.get('spatial_sort'),
+            'row_group_size': options.get('row_group_size')
+        }
+        if options.get('type_mapping', True):
+            table_schema = self.extractor.get_table_schema(table_name)
+            layout['column_types'] = arrow_column_types(table_schema)
+            layout['dictionary_encoding'] = True
+        return layout
+
+    def _parquet_dtypes(self, parquet_data: BinaryIO) -> Dict[str, Any]:
+        """Lee los tipos Arrow del pie de un archivo Parquet y lo rebobina"""
+        schema = pq.read_schema(parquet_data)
+        parquet_data.seek(0)
+        return self._schema_dtypes(schema)
+
+    def _schema_dtypes(self, schema: pa.Schema) -> Dict[str, Any]:
+        """Tipos Arrow por columna, en el formato que espera AWSLoader"""
+        return {field.name: field.type for field in schema}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Respaldos de tablas migradas:
+
+        python -m spatial_migration.main backup comunas
+        python -m spatial_migration.main backups comunas
+        python -m spatial_migration.main restore comunas [backup_id]
+    """
+    parser = argparse.ArgumentParser(description="Respalda y restaura tablas migradas")
+    commands = parser.add_subparsers(dest='command', required=True)
+    backup = commands.add_parser('backup', help="Respaldar los archivos actuales de una tabla")
+    backup.add_argument('table')
+    backup.add_argument('--concurrency', type=int, default=16)
+    listing = commands.add_parser('backups', help="Listar los respaldos de una tabla")
+    listing.add_argument('table')
+    restore = commands.add_parser('restore', help="Apuntar la tabla de Glue a un respaldo")
+    restore.add_argument('table')
+    restore.add_argument('backup_id', nargs='?', help="Por defecto el más reciente")
+    args = parser.parse_args(argv)
+
+    loader = AWSLoader(load_config().aws)
+    if args.command == 'backup':
+        backup_id = loader.backup_table(args.table, max_concurrency=args.concurrency)
+        if backup_id is None:
+            return 1
+        print(backup_id)
+    elif args.command == 'backups':
+        for backup_id in loader.list_backups(args.table):
+            print(backup_id)
+    else:
+        print(loader.restore_table(args.table, args.backup_id))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,12 +7,32 @@ from .schemas import (
     PostgresTableSchema,
     GlueTableSchema,
     MigrationConfig,
-    ValidationResults
+    ValidationResults,
+    KeyRange,
+    ChangeBatch,
+    TableProfile,
+    SpatialFilter,
+    TileRange,
+    TableManifest,
+    SchedulerLimits,
+    MigrationManifest,
+    MigrationJob,
+    ChunkRecord
 )
 
 __all__ = [
     'PostgresTableSchema',
     'GlueTableSchema',
     'MigrationConfig',
-    'ValidationResults'
+    'ValidationResults',
+    'KeyRange',
+    'ChangeBatch',
+    'TableProfile',
+    'SpatialFilter',
+    'TileRange',
+    'TableManifest',
+    'SchedulerLimits',
+    'MigrationManifest',
+    'MigrationJob',
+    'ChunkRecord'
 ]
@@ -1,16 +1,20 @@
-# Definici�n de modelos de datos# src/spatial_migration/models/schemas.py
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
+# Definición de modelos de datos
+# src/spatial_migration/models/schemas.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple, Union
 from datetime import datetime
 
 @dataclass
 class PostgresTableSchema:
-    """Schema para una tabla de PostgreSQL."""
+    """Schema para una tabla de PostgreSQL; `columns` conserva el orden de la tabla."""
     table_name: str
     columns: Dict[str, str]
-    geometry_column: str
-    srid: int
+    geometry_column: Optional[str]
+    srid: Optional[int]
     indexes: Optional[List[str]] = None
+    nullable: Optional[Dict[str, bool]] = None
+    geometry_columns: Optional[Dict[str, Optional[int]]] = None
+    geometry_type: Optional[str] = None
 
 @dataclass
 class GlueTableSchema:
@@ -37,4 +41,108 @@ class ValidationResults:
     errors: List[str]
     warnings: List[str]
     validation_date: datetime = datetime.now()
-    details: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    details: Optional[Dict[str, Any]] = None
+
+@dataclass
+class KeyRange:
+    """Rango semiabierto [lower, upper) de la clave primaria de una tabla."""
+    lower: Optional[Any] = None
+    upper: Optional[Any] = None
+
+@dataclass
+class ChangeBatch:
+    """Lote de cambios de replicación lógica, cerrado en límite de transacción."""
+    start_lsn: int
+    end_lsn: int
+    changes: Dict[str, List[Dict[str, Any]]]
+
+    @property
+    def row_count(self) -> int:
+        return sum(len(rows) for rows in self.changes.values())
+
+@dataclass
+class TableProfile:
+    """Perfil de una tabla de origen; en modo estimado los conteos vienen de las estadísticas."""
+    table_name: str
+    row_count: Optional[int]
+    distinct_keys: Optional[int]
+    null_geometries: Optional[int]
+    invalid_geometries: Optional[int]
+    extent: Optional[Tuple[float, float, float, float]]
+    geometry_types: List[str]
+    srids: List[int]
+    estimated: bool = False
+
+    @property
+    def duplicate_keys(self) -> Optional[int]:
+        if self.row_count is None or self.distinct_keys is None:
+            return None
+        return self.row_count - self.distinct_keys
+
+@dataclass
+class SpatialFilter:
+    """Filtro espacial de extracción: bbox, geometría (WKT/WKB) u otra tabla."""
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    geometry: Optional[Union[str, bytes]] = None
+    table: Optional[str] = None
+    table_geom_col: str = 'geometry'
+    table_where: Optional[str] = None
+    table_params: Optional[Dict[str, Any]] = None
+    srid: Optional[int] = None
+    predicate: str = 'intersects'
+
+@dataclass
+class TileRange:
+    """Tile semiabierto [xmin, xmax) x [ymin, ymax) de la esquina inferior izquierda de cada caja; None no limita."""
+    xmin: Optional[float] = None
+    ymin: Optional[float] = None
+    xmax: Optional[float] = None
+    ymax: Optional[float] = None
+    weight: float = 0.0
+    null_only: bool = False
+
+@dataclass
+class TableManifest:
+    """Tabla de un manifiesto de migración: origen, clave de deduplicación, destino y particionado."""
+    name: str
+    source: Optional[str] = None
+    query: Optional[str] = None
+    geometry_column: str = 'geometry'
+    dedup_key: Optional[List[str]] = None
+    partitioning: Optional[Dict[str, Any]] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class SchedulerLimits:
+    """Límites globales del scheduler; upload_bandwidth en bytes por segundo (None sin límite)."""
+    db_connections: int = 4
+    cpu_workers: int = 4
+    upload_bandwidth: Optional[float] = None
+
+@dataclass
+class MigrationManifest:
+    """Manifiesto declarativo de una migración de varias tablas."""
+    tables: List[TableManifest]
+    limits: SchedulerLimits = field(default_factory=SchedulerLimits)
+
+@dataclass
+class MigrationJob:
+    """Corrida reanudable de una tabla registrada en el ledger de bloques."""
+    job_id: str
+    table_name: str
+    signature: str
+    status: str
+    chunk_count: int
+
+@dataclass
+class ChunkRecord:
+    """Bloque de una corrida reanudable: rango de clave y, una vez cargado, su objeto en S3."""
+    job_id: str
+    index: int
+    key_range: KeyRange
+    status: str = 'pending'
+    row_count: Optional[int] = None
+    checksum: Optional[str] = None
+    s3_key: Optional[str] = None
+    etag: Optional[str] = None
+    attempts: int = 0
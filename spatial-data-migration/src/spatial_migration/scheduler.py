@@ -0,0 +1,331 @@
+# Migración de varias tablas desde un manifiesto, con límites globales
+
+# src/spatial_migration/scheduler.py
+import argparse
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Union
+import yaml
+from .config import Config, load_config
+from .core.extractor import PARTITION_METHODS, quote_identifier
+from .exceptions import ConfigurationError
+from .main import SpatialDataMigration
+from .models.schemas import MigrationManifest, SchedulerLimits, TableManifest
+from .utils.aws import DEFAULT_PART_SIZE, RateLimiter
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Opciones de run_migration que el manifiesto fija por su cuenta
+RESERVED_OPTIONS = ('target_table', 'upload_limiter')
+
+_BANDWIDTH = re.compile(r'(\d+(?:\.\d+)?)\s*([KMG]?)B?(?:/S)?')
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_bandwidth(value: Union[int, float, str, None]) -> Optional[float]:
+    """Convierte un ancho de banda ('50MB', '512KB/s' o bytes) a bytes por segundo"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = _BANDWIDTH.fullmatch(value.strip().upper())
+    if not match:
+        raise ConfigurationError(f"Ancho de banda inválido: {value}")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+def load_manifest(path: str) -> MigrationManifest:
+    """
+    Lee un manifiesto de migración en YAML.
+
+    El manifiesto tiene tres secciones: `limits` (SchedulerLimits),
+    `defaults` (opciones de run_migration comunes a todas las tablas) y
+    `tables`, con una entrada por tabla de destino:
+
+        tables:
+          - name: comunas                # tabla en S3 y Glue
+            source: shapes.comunas       # tabla de origen...
+            geometry_column: geom
+            dedup_key: [id]
+            partitioning: {method: percentile, key_column: id, workers: 4}
+            options: {output_format: geoparquet}
+          - name: barrios_vigentes
+            query: SELECT id, nombre, geometry FROM shapes.barrios WHERE vigente
+
+    Args:
+        path: Ruta del archivo YAML
+
+    Returns:
+        MigrationManifest con las opciones por defecto ya aplicadas
+    """
+    with open(path, encoding='utf-8') as f:
+        document = yaml.safe_load(f) or {}
+    return parse_manifest(document)
+
+def parse_manifest(document: Dict[str, Any]) -> MigrationManifest:
+    """
+    Valida un manifiesto ya leído (ver `load_manifest`).
+
+    Args:
+        document: Contenido del manifiesto
+
+    Returns:
+        MigrationManifest
+    """
+    unknown = sorted(set(document) - {'limits', 'defaults', 'tables'})
+    if unknown:
+        raise ConfigurationError(f"Secciones desconocidas en el manifiesto: {unknown}")
+
+    limits = dict(document.get('limits') or {})
+    if 'upload_bandwidth' in limits:
+        limits['upload_bandwidth'] = parse_bandwidth(limits['upload_bandwidth'])
+    try:
+        limits = SchedulerLimits(**limits)
+    except TypeError as e:
+        raise ConfigurationError(f"Límites inválidos en el manifiesto: {str(e)}")
+    if limits.db_connections <= 0 or limits.cpu_workers <= 0:
+        raise ConfigurationError("db_connections y cpu_workers deben ser mayores que cero")
+
+    defaults = document.get('defaults') or {}
+    tables = []
+    for entry in document.get('tables') or []:
+        try:
+            table = TableManifest(**entry)
+        except TypeError as e:
+            raise ConfigurationError(f"Tabla inválida en el manifiesto: {str(e)}")
+        table.options = {**defaults, **table.options}
+        if isinstance(table.dedup_key, str):
+            table.dedup_key = [table.dedup_key]
+        _validate_table(table)
+        tables.append(table)
+
+    if not tables:
+        raise ConfigurationError("El manifiesto no tiene tablas")
+    names = [table.name for table in tables]
+    duplicated = sorted({name for name in names if names.count(name) > 1})
+    if duplicated:
+        raise ConfigurationError(f"Tablas de destino repetidas en el manifiesto: {duplicated}")
+
+    return MigrationManifest(tables=tables, limits=limits)
+
+def _validate_table(table: TableManifest):
+    """Comprueba que la entrada de una tabla sea coherente"""
+    if (table.source is None) == (table.query is None):
+        raise ConfigurationError(f"{table.name}: indicar source o query (uno solo)")
+
+    reserved = sorted(set(table.options) & set(RESERVED_OPTIONS))
+    if reserved:
+        raise ConfigurationError(f"{table.name}: opciones reservadas del manifiesto: {reserved}")
+
+    partitioning = table.partitioning or {}
+    method = partitioning.get('method', 'minmax')
+    if method not in PARTITION_METHODS:
+        raise ConfigurationError(f"{table.name}: método de particionado no soportado: {method}")
+
+    if table.query is not None:
+        # Una consulta arbitraria no tiene schema en el catálogo
+        if table.geometry_column != 'geometry' or table.dedup_key:
+            raise ConfigurationError(
+                f"{table.name}: con query, la geometría debe llamarse geometry y "
+                "la deduplicación debe hacerse en la consulta"
+            )
+        if table.options.get('columns') or table.options.get('exclude_columns'):
+            raise ConfigurationError(f"{table.name}: columns y exclude_columns requieren source")
+        if table.partitioning and method == 'quadtree':
+            raise ConfigurationError(f"{table.name}: el particionado quadtree requiere source")
+    elif table.partitioning and method == 'quadtree' and (
+        table.geometry_column != 'geometry' or table.dedup_key
+    ):
+        raise ConfigurationError(
+            f"{table.name}: el particionado quadtree no admite geometry_column ni dedup_key"
+        )
+
+class ResourcePool:
+    """
+    Cupos de recursos con nombre que se adquieren juntos.
+
+    Una tabla reserva todos sus cupos a la vez o espera sin reservar
+    ninguno, de modo que dos tablas no pueden bloquearse entre sí.
+    """
+
+    def __init__(self, capacity: Dict[str, int]):
+        self.capacity = dict(capacity)
+        self._available = dict(capacity)
+        self._condition = threading.Condition()
+
+    def acquire(self, demand: Dict[str, int]):
+        with self._condition:
+            self._condition.wait_for(
+                lambda: all(self._available[name] >= n for name, n in demand.items())
+            )
+            for name, n in demand.items():
+                self._available[name] -= n
+
+    def release(self, demand: Dict[str, int]):
+        with self._condition:
+            for name, n in demand.items():
+                self._available[name] += n
+            self._condition.notify_all()
+
+    def available(self) -> Dict[str, int]:
+        with self._condition:
+            return dict(self._available)
+
+class MigrationScheduler:
+    """
+    Migra las tablas de un manifiesto en paralelo bajo límites globales.
+
+    Todas las tablas comparten una misma SpatialDataMigration: el pool de
+    conexiones de PostgreSQL (dimensionado para `db_connections`), los
+    clientes de S3 y Glue y los caches de schema y SRID. Cada tabla
+    reserva, antes de empezar, las conexiones y los núcleos que va a usar
+    (los procesos de extracción en modo 'parallel' y los hilos de
+    transformación) y los devuelve al terminar; las tablas se lanzan en
+    el orden del manifiesto a medida que hay cupo. Las subidas a S3 de
+    todas las tablas comparten un único límite de bytes por segundo.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        limits: Optional[SchedulerLimits] = None,
+        migration: Optional[SpatialDataMigration] = None
+    ):
+        self.limits = limits or SchedulerLimits()
+        if migration is None:
+            postgres = replace(
+                config.postgres,
+                pool_size=max(config.postgres.pool_size, self.limits.db_connections)
+            )
+            migration = SpatialDataMigration(replace(config, postgres=postgres))
+        self.migration = migration
+        self.resources = ResourcePool({
+            'db_connections': self.limits.db_connections,
+            'cpu_workers': self.limits.cpu_workers
+        })
+        self.upload_limiter = None
+        if self.limits.upload_bandwidth:
+            # El balde admite una parte entera: las partes no se fragmentan
+            self.upload_limiter = RateLimiter(self.limits.upload_bandwidth, burst=DEFAULT_PART_SIZE)
+
+    def run(self, tables: List[TableManifest]) -> Dict[str, bool]:
+        """
+        Migra las tablas respetando los límites globales.
+
+        El error de una tabla se registra y no detiene a las demás.
+
+        Args:
+            tables: Tablas del manifiesto
+
+        Returns:
+            Diccionario tabla de destino -> True si su migración fue exitosa
+        """
+        results: Dict[str, bool] = {}
+        futures = {}
+        with ThreadPoolExecutor(
+            max_workers=self.limits.db_connections,
+            thread_name_prefix='tabla'
+        ) as executor:
+            for table in tables:
+                options = self.table_options(table)
+                demand = self.demand(options)
+                self.resources.acquire(demand)
+                logger.info(f"Lanzando {table.name} ({demand}); libres {self.resources.available()}")
+                try:
+                    future = executor.submit(self._run_table, table, options)
+                except Exception:
+                    self.resources.release(demand)
+                    raise
+                future.add_done_callback(lambda _, demand=demand: self.resources.release(demand))
+                futures[future] = table.name
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = bool(future.result())
+                except Exception as e:
+                    logger.error(f"Error en la migración de {name}: {str(e)}")
+                    results[name] = False
+
+        failed = [name for name, success in results.items() if not success]
+        logger.info(f"Migradas {len(results) - len(failed)} de {len(results)} tablas")
+        if failed:
+            logger.error(f"Tablas con error: {failed}")
+        return {table.name: results[table.name] for table in tables}
+
+    def table_options(self, table: TableManifest) -> Dict[str, Any]:
+        """
+        Opciones de run_migration de una tabla del manifiesto.
+
+        El particionado se traduce a extracción paralela, y los procesos y
+        los hilos de transformación se recortan a los límites globales
+        para que una tabla sola nunca los supere.
+        """
+        options = dict(table.options)
+        if table.partitioning:
+            partitioning = table.partitioning
+            options['extraction_mode'] = 'parallel'
+            options['partition_method'] = partitioning.get('method', 'minmax')
+            for key in ('key_column', 'workers', 'partitions'):
+                if key in partitioning:
+                    options[key] = partitioning[key]
+
+        if options.get('extraction_mode', 'single') == 'parallel':
+            options['workers'] = min(options.get('workers', 4), self.limits.db_connections)
+        if 'transform_workers' in options or self._pipelined(options):
+            extraction = self._extraction_workers(options)
+            options['transform_workers'] = max(
+                1,
+                min(options.get('transform_workers', 1), self.limits.cpu_workers - extraction)
+            )
+
+        if table.query is not None:
+            # Sin schema en el catálogo se usan los tipos que infiere Arrow
+            options['type_mapping'] = False
+        options['target_table'] = table.name
+        if self.upload_limiter is not None:
+            options['upload_limiter'] = self.upload_limiter
+        return options
+
+    def demand(self, options: Dict[str, Any]) -> Dict[str, int]:
+        """Conexiones y núcleos que una tabla reserva mientras se migra"""
+        extraction = self._extraction_workers(options)
+        cpu = extraction + (options.get('transform_workers', 1) if self._pipelined(options) else 0)
+        return {
+            'db_connections': min(extraction, self.limits.db_connections),
+            'cpu_workers': min(cpu, self.limits.cpu_workers)
+        }
+
+    def _extraction_workers(self, options: Dict[str, Any]) -> int:
+        if options.get('extraction_mode', 'single') == 'parallel':
+            return options.get('workers', 4)
+        return 1
+
+    def _pipelined(self, options: Dict[str, Any]) -> bool:
+        return options.get('extraction_mode', 'single') != 'single' and options.get('pipeline', True)
+
+    def _run_table(self, table: TableManifest, options: Dict[str, Any]) -> bool:
+        """Resuelve el origen de una tabla y la migra"""
+        if table.query is not None:
+            source = f"({table.query}) AS {quote_identifier(table.name)}"
+        else:
+            source = self.migration.extractor.source_query(
+                table.source,
+                geom_col=table.geometry_column,
+                dedup_key=table.dedup_key
+            )
+        return self.migration.run_migration(source, options)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Migra las tablas de un manifiesto: python -m spatial_migration.scheduler manifiesto.yaml"""
+    parser = argparse.ArgumentParser(description="Migra las tablas de un manifiesto YAML")
+    parser.add_argument('manifest', help="Ruta del manifiesto")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest(args.manifest)
+    scheduler = MigrationScheduler(load_config(), manifest.limits)
+    results = scheduler.run(manifest.tables)
+    return 0 if all(results.values()) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
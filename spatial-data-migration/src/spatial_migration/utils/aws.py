@@ -1,11 +1,732 @@
 # Utilidades para AWS
 
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
 import boto3
-from typing import Optional
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from botocore.exceptions import ClientError
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from ..exceptions import AthenaQueryError
 from ..logger import setup_logger
 
 logger = setup_logger()
 
+# S3 exige al menos 5 MiB por parte, salvo la última
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+# Las copias server-side de objetos más grandes se dividen en partes
+# UploadPartCopy paralelas (CopyObject acepta hasta 5 GiB)
+DEFAULT_COPY_PART_SIZE = 256 * 1024 * 1024
+MAX_COPY_OBJECT_SIZE = 5 * 1024 ** 3
+
+class S3MultipartWriter:
+    """
+    Archivo de sólo escritura que sube su contenido a S3 por partes.
+
+    Cada vez que se acumulan `part_size` bytes se envía una parte con
+    `upload_part` en un pool de hilos, mientras quien escribe (por ejemplo
+    un `pq.ParquetWriter`) sigue produciendo datos. A lo sumo
+    `max_concurrency` partes están en vuelo, lo que acota la memoria a
+    unas (max_concurrency + 1) * part_size. Si el contenido total cabe en
+    una parte se usa `put_object` y no se crea la carga multiparte.
+
+    Al cerrar se completa la carga; si el bloque `with` termina con una
+    excepción, la carga se aborta y no queda ningún objeto parcial.
+
+    Con `rate_limiter` (en bytes por segundo) cada parte espera su cupo
+    antes de enviarse; compartido entre varias cargas acota el ancho de
+    banda de todas juntas.
+    """
+
+    def __init__(
+        self,
+        s3_client: Any,
+        bucket: str,
+        key: str,
+        part_size: int = DEFAULT_PART_SIZE,
+        max_concurrency: int = 4,
+        rate_limiter: Optional['RateLimiter'] = None
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size debe ser de al menos {MIN_PART_SIZE} bytes")
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency debe ser mayor que cero")
+
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.closed = False
+
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id: Optional[str] = None
+        self._futures: List[Future] = []
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def write(self, data) -> int:
+        """Agrega datos y envía las partes completas"""
+        if self.closed:
+            raise ValueError("Escritura sobre un S3MultipartWriter cerrado")
+
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(part)
+        return len(data)
+
+    def close(self):
+        """Sube lo pendiente y completa la carga"""
+        if self.closed:
+            return
+        self.closed = True
+
+        try:
+            if self._upload_id is None:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(len(self._buffer))
+                self.s3_client.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Body=bytes(self._buffer)
+                )
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                parts = [future.result() for future in self._futures]
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+            logger.info(
+                f"Subidos {self._position} bytes a s3://{self.bucket}/{self.key} "
+                f"en {max(len(self._futures), 1)} partes"
+            )
+        except Exception:
+            self._abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            self._shutdown()
+
+    def abort(self):
+        """Cancela la carga y descarta las partes ya subidas"""
+        if self.closed:
+            return
+        self.closed = True
+        self._abort()
+        self._shutdown()
+
+    def __enter__(self) -> 'S3MultipartWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _submit_part(self, data: bytes):
+        """Envía una parte, esperando si ya hay `max_concurrency` en vuelo"""
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+            self._upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix='s3-part'
+            )
+
+        # Propagar cuanto antes el error de una parte anterior
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        try:
+            future = self._executor.submit(self._upload_part, part_number, data)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload_part(self, part_number: int, data: bytes) -> Dict[str, Any]:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(len(data))
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def _abort(self):
+        if self._upload_id is None:
+            return
+        for future in self._futures:
+            future.cancel()
+        try:
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id
+            )
+            logger.warning(f"Carga multiparte abortada: s3://{self.bucket}/{self.key}")
+        except Exception as e:
+            logger.error(f"Error abortando carga multiparte: {str(e)}")
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+def list_objects(s3_client: Any, bucket: str, prefix: str) -> List[Dict[str, Any]]:
+    """Lista todos los objetos bajo un prefijo (Key, Size, ...), paginando"""
+    objects = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        objects.extend(page.get('Contents', []))
+    return objects
+
+def copy_prefix(
+    s3_client: Any,
+    bucket: str,
+    source_prefix: str,
+    dest_prefix: str,
+    max_concurrency: int = 16,
+    part_size: int = DEFAULT_COPY_PART_SIZE
+) -> Tuple[int, int]:
+    """
+    Copia todos los objetos de un prefijo a otro dentro de S3.
+
+    La copia es server-side: los datos no pasan por el cliente, que sólo
+    envía las llamadas. Los objetos hasta `part_size` se copian con
+    CopyObject y los mayores con una carga multiparte de UploadPartCopy
+    por rangos; todas las llamadas comparten un pool de `max_concurrency`
+    hilos, así que los objetos grandes también se copian en paralelo. Si
+    alguna copia falla se abortan las cargas multiparte pendientes.
+
+    Args:
+        s3_client: Cliente de S3
+        bucket: Bucket de origen y destino
+        source_prefix: Prefijo a copiar
+        dest_prefix: Prefijo de destino; conserva las claves relativas
+        max_concurrency: Llamadas de copia simultáneas
+        part_size: Bytes por parte de las copias multiparte
+
+    Returns:
+        Tupla (objetos copiados, bytes copiados)
+    """
+    if not MIN_PART_SIZE <= part_size <= MAX_COPY_OBJECT_SIZE:
+        raise ValueError(
+            f"part_size debe estar entre {MIN_PART_SIZE} y {MAX_COPY_OBJECT_SIZE} bytes"
+        )
+
+    objects = list_objects(s3_client, bucket, source_prefix)
+    pending: List[Future] = []
+    uploads: List[Tuple[str, str, List[Future]]] = []
+
+    def copy_part(key: str, dest: str, upload_id: str, number: int, start: int, end: int):
+        response = s3_client.upload_part_copy(
+            Bucket=bucket,
+            Key=dest,
+            UploadId=upload_id,
+            PartNumber=number,
+            CopySource={'Bucket': bucket, 'Key': key},
+            CopySourceRange=f"bytes={start}-{end}"
+        )
+        return {'PartNumber': number, 'ETag': response['CopyPartResult']['ETag']}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='s3-copy') as executor:
+        try:
+            for obj in objects:
+                key, size = obj['Key'], obj['Size']
+                dest = dest_prefix + key[len(source_prefix):]
+                if size <= part_size:
+                    pending.append(executor.submit(
+                        s3_client.copy_object,
+                        Bucket=bucket,
+                        Key=dest,
+                        CopySource={'Bucket': bucket, 'Key': key}
+                    ))
+                    continue
+
+                upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=dest)['UploadId']
+                parts = []
+                uploads.append((dest, upload_id, parts))
+                for number, start in enumerate(range(0, size, part_size), start=1):
+                    end = min(start + part_size, size) - 1
+                    parts.append(executor.submit(copy_part, key, dest, upload_id, number, start, end))
+
+            for future in pending:
+                future.result()
+            while uploads:
+                dest, upload_id, parts = uploads[0]
+                s3_client.complete_multipart_upload(
+                    Bucket=bucket,
+                    Key=dest,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': [future.result() for future in parts]}
+                )
+                uploads.pop(0)
+
+        except Exception as e:
+            logger.error(f"Error copiando s3://{bucket}/{source_prefix}: {str(e)}")
+            for future in pending:
+                future.cancel()
+            for dest, upload_id, parts in uploads:
+                for future in parts:
+                    future.cancel()
+                try:
+                    s3_client.abort_multipart_upload(Bucket=bucket, Key=dest, UploadId=upload_id)
+                except Exception as abort_error:
+                    logger.error(f"Error abortando la copia de {dest}: {str(abort_error)}")
+            raise
+
+    total = sum(obj['Size'] for obj in objects)
+    logger.info(
+        f"Copiados {len(objects)} objetos ({total} bytes) de s3://{bucket}/{source_prefix} "
+        f"a s3://{bucket}/{dest_prefix}"
+    )
+    return len(objects), total
+
+# Estados finales de una consulta de Athena
+ATHENA_TERMINAL_STATES = ('SUCCEEDED', 'FAILED', 'CANCELLED')
+
+# batch_get_query_execution acepta hasta 50 ids por llamada
+ATHENA_BATCH_SIZE = 50
+
+THROTTLING_ERRORS = ('ThrottlingException', 'TooManyRequestsException')
+
+# Tipos de Athena que el lector CSV puede convertir directamente; los
+# demás (varchar, json, array, map, row, varbinary...) se leen como texto
+ATHENA_ARROW_TYPES = {
+    'boolean': pa.bool_(),
+    'tinyint': pa.int8(),
+    'smallint': pa.int16(),
+    'integer': pa.int32(),
+    'bigint': pa.int64(),
+    'float': pa.float32(),
+    'real': pa.float32(),
+    'double': pa.float64(),
+    'date': pa.date32(),
+    'timestamp': pa.timestamp('ms')
+}
+
+# Bytes de CSV que se convierten en cada lote Arrow
+RESULT_BLOCK_SIZE = 16 * 1024 * 1024
+
+def parse_s3_uri(uri: str) -> Tuple[str, str]:
+    """Separa una URI s3://bucket/clave en (bucket, clave)"""
+    parsed = urlparse(uri)
+    if parsed.scheme != 's3' or not parsed.netloc:
+        raise ValueError(f"URI de S3 inválida: {uri}")
+    return parsed.netloc, parsed.path.lstrip('/')
+
+def athena_arrow_type(column_info: Dict[str, Any]) -> pa.DataType:
+    """Tipo Arrow para una columna de ResultSetMetadata de Athena"""
+    athena_type = column_info['Type'].lower()
+    if athena_type == 'decimal':
+        return pa.decimal128(column_info['Precision'], column_info['Scale'])
+    return ATHENA_ARROW_TYPES.get(athena_type, pa.string())
+
+class RateLimiter:
+    """
+    Limitador de llamadas por segundo (token bucket) seguro entre hilos.
+
+    Una misma instancia puede compartirse entre varios AthenaQueryManager
+    para que, en conjunto, no superen la cuota de la API, o entre varias
+    cargas a S3 (con `rate` en bytes por segundo) para acotar el ancho de
+    banda total.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        if rate <= 0:
+            raise ValueError("rate debe ser mayor que cero")
+
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        """
+        Espera hasta que haya permisos disponibles y los consume
+
+        Un pedido mayor que `burst` (por ejemplo una parte de S3 entera) se
+        concede con el balde lleno y deja el saldo en negativo: los pedidos
+        siguientes esperan lo que corresponde al exceso.
+        """
+        needed = min(tokens, self.burst)
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return
+                wait = (needed - self._tokens) / self.rate
+            self._sleep(wait)
+
+class _PendingQuery:
+    """Estado interno de una consulta enviada a AthenaQueryManager"""
+
+    def __init__(self, query: str, database: str, timeout: float):
+        self.query = query
+        self.database = database
+        self.timeout = timeout
+        self.future: Future = Future()
+        self.execution_id: Optional[str] = None
+        self.deadline = 0.0
+        self.delay = 0.0
+        self.next_poll = 0.0
+
+class AthenaQueryManager:
+    """
+    Ejecuta consultas de Athena en paralelo sin bloquear a quien las envía.
+
+    `submit` devuelve un Future de inmediato. Un único hilo inicia las
+    consultas (a lo sumo `max_concurrency` a la vez), consulta el estado
+    de todas las que están en curso con `batch_get_query_execution` y
+    espacia los sondeos de cada una con backoff exponencial. Todas las
+    llamadas a la API pasan por el mismo RateLimiter y se reintentan si
+    Athena responde con throttling.
+
+    El tiempo máximo de cada consulta se mide en segundos de reloj desde
+    que se inicia; al vencer se detiene con `stop_query_execution` y el
+    Future falla con TimeoutError.
+    """
+
+    def __init__(
+        self,
+        athena_client: Any,
+        database: str,
+        output_location: str,
+        max_concurrency: int = 5,
+        rate_limiter: Optional[RateLimiter] = None,
+        timeout: float = 300,
+        initial_delay: float = 0.5,
+        max_delay: float = 10,
+        backoff: float = 2,
+        max_retries: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+        s3_client: Optional[Any] = None
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency debe ser mayor que cero")
+
+        self.athena_client = athena_client
+        self.database = database
+        self.output_location = output_location
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or RateLimiter(rate=5, burst=5)
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.max_retries = max_retries
+        self._clock = clock
+        self._s3_client = s3_client
+
+        self._queued: deque = deque()
+        self._running: List[_PendingQuery] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        query: str,
+        database: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Future:
+        """
+        Encola una consulta y devuelve su Future sin esperar a Athena
+
+        Args:
+            query: Consulta SQL
+            database: Base de datos de Athena (por defecto la del manager)
+            timeout: Segundos máximos de ejecución (por defecto los del manager)
+
+        Returns:
+            Future que resuelve al diccionario QueryExecution de la consulta
+            terminada, o falla con AthenaQueryError o TimeoutError
+        """
+        pending = _PendingQuery(
+            query,
+            database or self.database,
+            self.timeout if timeout is None else timeout
+        )
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("AthenaQueryManager cerrado")
+            self._queued.append(pending)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='athena-queries',
+                    daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+        return pending.future
+
+    def get_rows(self, query_execution_id: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene todas las filas de una consulta terminada, página por página
+
+        Args:
+            query_execution_id: Id de la ejecución
+
+        Returns:
+            Filas en el formato de get_query_results (la primera es el encabezado)
+        """
+        rows: List[Dict[str, Any]] = []
+        kwargs = {'QueryExecutionId': query_execution_id}
+        while True:
+            response = self._call(self.athena_client.get_query_results, **kwargs)
+            rows.extend(response['ResultSet']['Rows'])
+            if not response.get('NextToken'):
+                return rows
+            kwargs['NextToken'] = response['NextToken']
+
+    def get_result_schema(self, query_execution_id: str) -> pa.Schema:
+        """Esquema Arrow de los resultados, leído de ResultSetMetadata"""
+        response = self._call(
+            self.athena_client.get_query_results,
+            QueryExecutionId=query_execution_id,
+            MaxResults=1
+        )
+        columns = response['ResultSet']['ResultSetMetadata']['ColumnInfo']
+        return pa.schema([(column['Name'], athena_arrow_type(column)) for column in columns])
+
+    @contextmanager
+    def open_results(
+        self,
+        execution: Dict[str, Any],
+        block_size: int = RESULT_BLOCK_SIZE
+    ) -> Iterator[pa.RecordBatchReader]:
+        """
+        Lee el CSV de resultados directamente desde S3 como lotes Arrow
+
+        El objeto se descarga y convierte por bloques, sin pasar por
+        get_query_results ni acumular todas las filas en memoria.
+
+        Args:
+            execution: QueryExecution de una consulta SELECT terminada
+                (el resultado de su Future)
+            block_size: Bytes de CSV por lote
+
+        Returns:
+            RecordBatchReader con los tipos de las columnas de Athena
+        """
+        schema = self.get_result_schema(execution['QueryExecutionId'])
+        bucket, key = parse_s3_uri(execution['ResultConfiguration']['OutputLocation'])
+        if self._s3_client is None:
+            self._s3_client = boto3.client('s3', region_name=self.athena_client.meta.region_name)
+
+        self.rate_limiter.acquire()
+        body = self._s3_client.get_object(Bucket=bucket, Key=key)['Body']
+        try:
+            yield pacsv.open_csv(
+                body,
+                read_options=pacsv.ReadOptions(
+                    block_size=block_size,
+                    column_names=schema.names,
+                    skip_rows=1
+                ),
+                convert_options=pacsv.ConvertOptions(
+                    column_types=schema,
+                    # Athena escribe NULL sin comillas y el texto vacío como ""
+                    strings_can_be_null=True,
+                    quoted_strings_can_be_null=False
+                )
+            )
+        finally:
+            body.close()
+
+    def read_table(self, execution: Dict[str, Any]) -> pa.Table:
+        """Lee los resultados completos de una consulta como tabla Arrow"""
+        with self.open_results(execution) as reader:
+            return reader.read_all()
+
+    def execute(
+        self,
+        query: str,
+        database: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Ejecuta una consulta, espera a que termine y devuelve sus filas"""
+        execution = self.submit(query, database, timeout).result()
+        return self.get_rows(execution['QueryExecutionId'])
+
+    def close(self):
+        """Espera a las consultas pendientes y detiene el hilo de sondeo"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'AthenaQueryManager':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not (self._queued or self._running or self._closed):
+                    self._condition.wait()
+                if not (self._queued or self._running):
+                    return
+                starting = []
+                while self._queued and len(self._running) + len(starting) < self.max_concurrency:
+                    starting.append(self._queued.popleft())
+
+            for pending in starting:
+                self._start(pending)
+
+            now = self._clock()
+            due = [pending for pending in self._running if pending.next_poll <= now]
+            for i in range(0, len(due), ATHENA_BATCH_SIZE):
+                self._poll(due[i:i + ATHENA_BATCH_SIZE])
+
+            if self._running and not due:
+                wait = min(pending.next_poll for pending in self._running) - self._clock()
+                with self._condition:
+                    # Una consulta nueva despierta al hilo antes de tiempo
+                    if not self._queued or len(self._running) >= self.max_concurrency:
+                        self._condition.wait(max(wait, 0))
+
+    def _start(self, pending: _PendingQuery):
+        if not pending.future.set_running_or_notify_cancel():
+            return
+        try:
+            response = self._call(
+                self.athena_client.start_query_execution,
+                QueryString=pending.query,
+                QueryExecutionContext={'Database': pending.database},
+                ResultConfiguration={'OutputLocation': self.output_location}
+            )
+        except Exception as e:
+            logger.error(f"Error iniciando consulta Athena: {str(e)}")
+            pending.future.set_exception(e)
+            return
+
+        now = self._clock()
+        pending.execution_id = response['QueryExecutionId']
+        pending.deadline = now + pending.timeout
+        pending.delay = self.initial_delay
+        pending.next_poll = now + pending.delay
+        self._running.append(pending)
+
+    def _poll(self, batch: List[_PendingQuery]):
+        try:
+            response = self._call(
+                self.athena_client.batch_get_query_execution,
+                QueryExecutionIds=[pending.execution_id for pending in batch]
+            )
+        except Exception as e:
+            logger.error(f"Error consultando estado en Athena: {str(e)}")
+            for pending in batch:
+                self._running.remove(pending)
+                pending.future.set_exception(e)
+            return
+
+        executions = {
+            execution['QueryExecutionId']: execution
+            for execution in response.get('QueryExecutions', [])
+        }
+        now = self._clock()
+        for pending in batch:
+            execution = executions.get(pending.execution_id)
+            state = execution['Status']['State'] if execution else None
+
+            if state in ATHENA_TERMINAL_STATES:
+                self._running.remove(pending)
+                if state == 'SUCCEEDED':
+                    pending.future.set_result(execution)
+                else:
+                    reason = execution['Status'].get('StateChangeReason', state)
+                    logger.error(f"Query failed: {reason}")
+                    pending.future.set_exception(
+                        AthenaQueryError(f"Consulta {pending.execution_id} {state}: {reason}")
+                    )
+            elif now >= pending.deadline:
+                self._running.remove(pending)
+                self._stop(pending)
+                pending.future.set_exception(TimeoutError(
+                    f"La consulta {pending.execution_id} superó {pending.timeout} segundos"
+                ))
+            else:
+                pending.delay = min(pending.delay * self.backoff, self.max_delay)
+                pending.next_poll = min(now + pending.delay, pending.deadline)
+
+    def _stop(self, pending: _PendingQuery):
+        try:
+            self._call(
+                self.athena_client.stop_query_execution,
+                QueryExecutionId=pending.execution_id
+            )
+            logger.warning(f"Consulta Athena detenida por tiempo: {pending.execution_id}")
+        except Exception as e:
+            logger.error(f"Error deteniendo consulta Athena: {str(e)}")
+
+    def _call(self, method: Callable, **kwargs) -> Dict[str, Any]:
+        """Llama a la API respetando el límite compartido y reintenta el throttling"""
+        delay = self.initial_delay
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return method(**kwargs)
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in THROTTLING_ERRORS or attempt == self.max_retries:
+                    raise
+                logger.warning(f"Throttling de Athena ({code}), reintentando en {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * self.backoff, self.max_delay)
+
 def get_athena_query_results(
     query: str,
     database: str,
@@ -21,50 +742,21 @@ def get_athena_query_results(
         database: Base de datos de Athena
         s3_output: Ubicación en S3 para resultados
         region: Región de AWS
-        max_execution_time: Tiempo máximo de espera en segundos
+        max_execution_time: Tiempo máximo de ejecución en segundos de reloj
     
     Returns:
         Lista de resultados o None si hay error
     """
     try:
         athena_client = boto3.client('athena', region_name=region)
-        
-        # Iniciar consulta
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={
-                'Database': database
-            },
-            ResultConfiguration={
-                'OutputLocation': s3_output
-            }
-        )
-        
-        query_execution_id = response['QueryExecutionId']
-        
-        # Esperar resultados
-        state = 'RUNNING'
-        while max_execution_time > 0 and state in ['RUNNING', 'QUEUED']:
-            response = athena_client.get_query_execution(
-                QueryExecutionId=query_execution_id
-            )
-            state = response['QueryExecution']['Status']['State']
-            
-            if state == 'FAILED':
-                reason = response['QueryExecution']['Status']['StateChangeReason']
-                logger.error(f"Query failed: {reason}")
-                return None
-                
-            if state == 'SUCCEEDED':
-                results = athena_client.get_query_results(
-                    QueryExecutionId=query_execution_id
-                )
-                return results['ResultSet']['Rows']
-            
-            max_execution_time -= 1
-            
-        return None
-        
+        with AthenaQueryManager(
+            athena_client,
+            database,
+            s3_output,
+            timeout=max_execution_time
+        ) as manager:
+            return manager.execute(query)
+
     except Exception as e:
         logger.error(f"Error en consulta Athena: {str(e)}")
         return None
@@ -1,37 +1,308 @@
 # Utilidades para base de datos
 # # src/spatial_migration/utils/db.py
-from typing import Optional, Dict, Any
+import threading
+import time
+from typing import Optional, Dict, Any, Callable, Mapping, Sequence, Tuple
+import boto3
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine
+from ..config import PostgresConfig
 from ..exceptions import ConfigurationError
 from ..logger import setup_logger
+from ..models.schemas import PostgresTableSchema
 
 logger = setup_logger()
 
+# Los tokens IAM de RDS valen 15 minutos para abrir conexiones nuevas
+RDS_TOKEN_TTL = 15 * 60
+RDS_TOKEN_REFRESH_MARGIN = 60
+
+# Columnas de information_schema con la geometría registrada en PostGIS.
+# Usa el estilo de parámetros de psycopg2 para servir también con SQLAlchemy
+# (exec_driver_sql).
+TABLE_SCHEMA_QUERY = """
+SELECT c.column_name,
+       c.data_type,
+       c.udt_name,
+       c.character_maximum_length,
+       c.numeric_precision,
+       c.numeric_scale,
+       c.is_nullable = 'YES' AS nullable,
+       g.type AS geometry_type,
+       g.srid
+FROM information_schema.columns c
+LEFT JOIN geometry_columns g
+  ON g.f_table_schema = c.table_schema
+ AND g.f_table_name = c.table_name
+ AND g.f_geometry_column = c.column_name
+WHERE c.table_schema = COALESCE(%(schema)s, current_schema())
+  AND c.table_name = %(table)s
+ORDER BY c.ordinal_position
+"""
+
+class RDSTokenCache:
+    """
+    Token de autenticación IAM de RDS reutilizable entre conexiones.
+
+    El token se genera una vez y se renueva `refresh_margin` segundos
+    antes de vencer, de modo que las conexiones abiertas durante una
+    corrida larga nunca reciben un token vencido. Una conexión ya
+    establecida sigue siendo válida aunque su token expire.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        region: Optional[str] = None,
+        rds_client: Optional[Any] = None,
+        ttl: float = RDS_TOKEN_TTL,
+        refresh_margin: float = RDS_TOKEN_REFRESH_MARGIN,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.region = region
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._rds_client = rds_client
+        self._clock = clock
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_token(self) -> str:
+        """Devuelve el token vigente, renovándolo si está por vencer"""
+        with self._lock:
+            now = self._clock()
+            if self._token is None or now >= self._expires_at - self.refresh_margin:
+                if self._rds_client is None:
+                    self._rds_client = boto3.client('rds', region_name=self.region)
+                self._token = self._rds_client.generate_db_auth_token(
+                    DBHostname=self.host,
+                    Port=self.port,
+                    DBUsername=self.user,
+                    Region=self.region
+                )
+                self._expires_at = now + self.ttl
+                logger.info(f"Token IAM de RDS renovado para {self.user}@{self.host}")
+            return self._token
+
+class ConnectionProvider:
+    """
+    Pool de conexiones compartido para una base de datos.
+
+    Crea un único engine de SQLAlchemy con tamaño de pool y pre-ping
+    (las conexiones caídas se descartan antes de entregarse). Con
+    autenticación IAM, cada conexión nueva recibe el token vigente de
+    `RDSTokenCache` en lugar del password de la configuración.
+    """
+
+    def __init__(
+        self,
+        config: PostgresConfig,
+        token_cache: Optional[RDSTokenCache] = None,
+        pool_recycle: int = 1800
+    ):
+        self.config = config
+        self.pool_recycle = pool_recycle
+        if token_cache is None and config.iam_auth:
+            token_cache = RDSTokenCache(
+                config.host,
+                config.port,
+                config.user,
+                region=config.region
+            )
+        self.token_cache = token_cache
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> Engine:
+        with self._lock:
+            if self._engine is None:
+                self._engine = self._create_engine()
+            return self._engine
+
+    def connection_params(self) -> Dict[str, Any]:
+        """Parámetros para psycopg2.connect, con el password o token vigente"""
+        params = {
+            'host': self.config.host,
+            'port': self.config.port,
+            'dbname': self.config.database,
+            'user': self.config.user,
+            'password': self.config.password
+        }
+        if self.token_cache is not None:
+            params['password'] = self.token_cache.get_token()
+            # RDS sólo acepta tokens IAM sobre SSL
+            params['sslmode'] = 'require'
+        return params
+
+    def raw_connection(self):
+        """Conexión DBAPI tomada del pool; close() la devuelve al pool"""
+        return self.engine.raw_connection()
+
+    def dispose(self):
+        """Cierra las conexiones del pool (por ejemplo antes de crear procesos)"""
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+
+    def _create_engine(self) -> Engine:
+        url = URL.create(
+            'postgresql+psycopg2',
+            username=self.config.user,
+            password=self.config.password or None,
+            host=self.config.host,
+            port=self.config.port,
+            database=self.config.database
+        )
+        engine = create_engine(
+            url,
+            pool_size=self.config.pool_size,
+            max_overflow=self.config.max_overflow,
+            pool_pre_ping=True,
+            pool_recycle=self.pool_recycle
+        )
+        if self.token_cache is not None:
+            @event.listens_for(engine, 'do_connect')
+            def _inject_token(dialect, conn_rec, cargs, cparams):
+                cparams['password'] = self.token_cache.get_token()
+                cparams.setdefault('sslmode', 'require')
+
+        logger.info(
+            f"Pool de conexiones para {self.config.host}/{self.config.database} "
+            f"(pool_size={self.config.pool_size}, max_overflow={self.config.max_overflow})"
+        )
+        return engine
+
+_providers: Dict[Tuple[Any, ...], ConnectionProvider] = {}
+_providers_lock = threading.Lock()
+
+def _provider_key(config: PostgresConfig) -> Tuple[Any, ...]:
+    # Con IAM el password de la configuración no se usa; sin IAM, dos
+    # credenciales distintas no pueden compartir engine
+    credential = ('iam', config.region) if config.iam_auth else ('password', config.password)
+    return (config.host, config.port, config.database, config.user) + credential
+
+def get_connection_provider(config: PostgresConfig) -> ConnectionProvider:
+    """
+    Devuelve el ConnectionProvider compartido para una base de datos
+
+    Todos los componentes que se conectan a la misma base (host, puerto,
+    base, usuario y credencial: password o IAM) reutilizan el mismo pool
+    y el mismo token IAM.
+
+    Args:
+        config: Configuración de PostgreSQL
+
+    Returns:
+        ConnectionProvider compartido
+    """
+    key = _provider_key(config)
+    with _providers_lock:
+        if key not in _providers:
+            _providers[key] = ConnectionProvider(config)
+        return _providers[key]
+
+def split_table_name(table_name: str) -> Tuple[Optional[str], str]:
+    """Separa 'esquema.tabla' (con o sin comillas) en (esquema o None, tabla)"""
+    schema, _, table = table_name.rpartition('.')
+    return (schema.strip('"') or None), table.strip('"')
+
+def _column_type(row: Mapping[str, Any]) -> str:
+    """Tipo de PostgreSQL de una fila de information_schema.columns"""
+    data_type = row['data_type']
+    if data_type == 'USER-DEFINED':
+        return row['udt_name']
+    if data_type == 'ARRAY':
+        return row['udt_name'].lstrip('_') + '[]'
+    if data_type == 'numeric' and row['numeric_precision'] is not None:
+        return f"numeric({row['numeric_precision']},{row['numeric_scale'] or 0})"
+    if data_type in ('character varying', 'character') and row['character_maximum_length']:
+        return f"{data_type}({row['character_maximum_length']})"
+    return data_type
+
+def table_schema_from_rows(
+    table_name: str,
+    rows: Sequence[Mapping[str, Any]],
+    geometry_column: str = 'geometry'
+) -> PostgresTableSchema:
+    """
+    Construye el schema de una tabla a partir de TABLE_SCHEMA_QUERY
+
+    Args:
+        table_name: Nombre de la tabla
+        rows: Filas de la consulta, como diccionarios
+        geometry_column: Columna geométrica preferida si hay varias
+
+    Returns:
+        PostgresTableSchema con las columnas en el orden de la tabla
+    """
+    if not rows:
+        raise ValueError(f"No se encontraron columnas para {table_name}")
+
+    geometry_columns = {
+        row['column_name']: row['srid'] or None
+        for row in rows
+        if row['geometry_type'] is not None or row['udt_name'] == 'geometry'
+    }
+    if geometry_column in geometry_columns:
+        main_geometry = geometry_column
+    else:
+        main_geometry = next(iter(geometry_columns), None)
+    geometry_type = next(
+        (row['geometry_type'] for row in rows if row['column_name'] == main_geometry),
+        None
+    )
+    return PostgresTableSchema(
+        table_name=table_name,
+        columns={row['column_name']: _column_type(row) for row in rows},
+        geometry_column=main_geometry,
+        srid=geometry_columns.get(main_geometry),
+        nullable={row['column_name']: bool(row['nullable']) for row in rows},
+        geometry_columns=geometry_columns,
+        geometry_type=geometry_type
+    )
+
 class DatabaseConnection:
     """Clase para manejar conexiones a PostgreSQL."""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], provider: Optional[ConnectionProvider] = None):
         """
         Inicializa la conexión a la base de datos.
         
         Args:
-            config: Diccionario con la configuración de conexión
+            config: Diccionario con la configuración de conexión (host,
+                port, database, user, password y opcionalmente iam_auth y region)
+            provider: Pool del que se toma la conexión; por defecto, el
+                compartido para esa base (ver `get_connection_provider`)
         """
         self.config = config
+        self.provider = provider
         self._conn = None
         self._cur = None
+        self._schema_cache: Dict[str, PostgresTableSchema] = {}
 
     def connect(self):
         """Establece la conexión a la base de datos."""
         try:
-            self._conn = psycopg2.connect(
-                host=self.config['host'],
-                port=self.config['port'],
-                database=self.config['database'],
-                user=self.config['user'],
-                password=self.config['password']
-            )
+            if self.provider is None:
+                self.provider = get_connection_provider(PostgresConfig(
+                    host=self.config['host'],
+                    port=self.config['port'],
+                    database=self.config['database'],
+                    user=self.config['user'],
+                    password=self.config.get('password', ''),
+                    iam_auth=self.config.get('iam_auth', False),
+                    region=self.config.get('region')
+                ))
+            self._conn = self.provider.raw_connection()
             self._cur = self._conn.cursor(cursor_factory=RealDictCursor)
             logger.info("Conexión a base de datos establecida")
         except Exception as e:
@@ -43,6 +314,7 @@ class DatabaseConnection:
         if self._cur:
             self._cur.close()
         if self._conn:
+            # Con un pool compartido, close() devuelve la conexión al pool
             self._conn.close()
             logger.info("Conexión a base de datos cerrada")
 
@@ -86,19 +358,32 @@ class DatabaseConnection:
         Obtiene el schema de una tabla.
         
         Args:
-            table_name: Nombre de la tabla
+            table_name: Nombre de la tabla, opcionalmente con esquema
             
         Returns:
-            Diccionario con el schema de la tabla
+            Diccionario columna -> tipo de PostgreSQL, en el orden de la tabla
         """
-        query = """
-        SELECT column_name, data_type
-        FROM information_schema.columns
-        WHERE table_name = %s
+        return self.describe_table(table_name).columns
+
+    def describe_table(self, table_name: str, refresh: bool = False) -> PostgresTableSchema:
         """
-        try:
-            results = self.execute_query(query, (table_name,))
-            return {row['column_name']: row['data_type'] for row in results}
-        except Exception as e:
-            logger.error(f"Error obteniendo schema: {str(e)}")
-            raise
\ No newline at end of file
+        Obtiene el schema completo de una tabla (tipos, nulabilidad y geometría).
+
+        El resultado se guarda por tabla; `refresh` vuelve a leer el catálogo.
+
+        Args:
+            table_name: Nombre de la tabla, opcionalmente con esquema
+            refresh: Ignorar el schema guardado
+
+        Returns:
+            PostgresTableSchema de la tabla
+        """
+        if refresh or table_name not in self._schema_cache:
+            schema, table = split_table_name(table_name)
+            try:
+                results = self.execute_query(TABLE_SCHEMA_QUERY, {'schema': schema, 'table': table})
+                self._schema_cache[table_name] = table_schema_from_rows(table_name, results)
+            except Exception as e:
+                logger.error(f"Error obteniendo schema: {str(e)}")
+                raise
+        return self._schema_cache[table_name]
\ No newline at end of file
@@ -0,0 +1,248 @@
+# Registro local de bloques cargados para reanudar migraciones
+
+# src/spatial_migration/utils/ledger.py
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+import pyarrow as pa
+from ..models.schemas import ChunkRecord, KeyRange, MigrationJob
+from ..logger import setup_logger
+
+logger = setup_logger()
+
+DEFAULT_LEDGER_PATH = 'migration_ledger.db'
+
+# Estados de una corrida: las 'running' se reanudan, las 'completed' son
+# las vigentes en S3 y las 'superseded' ya se reemplazaron y borraron
+JOB_STATES = ('running', 'completed', 'superseded')
+
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    status TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    arrow_schema BLOB,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_table ON jobs (table_name, status);
+CREATE TABLE IF NOT EXISTS chunks (
+    job_id TEXT NOT NULL REFERENCES jobs (job_id),
+    chunk_index INTEGER NOT NULL,
+    lower_bound TEXT,
+    upper_bound TEXT,
+    status TEXT NOT NULL,
+    row_count INTEGER,
+    checksum TEXT,
+    s3_key TEXT,
+    etag TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, chunk_index)
+);
+"""
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _bound(value) -> Optional[str]:
+    # Fechas y decimales se guardan como texto; PostgreSQL los convierte
+    # al tipo de la clave al compararlos
+    return None if value is None else json.dumps(value, default=str)
+
+def _unbound(value: Optional[str]):
+    return None if value is None else json.loads(value)
+
+class JobLedger:
+    """
+    Registro durable (SQLite) de las corridas reanudables y sus bloques.
+
+    Cada bloque se marca como cargado en una transacción propia después
+    de que su objeto quedó en S3, con su rango de clave, filas, checksum
+    SHA-256, clave y ETag. Tras una caída, la corrida en curso de la misma
+    tabla se retoma con los mismos rangos y sólo se procesan los bloques
+    que no llegaron a registrarse.
+
+    La base usa WAL y escrituras sincrónicas, así que un registro
+    confirmado sobrevive a la caída del proceso; varias migraciones
+    (por ejemplo las del scheduler) pueden compartir el archivo.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH, timeout: float = 30.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(LEDGER_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self) -> 'JobLedger':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open_job(
+        self,
+        table_name: str,
+        signature: str,
+        key_ranges: Callable[[], List[KeyRange]]
+    ) -> MigrationJob:
+        """
+        Retoma la corrida en curso de una tabla o crea una nueva.
+
+        Una corrida en curso sólo se retoma si su firma (origen, clave y
+        formato) coincide; si no, queda abandonada y se reemplaza al
+        completar la nueva.
+
+        Args:
+            table_name: Tabla de destino
+            signature: Firma de las opciones que determinan el contenido
+            key_ranges: Función que calcula los rangos de una corrida nueva
+
+        Returns:
+            MigrationJob con sus bloques ya registrados
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, chunk_count FROM jobs "
+                "WHERE table_name = ? AND signature = ? AND status = 'running' "
+                "ORDER BY created_at DESC LIMIT 1",
+                (table_name, signature)
+            ).fetchone()
+        if row is not None:
+            logger.info(f"Retomando la corrida {row[0]} de {table_name}")
+            return MigrationJob(row[0], table_name, signature, 'running', row[1])
+
+        ranges = key_ranges()
+        job_id = uuid.uuid4().hex[:12]
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, table_name, signature, status, chunk_count, "
+                "created_at, updated_at) VALUES (?, ?, ?, 'running', ?, ?, ?)",
+                (job_id, table_name, signature, len(ranges), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO chunks (job_id, chunk_index, lower_bound, upper_bound, status, "
+                "updated_at) VALUES (?, ?, ?, ?, 'pending', ?)",
+                [
+                    (job_id, index, _bound(r.lower), _bound(r.upper), now)
+                    for index, r in enumerate(ranges)
+                ]
+            )
+        logger.info(f"Corrida {job_id} de {table_name}: {len(ranges)} bloques")
+        return MigrationJob(job_id, table_name, signature, 'running', len(ranges))
+
+    def chunks(self, job_id: str, pending_only: bool = False) -> List[ChunkRecord]:
+        """Bloques de una corrida en orden; con `pending_only`, sólo los no cargados"""
+        query = (
+            "SELECT chunk_index, lower_bound, upper_bound, status, row_count, checksum, "
+            "s3_key, etag, attempts FROM chunks WHERE job_id = ?"
+        )
+        if pending_only:
+            query += " AND status != 'done'"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY chunk_index", (job_id,)).fetchall()
+        return [
+            ChunkRecord(
+                job_id=job_id,
+                index=row[0],
+                key_range=KeyRange(_unbound(row[1]), _unbound(row[2])),
+                status=row[3],
+                row_count=row[4],
+                checksum=row[5],
+                s3_key=row[6],
+                etag=row[7],
+                attempts=row[8]
+            )
+            for row in rows
+        ]
+
+    def commit_chunk(
+        self,
+        job_id: str,
+        index: int,
+        row_count: int,
+        checksum: Optional[str] = None,
+        s3_key: Optional[str] = None,
+        etag: Optional[str] = None
+    ):
+        """Registra un bloque cargado; un bloque sin filas no tiene objeto"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chunks SET status = 'done', row_count = ?, checksum = ?, s3_key = ?, "
+                "etag = ?, attempts = attempts + 1, error = NULL, updated_at = ? "
+                "WHERE job_id = ? AND chunk_index = ?",
+                (row_count, checksum, s3_key, etag, _now(), job_id, index)
+            )
+
+    def fail_chunk(self, job_id: str, index: int, error: str):
+        """Registra un intento fallido de un bloque"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chunks SET status = 'failed', attempts = attempts + 1, error = ?, "
+                "updated_at = ? WHERE job_id = ? AND chunk_index = ?",
+                (error, _now(), job_id, index)
+            )
+
+    def get_schema(self, job_id: str) -> Optional[pa.Schema]:
+        """Esquema Arrow de los archivos de la corrida, fijado por el primer bloque"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT arrow_schema FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return pa.ipc.read_schema(pa.py_buffer(row[0]))
+
+    def set_schema(self, job_id: str, schema: pa.Schema):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET arrow_schema = ?, updated_at = ? WHERE job_id = ?",
+                (schema.serialize().to_pybytes(), _now(), job_id)
+            )
+
+    def complete_job(self, job_id: str) -> List[MigrationJob]:
+        """
+        Marca una corrida como completada.
+
+        Las demás corridas de la misma tabla (completadas o abandonadas)
+        quedan reemplazadas.
+
+        Returns:
+            Corridas reemplazadas, cuyos objetos en S3 deben borrarse
+            (incluso los de bloques que se subieron sin llegar a registrarse)
+        """
+        with self._lock, self._conn:
+            table_name = self._conn.execute(
+                "SELECT table_name FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            stale = [
+                MigrationJob(row[0], table_name, row[1], 'superseded', row[2])
+                for row in self._conn.execute(
+                    "SELECT job_id, signature, chunk_count FROM jobs "
+                    "WHERE table_name = ? AND job_id != ? AND status != 'superseded'",
+                    (table_name, job_id)
+                )
+            ]
+            now = _now()
+            self._conn.execute(
+                "UPDATE jobs SET status = 'superseded', updated_at = ? "
+                "WHERE table_name = ? AND job_id != ? AND status != 'superseded'",
+                (now, table_name, job_id)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = 'completed', updated_at = ? WHERE job_id = ?",
+                (now, job_id)
+            )
+        return stale
@@ -0,0 +1,165 @@
+# Etapas concurrentes con colas acotadas
+
+# src/spatial_migration/utils/pipeline.py
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, TypeVar
+from ..logger import setup_logger
+
+logger = setup_logger()
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Elementos que una etapa puede adelantar a la siguiente
+DEFAULT_QUEUE_SIZE = 2
+
+_DONE = object()
+
+class StageTimer:
+    """
+    Acumula el tiempo de trabajo de cada etapa de un pipeline.
+
+    Con las etapas solapadas el tiempo total se acerca al de la etapa más
+    lenta; comparar los tiempos indica cuál conviene acelerar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def summary(self) -> str:
+        return ", ".join(f"{stage} {seconds:.1f} s" for stage, seconds in self.seconds.items())
+
+def prefetch(
+    iterable: Iterable[T],
+    maxsize: int = DEFAULT_QUEUE_SIZE,
+    name: str = 'prefetch',
+    timer: Optional[StageTimer] = None
+) -> Iterator[T]:
+    """
+    Consume un iterable en un hilo propio a través de una cola acotada.
+
+    El productor (por ejemplo la extracción de PostgreSQL) adelanta a lo
+    sumo `maxsize` elementos y se bloquea cuando la cola está llena, de
+    modo que la memoria queda acotada aunque el consumidor sea más lento.
+    Las excepciones del productor se relanzan en el consumidor; si el
+    consumidor se detiene antes de tiempo, el productor termina y el
+    iterable se cierra en su propio hilo.
+
+    Args:
+        iterable: Iterable a consumir
+        maxsize: Elementos máximos en la cola
+        name: Nombre del hilo y de la etapa en `timer`
+        timer: Acumulador del tiempo de trabajo de la etapa
+
+    Yields:
+        Los elementos del iterable, en orden
+    """
+    if maxsize <= 0:
+        raise ValueError("maxsize debe ser mayor que cero")
+
+    items: queue.Queue = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                if timer is not None:
+                    timer.add(name, time.perf_counter() - started)
+                if not put((item, None)):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put((None, e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            entry = items.get()
+            if entry is _DONE:
+                return
+            item, error = entry
+            if error is not None:
+                raise error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+def map_ordered(
+    func: Callable[[T], R],
+    iterable: Iterable[T],
+    workers: int = 1,
+    maxsize: int = DEFAULT_QUEUE_SIZE,
+    name: str = 'map',
+    timer: Optional[StageTimer] = None
+) -> Iterator[R]:
+    """
+    Aplica una función en un pool de hilos conservando el orden.
+
+    A lo sumo `workers + maxsize` elementos están en proceso o esperando
+    a ser consumidos: cuando se alcanza el límite no se toma otro elemento
+    de la entrada hasta que el consumidor recibe el más antiguo.
+
+    Args:
+        func: Función a aplicar a cada elemento
+        iterable: Entrada de la etapa
+        workers: Hilos que ejecutan `func`
+        maxsize: Resultados que se adelantan al consumidor
+        name: Nombre de los hilos y de la etapa en `timer`
+        timer: Acumulador del tiempo de trabajo de la etapa
+
+    Yields:
+        func(elemento) para cada elemento, en el orden de la entrada
+    """
+    if workers <= 0:
+        raise ValueError("workers debe ser mayor que cero")
+
+    def timed(item: T) -> R:
+        started = time.perf_counter()
+        try:
+            return func(item)
+        finally:
+            if timer is not None:
+                timer.add(name, time.perf_counter() - started)
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as executor:
+        try:
+            for item in iterable:
+                pending.append(executor.submit(timed, item))
+                if len(pending) >= workers + maxsize:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
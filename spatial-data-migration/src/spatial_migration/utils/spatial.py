@@ -0,0 +1,190 @@
+# Utilidades espaciales
+
+# src/spatial_migration/utils/spatial.py
+import heapq
+from typing import List, Optional, Sequence
+import numpy as np
+import geopandas as gpd
+import shapely
+from ..models.schemas import TileRange
+
+SPATIAL_SORT_CURVES = ('hilbert', 'zorder')
+
+def hilbert_index(x: np.ndarray, y: np.ndarray, order: int = 16) -> np.ndarray:
+    """
+    Calcula la distancia sobre la curva de Hilbert de celdas enteras.
+
+    Versión vectorizada del algoritmo clásico xy2d: se procesa un bit por
+    iteración para todo el arreglo a la vez.
+
+    Args:
+        x: Columnas de la grilla, enteros en [0, 2**order)
+        y: Filas de la grilla, enteros en [0, 2**order)
+        order: Bits por eje de la grilla
+
+    Returns:
+        Arreglo uint64 con la posición de cada celda sobre la curva
+    """
+    n = np.uint64(1 << order)
+    x = np.asarray(x, dtype=np.uint64).copy()
+    y = np.asarray(y, dtype=np.uint64).copy()
+    d = np.zeros(x.shape, dtype=np.uint64)
+
+    s = n >> np.uint64(1)
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((np.uint64(3) * rx.astype(np.uint64)) ^ ry.astype(np.uint64))
+
+        # Rotar el cuadrante para que la curva sea continua
+        flip = ~ry & rx
+        x = np.where(flip, n - np.uint64(1) - x, x)
+        y = np.where(flip, n - np.uint64(1) - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= np.uint64(1)
+
+    return d
+
+def zorder_index(x: np.ndarray, y: np.ndarray, order: int = 16) -> np.ndarray:
+    """
+    Calcula el código Z (Morton) intercalando los bits de x e y.
+
+    Args:
+        x: Columnas de la grilla, enteros en [0, 2**order)
+        y: Filas de la grilla, enteros en [0, 2**order)
+        order: Bits por eje de la grilla (máximo 32)
+
+    Returns:
+        Arreglo uint64 con el código Z de cada celda
+    """
+    def spread(v):
+        v = np.asarray(v, dtype=np.uint64) & np.uint64(0xFFFFFFFF)
+        v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+        v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+        v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+        v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+        return v
+
+    return spread(x) | (spread(y) << np.uint64(1))
+
+def spatial_sort_key(
+    geometries: gpd.GeoSeries,
+    curve: str = 'hilbert',
+    order: int = 16,
+    bounds: Optional[Sequence[float]] = None
+) -> np.ndarray:
+    """
+    Calcula una clave de ordenamiento espacial a partir de los centroides.
+
+    Los centroides se proyectan sobre una grilla de 2**order celdas por eje
+    dentro de `bounds` y se ordenan sobre la curva elegida; filas cercanas
+    en la clave quedan cercanas en el espacio. Las geometrías nulas o
+    vacías reciben la clave máxima y quedan al final.
+
+    Args:
+        geometries: Serie de geometrías
+        curve: 'hilbert' (por defecto) o 'zorder'
+        order: Bits por eje de la grilla
+        bounds: Extensión (xmin, ymin, xmax, ymax); por defecto la de la serie
+
+    Returns:
+        Arreglo uint64 con la clave de cada fila
+    """
+    if curve not in SPATIAL_SORT_CURVES:
+        raise ValueError(f"Curva de ordenamiento no soportada: {curve}")
+
+    centroids = shapely.centroid(np.asarray(geometries.values, dtype=object))
+    x = shapely.get_x(centroids)
+    y = shapely.get_y(centroids)
+    missing = np.isnan(x) | np.isnan(y)
+
+    xmin, ymin, xmax, ymax = bounds if bounds is not None else geometries.total_bounds
+    cells = (1 << order) - 1
+    width = (xmax - xmin) or 1.0
+    height = (ymax - ymin) or 1.0
+    with np.errstate(invalid='ignore'):
+        gx = np.clip((x - xmin) / width * cells, 0, cells)
+        gy = np.clip((y - ymin) / height * cells, 0, cells)
+    gx = np.where(missing, 0, gx).astype(np.uint64)
+    gy = np.where(missing, 0, gy).astype(np.uint64)
+
+    index = hilbert_index if curve == 'hilbert' else zorder_index
+    keys = index(gx, gy, order)
+    keys[missing] = np.iinfo(np.uint64).max
+    return keys
+
+def quadtree_tiles(
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    max_tiles: int = 16,
+    max_depth: int = 12
+) -> List[TileRange]:
+    """
+    Divide el plano en tiles de un quadtree adaptado a la densidad.
+
+    Se parte de la extensión de los puntos de muestra y se divide en
+    cuatro, una y otra vez, el tile con más peso mientras supere el doble
+    de la parte media (peso total / `max_tiles`); las zonas densas quedan con tiles
+    pequeños y las dispersas con tiles grandes, de modo que ningún tile
+    concentra el trabajo (salvo puntos repetidos, que no se dividen). Los
+    tiles cubren todo el plano sin solaparse: los bordes exteriores no
+    tienen límite (None), así las filas que no estaban en la muestra
+    también tienen un tile.
+
+    Args:
+        x: Coordenada x de cada punto de muestra
+        y: Coordenada y de cada punto de muestra
+        weights: Peso de cada punto (por defecto 1)
+        max_tiles: Número de partes en que se reparte el peso; el
+            resultado puede tener más tiles (hasta cuatro veces), entre
+            ellos tiles vacíos que completan la cobertura
+        max_depth: Profundidad máxima del árbol
+
+    Returns:
+        Lista de TileRange ordenada por peso decreciente
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    weights = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=float)
+    if len(x) == 0:
+        return [TileRange()]
+
+    # Cada hoja: (-peso, desempate, caja numérica, bordes, índices, profundidad)
+    box = (float(x.min()), float(y.min()), float(x.max()), float(y.max()))
+    target = 2 * weights.sum() / max_tiles
+    leaves = [(-weights.sum(), 0, box, (None, None, None, None), np.arange(len(x)), 0)]
+    done = []
+    counter = 1
+    # Cada división suma tres tiles; el tope evita árboles enormes con pesos muy concentrados
+    while leaves and -leaves[0][0] > target and len(leaves) + len(done) < 4 * max_tiles:
+        leaf = heapq.heappop(leaves)
+        _, _, (x0, y0, x1, y1), (e0, e1, e2, e3), idx, depth = leaf
+        if depth >= max_depth or len(idx) < 2 or (x[idx].min() == x[idx].max() and y[idx].min() == y[idx].max()):
+            done.append(leaf)
+            continue
+
+        mx, my = (x0 + x1) / 2, (y0 + y1) / 2
+        west, south = x[idx] < mx, y[idx] < my
+        children = [
+            ((x0, y0, mx, my), (e0, e1, mx, my), west & south),
+            ((mx, y0, x1, my), (mx, e1, e2, my), ~west & south),
+            ((x0, my, mx, y1), (e0, my, mx, e3), west & ~south),
+            ((mx, my, x1, y1), (mx, my, e2, e3), ~west & ~south),
+        ]
+        for child_box, edges, mask in children:
+            child = idx[mask]
+            entry = (-weights[child].sum(), counter, child_box, edges, child, depth + 1)
+            counter += 1
+            if len(child):
+                heapq.heappush(leaves, entry)
+            else:
+                done.append(entry)
+
+    tiles = [
+        TileRange(*edges, weight=float(-neg_weight))
+        for neg_weight, _, _, edges, _, _ in leaves + done
+    ]
+    return sorted(tiles, key=lambda tile: tile.weight, reverse=True)
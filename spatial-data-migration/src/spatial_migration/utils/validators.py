@@ -29,9 +29,10 @@ class DataValidator:
         if null_geoms > 0:
             results['warnings'].append(f"Encontradas {null_geoms} geometrías nulas")
         
-        # Verificar geometrías inválidas
-        invalid_geoms = (~gdf.geometry.is_valid).sum()
+        # Verificar geometrías inválidas (las nulas ya se informan arriba)
+        invalid_geoms = (gdf.geometry.notna() & ~gdf.geometry.is_valid).sum()
         if invalid_geoms > 0:
             results['errors'].append(f"Encontradas {invalid_geoms} geometrías inválidas")
             results['is_valid'] = False
-        
\ No newline at end of file
+                
+        return results
@@ -0,0 +1,223 @@
+# tests/test_aws.py
+import io
+from datetime import date
+from decimal import Decimal
+import pyarrow as pa
+import pytest
+from unittest.mock import Mock, patch
+from spatial_migration.exceptions import AthenaQueryError
+from spatial_migration.utils.aws import (
+    MIN_PART_SIZE,
+    AthenaQueryManager,
+    RateLimiter,
+    copy_prefix,
+    get_athena_query_results
+)
+
+def _execution(execution_id, state, reason=None):
+    status = {'State': state}
+    if reason:
+        status['StateChangeReason'] = reason
+    return {'QueryExecutionId': execution_id, 'Status': status}
+
+def _athena_client(states):
+    """Cliente falso: cada id recorre su lista de estados en cada sondeo"""
+    client = Mock()
+    client.start_query_execution.side_effect = [
+        {'QueryExecutionId': execution_id} for execution_id in states
+    ]
+    remaining = {execution_id: list(values) for execution_id, values in states.items()}
+
+    def batch_get(QueryExecutionIds):
+        executions = []
+        for execution_id in QueryExecutionIds:
+            values = remaining[execution_id]
+            state = values.pop(0) if len(values) > 1 else values[0]
+            executions.append(_execution(execution_id, state, 'SYNTAX_ERROR'))
+        return {'QueryExecutions': executions}
+
+    client.batch_get_query_execution.side_effect = batch_get
+    return client
+
+def _manager(client, **kwargs):
+    return AthenaQueryManager(
+        client,
+        'test_database',
+        's3://test-bucket/athena/',
+        rate_limiter=RateLimiter(rate=1000, burst=100),
+        initial_delay=0.01,
+        max_delay=0.02,
+        **kwargs
+    )
+
+def test_athena_query_manager_parallel_queries():
+    """Prueba que las consultas se sondeen juntas y resuelvan sus futures"""
+    client = _athena_client({
+        'q1': ['RUNNING', 'SUCCEEDED'],
+        'q2': ['QUEUED', 'RUNNING', 'SUCCEEDED'],
+        'q3': ['SUCCEEDED']
+    })
+
+    with _manager(client) as manager:
+        futures = [manager.submit(f"SELECT {i}") for i in range(3)]
+        results = [future.result(timeout=5) for future in futures]
+
+    assert [result['QueryExecutionId'] for result in results] == ['q1', 'q2', 'q3']
+    first_poll = client.batch_get_query_execution.call_args_list[0].kwargs
+    assert first_poll['QueryExecutionIds'] == ['q1', 'q2', 'q3']
+    assert client.start_query_execution.call_args.kwargs['QueryExecutionContext'] == {
+        'Database': 'test_database'
+    }
+
+def test_athena_query_manager_failed_query():
+    """Prueba que una consulta fallida propague AthenaQueryError"""
+    client = _athena_client({'q1': ['FAILED']})
+
+    with _manager(client) as manager:
+        future = manager.submit("SELECT * FROM missing")
+        with pytest.raises(AthenaQueryError, match='SYNTAX_ERROR'):
+            future.result(timeout=5)
+
+def test_athena_query_manager_timeout():
+    """Prueba que el tiempo máximo sea de reloj y detenga la consulta"""
+    client = _athena_client({'q1': ['RUNNING']})
+
+    with _manager(client, timeout=0.05) as manager:
+        future = manager.submit("SELECT 1")
+        with pytest.raises(TimeoutError):
+            future.result(timeout=5)
+
+    client.stop_query_execution.assert_called_once_with(QueryExecutionId='q1')
+
+def test_rate_limiter_waits_between_calls():
+    """Prueba que el limitador espacie las llamadas según la tasa"""
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=2, burst=1, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        limiter.acquire()
+
+    assert sleeps == [0.5, 0.5]
+
+def test_get_athena_query_results_paginates():
+    """Prueba que se lean todas las páginas de resultados"""
+    client = _athena_client({'q1': ['SUCCEEDED']})
+    client.get_query_results.side_effect = [
+        {'ResultSet': {'Rows': [{'Data': [{'VarCharValue': 'total'}]}]}, 'NextToken': 'page-2'},
+        {'ResultSet': {'Rows': [{'Data': [{'VarCharValue': '3'}]}]}}
+    ]
+
+    with patch('boto3.client', return_value=client):
+        rows = get_athena_query_results(
+            "SELECT COUNT(*) AS total FROM comunas",
+            'test_database',
+            's3://test-bucket/athena/',
+            'us-east-1'
+        )
+
+    assert rows == [
+        {'Data': [{'VarCharValue': 'total'}]},
+        {'Data': [{'VarCharValue': '3'}]}
+    ]
+    assert client.get_query_results.call_args.kwargs == {
+        'QueryExecutionId': 'q1',
+        'NextToken': 'page-2'
+    }
+
+def test_athena_query_manager_read_table_from_s3():
+    """Prueba la lectura tipada del CSV de resultados desde S3"""
+    client = _athena_client({'q1': ['SUCCEEDED']})
+    client.get_query_results.return_value = {'ResultSet': {'ResultSetMetadata': {'ColumnInfo': [
+        {'Name': 'id', 'Type': 'integer'},
+        {'Name': 'name', 'Type': 'varchar'},
+        {'Name': 'shape_area', 'Type': 'decimal', 'Precision': 10, 'Scale': 2},
+        {'Name': 'fecha', 'Type': 'date'}
+    ]}, 'Rows': []}}
+    s3_client = Mock()
+    s3_client.get_object.return_value = {'Body': io.BytesIO(
+        b'"id","name","shape_area","fecha"\n'
+        b'"1","Point A","12.50","2024-01-02"\n'
+        b'"2","",,\n'
+    )}
+
+    with _manager(client, s3_client=s3_client) as manager:
+        execution = manager.submit("SELECT * FROM comunas").result(timeout=5)
+        execution['ResultConfiguration'] = {'OutputLocation': 's3://test-bucket/athena/q1.csv'}
+        table = manager.read_table(execution)
+
+    s3_client.get_object.assert_called_once_with(Bucket='test-bucket', Key='athena/q1.csv')
+    assert table.schema.field('id').type == pa.int32()
+    assert table.schema.field('shape_area').type == pa.decimal128(10, 2)
+    assert table.column('name').to_pylist() == ['Point A', '']
+    assert table.column('shape_area').to_pylist() == [Decimal('12.50'), None]
+    assert table.column('fecha').to_pylist() == [date(2024, 1, 2), None]
+
+def test_rate_limiter_large_requests_borrow_ahead():
+    """Prueba que un pedido mayor que el balde pase y haga esperar al siguiente"""
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=100, burst=50, clock=lambda: now[0], sleep=sleep)
+    limiter.acquire(150)
+    limiter.acquire(50)
+
+    # 100 bytes de deuda más 50 del segundo pedido, a 100 bytes por segundo
+    assert sleeps == [1.5]
+
+def _s3_listing(objects):
+    client = Mock()
+    client.get_paginator.return_value.paginate.return_value = [
+        {'Contents': [{'Key': key, 'Size': size} for key, size in objects]}
+    ]
+    client.create_multipart_upload.return_value = {'UploadId': 'u1'}
+    client.upload_part_copy.side_effect = lambda **kwargs: {
+        'CopyPartResult': {'ETag': f"e{kwargs['PartNumber']}"}
+    }
+    return client
+
+def test_copy_prefix_server_side():
+    """Prueba que los objetos chicos usen CopyObject y los grandes UploadPartCopy por rangos"""
+    size = 2 * MIN_PART_SIZE + 10
+    client = _s3_listing([('t/a.parquet', 100), ('t/b.parquet', size)])
+
+    assert copy_prefix(client, 'bucket', 't/', 'bk/1/', part_size=MIN_PART_SIZE) == (2, 100 + size)
+
+    client.copy_object.assert_called_once_with(
+        Bucket='bucket', Key='bk/1/a.parquet', CopySource={'Bucket': 'bucket', 'Key': 't/a.parquet'}
+    )
+    ranges = sorted(
+        (call.kwargs['PartNumber'], call.kwargs['CopySourceRange'])
+        for call in client.upload_part_copy.call_args_list
+    )
+    assert ranges == [
+        (1, f"bytes=0-{MIN_PART_SIZE - 1}"),
+        (2, f"bytes={MIN_PART_SIZE}-{2 * MIN_PART_SIZE - 1}"),
+        (3, f"bytes={2 * MIN_PART_SIZE}-{size - 1}")
+    ]
+    complete = client.complete_multipart_upload.call_args.kwargs
+    assert complete['Key'] == 'bk/1/b.parquet'
+    assert [p['ETag'] for p in complete['MultipartUpload']['Parts']] == ['e1', 'e2', 'e3']
+    client.put_object.assert_not_called()
+    client.get_object.assert_not_called()
+
+def test_copy_prefix_aborts_on_error():
+    """Prueba que una parte fallida aborte la copia multiparte"""
+    client = _s3_listing([('t/b.parquet', 2 * MIN_PART_SIZE)])
+    client.upload_part_copy.side_effect = RuntimeError("SlowDown")
+
+    with pytest.raises(RuntimeError):
+        copy_prefix(client, 'bucket', 't/', 'bk/1/', part_size=MIN_PART_SIZE)
+
+    client.abort_multipart_upload.assert_called_once_with(
+        Bucket='bucket', Key='bk/1/b.parquet', UploadId='u1'
+    )
+    client.complete_multipart_upload.assert_not_called()
@@ -0,0 +1,76 @@
+# tests/test_binary_copy.py
+import struct
+from datetime import date
+import pytest
+import pyarrow as pa
+from shapely.geometry import Point
+from spatial_migration.core.binary_copy import (
+    COPY_SIGNATURE,
+    CopyBinaryStream,
+    read_copy_binary
+)
+
+def _copy_stream(rows):
+    """Codifica filas de valores ya serializados en formato COPY binario"""
+    data = COPY_SIGNATURE + struct.pack('>ii', 0, 0)
+    for row in rows:
+        data += struct.pack('>h', len(row))
+        for value in row:
+            if value is None:
+                data += struct.pack('>i', -1)
+            else:
+                data += struct.pack('>i', len(value)) + value
+    return data + struct.pack('>h', -1)
+
+def test_read_copy_binary():
+    """Prueba la decodificación de enteros, texto, fechas y geometría WKB"""
+    wkb = Point(1, 2).wkb
+    stream = _copy_stream([
+        [struct.pack('>i', 1), 'Comuna 1'.encode(), struct.pack('>i', 0), wkb],
+        [struct.pack('>i', 2), None, None, None],
+        [struct.pack('>i', 3), 'Ñuñoa'.encode(), struct.pack('>i', 366), wkb],
+    ])
+
+    table = read_copy_binary(
+        stream,
+        [('id', 23), ('nombre', 25), ('fecha_actu', 1082), ('geometry', 17)]
+    )
+
+    assert table.column('id').to_pylist() == [1, 2, 3]
+    assert table.column('nombre').to_pylist() == ['Comuna 1', None, 'Ñuñoa']
+    assert table.column('fecha_actu').to_pylist() == [date(2000, 1, 1), None, date(2001, 1, 1)]
+    assert table.column('geometry').to_pylist() == [wkb, None, wkb]
+
+def test_read_copy_binary_invalid_stream():
+    """Prueba que se rechace un flujo sin la firma de COPY binario"""
+    with pytest.raises(ValueError):
+        read_copy_binary(b'id,nombre\n', [('id', 23)])
+
+def test_copy_binary_stream_decodes_by_pieces():
+    """Prueba que el flujo se decodifique en partes aunque las filas lleguen cortadas"""
+    rows = [[struct.pack('>i', i), f'Comuna {i}'.encode()] for i in range(10)]
+    rows[4][1] = None
+    data = _copy_stream(rows)
+    stream = CopyBinaryStream([('id', 23), ('nombre', 25)], piece_size=40)
+
+    # Escrituras de 7 bytes cortan la cabecera, las longitudes y los valores
+    for start in range(0, len(data), 7):
+        stream.write(data[start:start + 7])
+    table = stream.finish()
+
+    assert len(stream.batches) > 1
+    assert table.column('id').to_pylist() == list(range(10))
+    assert table.column('nombre').to_pylist()[3:6] == ['Comuna 3', None, 'Comuna 5']
+
+def test_copy_binary_stream_empty_and_truncated():
+    """Prueba un flujo sin filas y el rechazo de un flujo sin trailer"""
+    stream = CopyBinaryStream([('id', 23)])
+    stream.write(_copy_stream([]))
+    table = stream.finish()
+    assert table.num_rows == 0
+    assert table.schema.field('id').type == pa.int32()
+
+    stream = CopyBinaryStream([('id', 23)])
+    stream.write(_copy_stream([[struct.pack('>i', 1)]])[:-2])
+    with pytest.raises(ValueError, match="incompleto"):
+        stream.finish()
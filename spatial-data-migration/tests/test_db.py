@@ -0,0 +1,125 @@
+# tests/test_db.py
+from dataclasses import replace
+from unittest.mock import Mock, patch
+from spatial_migration.utils.db import (
+    ConnectionProvider,
+    DatabaseConnection,
+    RDSTokenCache,
+    get_connection_provider,
+    table_schema_from_rows
+)
+
+def _token_cache(now):
+    rds_client = Mock()
+    rds_client.generate_db_auth_token.side_effect = ['token-1', 'token-2']
+    return RDSTokenCache(
+        'db.example.com', 5432, 'migrator',
+        region='us-east-1',
+        rds_client=rds_client,
+        clock=lambda: now[0]
+    ), rds_client
+
+def test_rds_token_cache_refreshes_before_expiry():
+    """Prueba que el token se reutilice y se renueve antes de vencer"""
+    now = [0.0]
+    cache, rds_client = _token_cache(now)
+
+    assert cache.get_token() == 'token-1'
+    now[0] = 15 * 60 - 61
+    assert cache.get_token() == 'token-1'
+    now[0] = 15 * 60 - 60
+    assert cache.get_token() == 'token-2'
+    assert rds_client.generate_db_auth_token.call_count == 2
+
+def test_connection_provider_injects_token(sample_config):
+    """Prueba que cada conexión nueva reciba el token vigente y use SSL"""
+    cache, _ = _token_cache([0.0])
+    provider = ConnectionProvider(sample_config.postgres, token_cache=cache)
+
+    engine = provider.engine
+    cparams = {'password': 'test_pass'}
+    for listener in engine.dialect.dispatch.do_connect:
+        listener(engine.dialect, None, [], cparams)
+
+    assert cparams == {'password': 'token-1', 'sslmode': 'require'}
+    assert engine.pool.size() == sample_config.postgres.pool_size
+    assert engine.pool._pre_ping
+    assert provider.connection_params()['password'] == 'token-1'
+
+def test_get_connection_provider_is_shared(sample_config):
+    """Prueba que la misma base de datos comparta un único pool"""
+    provider = get_connection_provider(sample_config.postgres)
+
+    assert get_connection_provider(replace(sample_config.postgres)) is provider
+    other = replace(sample_config.postgres, database='other_db')
+    assert get_connection_provider(other) is not provider
+    # Credenciales o modo de autenticación distintos no comparten engine
+    assert get_connection_provider(replace(sample_config.postgres, password='otro')) is not provider
+    iam = replace(sample_config.postgres, iam_auth=True)
+    assert get_connection_provider(iam) is not provider
+    assert get_connection_provider(replace(iam, password='ignorado')) is get_connection_provider(iam)
+
+def test_database_connection_uses_shared_provider(sample_config):
+    """Prueba que DatabaseConnection tome su conexión del pool compartido"""
+    config = {
+        'host': 'localhost', 'port': 5432, 'database': 'test_db',
+        'user': 'test_user', 'password': 'test_pass'
+    }
+    provider = get_connection_provider(sample_config.postgres)
+
+    with patch.object(provider, 'raw_connection') as raw_connection:
+        db = DatabaseConnection(config)
+        db.connect()
+        db.disconnect()
+
+    assert db.provider is provider
+    raw_connection.assert_called_once()
+    # close() devuelve la conexión al pool
+    raw_connection.return_value.close.assert_called_once()
+
+def _column(name, data_type, udt_name, geometry_type=None, srid=None, **extra):
+    return {
+        'column_name': name,
+        'data_type': data_type,
+        'udt_name': udt_name,
+        'character_maximum_length': extra.get('length'),
+        'numeric_precision': extra.get('precision'),
+        'numeric_scale': extra.get('scale'),
+        'nullable': extra.get('nullable', True),
+        'geometry_type': geometry_type,
+        'srid': srid
+    }
+
+SCHEMA_ROWS = [
+    _column('id', 'integer', 'int4', precision=32, scale=0, nullable=False),
+    _column('nombre', 'character varying', 'varchar', length=80),
+    _column('area', 'numeric', 'numeric', precision=12, scale=2),
+    _column('codigos', 'ARRAY', '_int2'),
+    _column('geometry', 'USER-DEFINED', 'geometry', 'MULTIPOLYGON', 4326),
+]
+
+def test_table_schema_from_rows():
+    """Prueba la conversión de information_schema y geometry_columns a un schema"""
+    schema = table_schema_from_rows('shapes.comunas', SCHEMA_ROWS)
+
+    assert schema.columns == {
+        'id': 'integer',
+        'nombre': 'character varying(80)',
+        'area': 'numeric(12,2)',
+        'codigos': 'int2[]',
+        'geometry': 'geometry'
+    }
+    assert (schema.geometry_column, schema.srid, schema.geometry_type) == ('geometry', 4326, 'MULTIPOLYGON')
+    assert schema.nullable['id'] is False
+
+def test_describe_table_is_cached():
+    """Prueba que el schema se lea una vez por tabla y acepte nombres entre comillas"""
+    db = DatabaseConnection({})
+    db._cur = Mock()
+    db._cur.fetchall.return_value = SCHEMA_ROWS
+
+    assert db.get_table_schema('shapes."COMUNAS"')['area'] == 'numeric(12,2)'
+    db.describe_table('shapes."COMUNAS"')
+
+    db._cur.execute.assert_called_once()
+    assert db._cur.execute.call_args.args[1] == {'schema': 'shapes', 'table': 'COMUNAS'}
@@ -0,0 +1,46 @@
+# tests/test_ledger.py
+import pyarrow as pa
+from spatial_migration.models.schemas import KeyRange
+from spatial_migration.utils.ledger import JobLedger
+
+RANGES = [KeyRange(None, 100), KeyRange(100, 200), KeyRange(200, None)]
+
+def test_ledger_resumes_running_job(tmp_path):
+    """Prueba que una corrida interrumpida se retome con sus rangos y bloques pendientes"""
+    path = str(tmp_path / 'ledger.db')
+    with JobLedger(path) as ledger:
+        job = ledger.open_job('comunas', 'firma', lambda: RANGES)
+        ledger.set_schema(job.job_id, pa.schema([('id', pa.int32())]))
+        ledger.commit_chunk(job.job_id, 0, 100, 'abc', 'spatial_data/comunas/c_0.parquet', '"e0"')
+        ledger.fail_chunk(job.job_id, 1, 'conexión perdida')
+
+    def fail():
+        raise AssertionError("los rangos no deben recalcularse")
+
+    with JobLedger(path) as ledger:
+        resumed = ledger.open_job('comunas', 'firma', fail)
+        pending = ledger.chunks(resumed.job_id, pending_only=True)
+
+        assert resumed.job_id == job.job_id and resumed.chunk_count == 3
+        assert [(c.index, c.key_range, c.status, c.attempts) for c in pending] == [
+            (1, KeyRange(100, 200), 'failed', 1),
+            (2, KeyRange(200, None), 'pending', 0)
+        ]
+        assert ledger.get_schema(job.job_id) == pa.schema([('id', pa.int32())])
+        assert ledger.chunks(job.job_id)[0].checksum == 'abc'
+
+def test_ledger_complete_supersedes_previous_jobs(tmp_path):
+    """Prueba que completar una corrida reemplace las anteriores de la misma tabla"""
+    with JobLedger(str(tmp_path / 'ledger.db')) as ledger:
+        old = ledger.open_job('comunas', 'firma', lambda: RANGES)
+        assert ledger.complete_job(old.job_id) == []
+        other = ledger.open_job('barrios', 'firma', lambda: RANGES[:1])
+        # Con otra firma la corrida en curso no se retoma
+        abandoned = ledger.open_job('comunas', 'otra', lambda: RANGES[:1])
+        new = ledger.open_job('comunas', 'firma', lambda: RANGES[:2])
+
+        assert new.job_id not in (old.job_id, abandoned.job_id)
+        stale = ledger.complete_job(new.job_id)
+
+        assert sorted(job.job_id for job in stale) == sorted([old.job_id, abandoned.job_id])
+        assert ledger.complete_job(other.job_id) == []
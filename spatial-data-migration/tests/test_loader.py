@@ -1,7 +1,14 @@
 # tests/test_loader.py
+import base64
+import hashlib
+import io
+from datetime import datetime
 import pytest
+import pyarrow as pa
 from unittest.mock import Mock, patch
+from botocore.exceptions import ClientError
 from spatial_migration.core.loader import AWSLoader
+from spatial_migration.utils.aws import MIN_PART_SIZE, S3MultipartWriter
 
 def test_load_to_aws(sample_config):
     """Prueba la carga de datos a AWS"""
@@ -9,6 +16,12 @@ def test_load_to_aws(sample_config):
         mock_s3 = Mock()
         mock_glue = Mock()
         mock_boto3.side_effect = [mock_s3, mock_glue]
+        mock_s3.get_paginator.return_value.paginate.return_value = [{'Contents': [
+            {'Key': 'spatial_data/test_table/test_table.parquet'},
+            {'Key': 'spatial_data/test_table/test_table_delta_20240102T030405Z.parquet'},
+            {'Key': 'spatial_data/test_table/_watermark.json'}
+        ]}]
+        mock_s3.delete_objects.return_value = {}
         
         loader = AWSLoader(sample_config.aws)
         result = loader.load_to_aws(
@@ -20,6 +33,17 @@ def test_load_to_aws(sample_config):
         assert result is True
         mock_s3.upload_fileobj.assert_called_once()
         mock_glue.create_table.assert_called_once()
+        # El snapshot reemplaza los archivos de cambios y reinicia la marca de agua
+        deleted = mock_s3.delete_objects.call_args.kwargs['Delete']['Objects']
+        assert deleted == [
+            {'Key': 'spatial_data/test_table/test_table_delta_20240102T030405Z.parquet'},
+            {'Key': 'spatial_data/test_table/_watermark.json'}
+        ]
+
+        # Un archivo de cambios no toca los demás archivos
+        mock_s3.delete_objects.reset_mock()
+        loader.load_to_aws(Mock(), 'test_table', {}, s3_key=loader.delta_key('test_table', 'x'))
+        mock_s3.delete_objects.assert_not_called()
 
 def test_load_to_aws_s3_error(sample_config):
     """Prueba el manejo de errores de S3"""
@@ -34,3 +58,254 @@ def test_load_to_aws_s3_error(sample_config):
             loader.load_to_aws(Mock(), 'test_table', {})
         
         assert "S3 Error" in str(exc_info.value)
+
+def test_glue_columns_from_arrow_schema(sample_config):
+    """Prueba la conversión de tipos Arrow de un esquema GeoParquet a Glue"""
+    with patch('boto3.client'):
+        loader = AWSLoader(sample_config.aws)
+
+    bbox = pa.struct([('xmin', pa.float64()), ('ymin', pa.float64())])
+    columns = loader._get_glue_columns({
+        'id': pa.int32(),
+        'geometry': pa.binary(),
+        'bbox': bbox
+    })
+
+    assert [c['Type'] for c in columns] == [
+        'int', 'binary', 'struct<xmin:double,ymin:double>'
+    ]
+
+def test_glue_columns_from_pandas_dtypes(sample_config):
+    """Prueba que los tipos de pandas conserven su ancho en Glue"""
+    with patch('boto3.client'):
+        loader = AWSLoader(sample_config.aws)
+
+    columns = loader._get_glue_columns({
+        'estrato': 'int16',
+        'area': 'float32',
+        'fecha': 'datetime64[ns]',
+        'nombre': 'object'
+    })
+
+    assert [c['Type'] for c in columns] == ['smallint', 'float', 'timestamp', 'string']
+
+def test_s3_multipart_writer_concurrent_parts():
+    """Prueba la subida por partes mientras se escribe"""
+    mock_s3 = Mock()
+    mock_s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+    mock_s3.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+    part_size = MIN_PART_SIZE
+
+    with S3MultipartWriter(mock_s3, 'test-bucket', 'key.parquet', part_size=part_size) as stream:
+        stream.write(b'a' * (part_size + 10))
+        stream.write(b'b' * part_size)
+        assert stream.tell() == 2 * part_size + 10
+
+    sizes = {call.kwargs['PartNumber']: len(call.kwargs['Body'])
+             for call in mock_s3.upload_part.call_args_list}
+    assert sizes == {1: part_size, 2: part_size, 3: 10}
+    mock_s3.complete_multipart_upload.assert_called_once_with(
+        Bucket='test-bucket',
+        Key='key.parquet',
+        UploadId='upload-1',
+        MultipartUpload={'Parts': [
+            {'PartNumber': 1, 'ETag': 'etag-1'},
+            {'PartNumber': 2, 'ETag': 'etag-2'},
+            {'PartNumber': 3, 'ETag': 'etag-3'}
+        ]}
+    )
+    mock_s3.put_object.assert_not_called()
+
+def test_s3_multipart_writer_aborts_on_error():
+    """Prueba que un error al escribir aborte la carga multiparte"""
+    mock_s3 = Mock()
+    mock_s3.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+    mock_s3.upload_part.return_value = {'ETag': 'etag'}
+
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(mock_s3, 'test-bucket', 'key.parquet') as stream:
+            stream.write(b'a' * MIN_PART_SIZE * 2)
+            raise RuntimeError("Error generando row groups")
+
+    mock_s3.abort_multipart_upload.assert_called_once()
+    mock_s3.complete_multipart_upload.assert_not_called()
+
+def test_load_stream_to_aws_small_file(sample_config):
+    """Prueba que un archivo menor a una parte se suba con put_object"""
+    with patch('boto3.client') as mock_boto3:
+        mock_s3 = Mock()
+        mock_glue = Mock()
+        mock_boto3.side_effect = [mock_s3, mock_glue]
+        loader = AWSLoader(sample_config.aws)
+    mock_s3.get_paginator.return_value.paginate.return_value = []
+
+    def write_parquet(stream):
+        stream.write(b'PAR1')
+        return {'id': pa.int64()}
+
+    assert loader.load_stream_to_aws(write_parquet, 'test_table') is True
+    mock_s3.put_object.assert_called_once_with(
+        Bucket='test-bucket',
+        Key='spatial_data/test_table/test_table.parquet',
+        Body=b'PAR1'
+    )
+    mock_s3.create_multipart_upload.assert_not_called()
+    mock_glue.create_table.assert_called_once()
+
+def test_watermark_round_trip(sample_config):
+    """Prueba que la marca de agua se guarde junto a la tabla y se relea"""
+    with patch('boto3.client') as mock_boto3:
+        mock_s3 = Mock()
+        mock_boto3.side_effect = [mock_s3, Mock()]
+        loader = AWSLoader(sample_config.aws)
+
+    mock_s3.get_object.side_effect = ClientError(
+        {'Error': {'Code': 'NoSuchKey'}}, 'GetObject'
+    )
+    assert loader.load_watermark('test_table') is None
+
+    loader.save_watermark('test_table', 'fecha_actu', datetime(2024, 1, 2, 3, 4, 5))
+    put = mock_s3.put_object.call_args.kwargs
+    assert put['Key'] == 'spatial_data/test_table/_watermark.json'
+
+    mock_s3.get_object.side_effect = None
+    mock_s3.get_object.return_value = {'Body': io.BytesIO(put['Body'])}
+    assert loader.load_watermark('test_table') == {
+        'column': 'fecha_actu',
+        'value': '2024-01-02T03:04:05'
+    }
+    assert loader.delta_key('test_table', '20240102T030405Z') == (
+        'spatial_data/test_table/test_table_delta_20240102T030405Z.parquet'
+    )
+
+def test_load_to_aws_with_rate_limiter(sample_config):
+    """Prueba que con un límite de ancho de banda la subida pase por el limitador"""
+    with patch('boto3.client') as mock_boto3:
+        mock_s3 = Mock()
+        mock_boto3.side_effect = [mock_s3, Mock()]
+        mock_s3.get_paginator.return_value.paginate.return_value = []
+        loader = AWSLoader(sample_config.aws)
+        limiter = Mock()
+
+        assert loader.load_to_aws(b'PAR1datosPAR1', 'test_table', {}, rate_limiter=limiter)
+
+    mock_s3.upload_fileobj.assert_not_called()
+    assert mock_s3.put_object.call_args.kwargs['Body'] == b'PAR1datosPAR1'
+    limiter.acquire.assert_called_once_with(13)
+
+def test_load_object_sends_checksum(sample_config):
+    """Prueba que el archivo de un rango se suba con su checksum SHA-256"""
+    with patch('boto3.client') as mock_boto3:
+        mock_s3 = Mock()
+        mock_s3.put_object.return_value = {'ETag': '"e1"'}
+        mock_boto3.side_effect = [mock_s3, Mock()]
+        loader = AWSLoader(sample_config.aws)
+
+        result = loader.load_object(b'PAR1', loader.chunk_key('comunas', 'abc', 7))
+
+    digest = hashlib.sha256(b'PAR1').digest()
+    assert result == {'checksum': digest.hex(), 'etag': '"e1"'}
+    put_kwargs = mock_s3.put_object.call_args.kwargs
+    assert put_kwargs['Key'] == 'spatial_data/_staging/comunas/abc/comunas_abc_00007.parquet'
+    assert put_kwargs['ChecksumSHA256'] == base64.b64encode(digest).decode('ascii')
+
+def test_publish_chunks_replaces_table_files(sample_config):
+    """Prueba que los bloques del staging reemplacen los archivos de la tabla"""
+    with patch('boto3.client') as mock_boto3:
+        mock_s3 = Mock()
+        mock_s3.delete_objects.return_value = {}
+        mock_boto3.side_effect = [mock_s3, Mock()]
+        loader = AWSLoader(sample_config.aws)
+
+    staged = [
+        {'Key': 'spatial_data/_staging/comunas/j2/comunas_j2_00000.parquet', 'Size': 10},
+        {'Key': 'spatial_data/_staging/comunas/j2/comunas_j2_00001.parquet', 'Size': 10}
+    ]
+    live = [
+        {'Key': 'spatial_data/comunas/comunas.parquet', 'Size': 10},
+        {'Key': 'spatial_data/comunas/comunas_j1_00000.parquet', 'Size': 10},
+        {'Key': 'spatial_data/comunas/comunas_j2_00000.parquet', 'Size': 10},
+        {'Key': 'spatial_data/comunas/comunas_j2_00001.parquet', 'Size': 10},
+        {'Key': 'spatial_data/comunas/_watermark.json', 'Size': 10}
+    ]
+
+    def paginate(Bucket, Prefix):
+        return [{'Contents': staged if Prefix.startswith('spatial_data/_staging/') else live}]
+
+    mock_s3.get_paginator.return_value.paginate.side_effect = paginate
+
+    assert loader.publish_chunks('comunas', 'j2') == 2
+
+    copies = sorted(call.kwargs['Key'] for call in mock_s3.copy_object.call_args_list)
+    assert copies == [
+        'spatial_data/comunas/comunas_j2_00000.parquet',
+        'spatial_data/comunas/comunas_j2_00001.parquet'
+    ]
+    deleted = mock_s3.delete_objects.call_args.kwargs['Delete']['Objects']
+    assert deleted == [
+        {'Key': 'spatial_data/comunas/comunas.parquet'},
+        {'Key': 'spatial_data/comunas/comunas_j1_00000.parquet'},
+        {'Key': 'spatial_data/comunas/_watermark.json'}
+    ]
+
+    loader.delete_staging('comunas', 'j2')
+    deleted = mock_s3.delete_objects.call_args.kwargs['Delete']['Objects']
+    assert deleted == [{'Key': obj['Key']} for obj in staged]
+
+def test_backup_and_restore_table(sample_config):
+    """Prueba el respaldo server-side y la restauración apuntando Glue al respaldo"""
+    with patch('boto3.client') as mock_boto3:
+        mock_s3 = Mock()
+        mock_glue = Mock()
+        mock_boto3.side_effect = [mock_s3, mock_glue]
+        loader = AWSLoader(sample_config.aws)
+
+    mock_s3.get_paginator.return_value.paginate.return_value = [
+        {'Contents': [{'Key': 'spatial_data/comunas/comunas.parquet', 'Size': 10}]}
+    ]
+    mock_glue.get_table.return_value = {'Table': {
+        'Name': 'comunas',
+        'DatabaseName': 'test_database',
+        'CreateTime': datetime(2024, 1, 1),
+        'StorageDescriptor': {'Columns': [{'Name': 'id', 'Type': 'int'}], 'Location': 's3://x/'},
+        'TableType': 'EXTERNAL_TABLE'
+    }}
+
+    assert loader.backup_table('comunas', backup_id='b1') == 'b1'
+
+    mock_s3.copy_object.assert_called_once_with(
+        Bucket='test-bucket',
+        Key='spatial_data/_backups/comunas/b1/comunas.parquet',
+        CopySource={'Bucket': 'test-bucket', 'Key': 'spatial_data/comunas/comunas.parquet'}
+    )
+    definition = mock_s3.put_object.call_args.kwargs
+    assert definition['Key'] == 'spatial_data/_backups/comunas/b1/_glue_table.json'
+
+    mock_s3.get_paginator.return_value.paginate.return_value = [
+        {'CommonPrefixes': [{'Prefix': 'spatial_data/_backups/comunas/b0/'},
+                            {'Prefix': 'spatial_data/_backups/comunas/b1/'}]}
+    ]
+    mock_s3.get_object.return_value = {'Body': io.BytesIO(definition['Body'])}
+
+    location = loader.restore_table('comunas')
+
+    assert location == 's3://test-bucket/spatial_data/_backups/comunas/b1/'
+    table_input = mock_glue.update_table.call_args.kwargs['TableInput']
+    assert table_input['StorageDescriptor']['Location'] == location
+    assert table_input['StorageDescriptor']['Columns'] == [{'Name': 'id', 'Type': 'int'}]
+    assert 'CreateTime' not in table_input and 'DatabaseName' not in table_input
+
+def test_create_glue_table_repoints_existing_table(sample_config):
+    """Prueba que una tabla existente se actualice y vuelva a su prefijo"""
+    with patch('boto3.client') as mock_boto3:
+        mock_glue = Mock()
+        mock_boto3.side_effect = [Mock(), mock_glue]
+        loader = AWSLoader(sample_config.aws)
+
+    mock_glue.create_table.side_effect = ClientError(
+        {'Error': {'Code': 'AlreadyExistsException'}}, 'CreateTable'
+    )
+    loader.register_table('comunas', {'id': pa.int32()})
+
+    table_input = mock_glue.update_table.call_args.kwargs['TableInput']
+    assert table_input['StorageDescriptor']['Location'] == 's3://test-bucket/spatial_data/comunas/'
@@ -0,0 +1,13 @@
+# tests/test_logger.py
+import logging
+import spatial_migration.scheduler  # noqa: F401 (importa todos los módulos con logger)
+from spatial_migration.logger import setup_logger
+
+def test_setup_logger_adds_handlers_once():
+    """Prueba que importar varios módulos no duplique los handlers del logger"""
+    logger = setup_logger()
+    handlers = list(logger.handlers)
+
+    assert setup_logger() is logger
+    assert logger.handlers == handlers
+    assert sum(isinstance(h, logging.FileHandler) for h in handlers) == 1
@@ -0,0 +1,286 @@
+# tests/test_main.py
+from datetime import datetime
+from unittest.mock import Mock, patch
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from shapely.geometry import Point, Polygon
+from spatial_migration.main import SpatialDataMigration
+from spatial_migration.exceptions import ValidationError
+from spatial_migration.models.schemas import (
+    ChangeBatch,
+    GlueTableSchema,
+    KeyRange,
+    MigrationConfig,
+    PostgresTableSchema
+)
+
+def _migration(sample_config):
+    with patch('boto3.client'):
+        migration = SpatialDataMigration(sample_config)
+    migration.extractor = Mock()
+    migration.extractor.get_table_schema.return_value = PostgresTableSchema(
+        'comunas', {'id': 'smallint', 'geometry': 'geometry'}, 'geometry', 4326,
+        geometry_columns={'geometry': 4326}
+    )
+    migration.loader = Mock()
+    return migration
+
+def test_run_migration_incremental_delta(sample_config, sample_geodataframe):
+    """Prueba que una corrida incremental cargue un archivo de cambios y avance la marca"""
+    migration = _migration(sample_config)
+    until = datetime(2024, 2, 1)
+    migration.loader.load_watermark.return_value = {
+        'column': 'fecha_actu',
+        'value': '2024-01-01T00:00:00'
+    }
+    migration.extractor.get_watermark.return_value = (until, 3)
+    migration.extractor.extract_table_changes.return_value = iter([sample_geodataframe])
+    migration.loader.delta_key.return_value = 'spatial_data/comunas/comunas_delta.parquet'
+
+    with patch.object(migration.transformer, 'write_chunks') as mock_write:
+        mock_write.return_value = []
+        migration.loader.load_stream_to_aws.side_effect = (
+            lambda write_parquet, table_name, **kwargs: write_parquet(Mock()) == {}
+        )
+        assert migration.run_migration('comunas', {'incremental': True})
+
+    # El Parquet se escribe con los tipos de la tabla de origen
+    write_kwargs = mock_write.call_args.kwargs
+    assert write_kwargs['column_types'] == {'id': pa.int16()}
+    assert write_kwargs['dictionary_encoding']
+    extract_kwargs = migration.extractor.extract_table_changes.call_args.kwargs
+    assert extract_kwargs['since'] == '2024-01-01T00:00:00'
+    assert extract_kwargs['until'] == until
+    assert migration.loader.load_stream_to_aws.call_args.kwargs['s3_key'] == (
+        'spatial_data/comunas/comunas_delta.parquet'
+    )
+    migration.loader.save_watermark.assert_called_once_with('comunas', 'fecha_actu', until)
+
+def test_run_migration_incremental_without_changes(sample_config):
+    """Prueba que sin cambios no se extraiga ni se cargue nada"""
+    migration = _migration(sample_config)
+    migration.loader.load_watermark.return_value = {
+        'column': 'fecha_actu',
+        'value': '2024-01-01T00:00:00'
+    }
+    migration.extractor.get_watermark.return_value = (None, 0)
+
+    assert migration.run_migration('comunas', {'incremental': True})
+
+    migration.extractor.extract_table_changes.assert_not_called()
+    migration.loader.load_stream_to_aws.assert_not_called()
+    migration.loader.save_watermark.assert_not_called()
+
+def test_run_migration_incremental_overlap(sample_config):
+    """Prueba que la ventana de solapamiento relea las filas anteriores a la marca"""
+    migration = _migration(sample_config)
+    migration.loader.load_watermark.return_value = {
+        'column': 'fecha_actu',
+        'value': '2024-01-02T00:00:00'
+    }
+    migration.extractor.get_watermark.return_value = (None, 0)
+
+    assert migration.run_migration('comunas', {'incremental': True, 'watermark_overlap': 3600})
+
+    assert migration.extractor.get_watermark.call_args.args == (
+        'comunas', 'fecha_actu', datetime(2024, 1, 1, 23)
+    )
+
+def test_run_replication_checkpoints_after_load(sample_config):
+    """Prueba que los cambios vayan a su propia tabla y el LSN se guarde después de cargarlos"""
+    migration = _migration(sample_config)
+    migration.loader.load_replication_lsn.return_value = 50
+    migration.loader.delta_key.side_effect = lambda table, run_id: f"{table}/{run_id}.parquet"
+    migration.loader.load_object.return_value = {'checksum': 'abc', 'etag': '"e"'}
+    batches = [
+        ChangeBatch(110, 120, {'shapes.comunas': [
+            {'_op': 'I', '_lsn': 110, 'id': '1', 'geometry': Point(1, 0)}
+        ]}),
+        ChangeBatch(130, 140, {'shapes.comunas': [{'_op': 'D', '_lsn': 130, 'id': '1'}]})
+    ]
+
+    with patch('spatial_migration.main.LogicalReplicationSource') as mock_source:
+        mock_source.return_value.stream.return_value = iter(batches)
+        migration.run_replication('spatial_sync', {'shapes.comunas': 'comunas'})
+
+    mock_source.return_value.stream.assert_called_once_with(50, stop=None)
+    # La tabla de cambios se registra una sola vez, con el esquema del snapshot
+    migration.loader.register_table.assert_called_once()
+    table_name, dtypes = migration.loader.register_table.call_args.args
+    assert table_name == 'comunas_changes'
+    assert dtypes == {'_op': pa.string(), '_lsn': pa.int64(), 'id': pa.int16(), 'geometry': pa.string()}
+    migration.loader.load_to_aws.assert_not_called()
+
+    keys = [call.args[1] for call in migration.loader.load_object.call_args_list]
+    assert keys == [
+        'comunas_changes/lsn_000000000000006E.parquet',
+        'comunas_changes/lsn_0000000000000082.parquet'
+    ]
+    # Un DELETE trae sólo la clave y se escribe con el mismo esquema
+    data = migration.loader.load_object.call_args.args[0]
+    table = pq.read_table(pa.BufferReader(data))
+    assert table.schema.field('id').type == pa.int16()
+    assert table.to_pylist() == [{'_op': 'D', '_lsn': 130, 'id': 1, 'geometry': None}]
+    assert [call[0] for call in migration.loader.method_calls[-2:]] == [
+        'load_object', 'save_replication_lsn'
+    ]
+    migration.loader.save_replication_lsn.assert_called_with('spatial_sync', 140)
+
+def test_run_migration_target_table(sample_config, sample_geodataframe):
+    """Prueba que un origen derivado se cargue con el nombre de destino"""
+    migration = _migration(sample_config)
+    migration.extractor.extract_table.return_value = sample_geodataframe
+    limiter = Mock()
+    source = '(SELECT DISTINCT ON ("id") * FROM shapes.comunas ORDER BY "id") AS "comunas"'
+
+    assert migration.run_migration(source, {'target_table': 'comunas', 'upload_limiter': limiter})
+
+    assert migration.extractor.extract_table.call_args.args[0] == source
+    load_args = migration.loader.load_to_aws.call_args
+    assert load_args.args[1] == 'comunas'
+    assert load_args.kwargs['rate_limiter'] is limiter
+
+def test_run_migration_checkpoint_resumes_failed_range(sample_config, sample_geodataframe, tmp_path):
+    """Prueba que al reanudar sólo se procese el rango que había fallado"""
+    migration = _migration(sample_config)
+    migration.extractor.estimate_rows.return_value = 9
+    migration.extractor.get_key_ranges.return_value = [
+        KeyRange(None, 2), KeyRange(2, 3), KeyRange(3, None)
+    ]
+    migration.loader.chunk_key.side_effect = lambda table, job_id, index: f"{table}_{job_id}_{index}"
+    migration.loader.load_object.return_value = {'checksum': 'abc', 'etag': '"e"'}
+    rows = {None: sample_geodataframe.iloc[:1], 2: sample_geodataframe.iloc[1:2]}
+    calls = []
+    failing = {3}
+
+    def extract(table_name, where_clause=None, params=None, **kwargs):
+        lower = params.get('range_lower')
+        calls.append(lower)
+        if lower in failing:
+            raise ConnectionError("conexión perdida")
+        return rows[lower]
+
+    migration.extractor.extract_table.side_effect = extract
+    options = {
+        'checkpoint': True,
+        'ledger_path': str(tmp_path / 'ledger.db'),
+        'chunk_size': 3,
+        'chunk_retries': 1,
+        'retry_delay': 0
+    }
+
+    with pytest.raises(ConnectionError):
+        migration.run_migration('comunas', options)
+    assert calls == [None, 2, 3, 3]
+    migration.loader.publish_chunks.assert_not_called()
+    migration.loader.register_table.assert_not_called()
+    job_id = migration.loader.chunk_key.call_args.args[1]
+
+    calls.clear()
+    failing.clear()
+    rows[3] = sample_geodataframe.iloc[2:]
+    assert migration.run_migration('comunas', options)
+
+    assert calls == [3]
+    assert migration.extractor.get_key_ranges.call_args.kwargs['partitions'] == 3
+    migration.extractor.count_rows.assert_not_called()
+    assert migration.loader.load_object.call_count == 3
+    # Los bloques se publican antes de registrar la tabla y el staging se borra al final
+    assert [call[0] for call in migration.loader.method_calls[-3:]] == [
+        'publish_chunks', 'register_table', 'delete_staging'
+    ]
+    assert migration.loader.publish_chunks.call_args.args == ('comunas', job_id)
+    table_name, dtypes = migration.loader.register_table.call_args.args
+    assert table_name == 'comunas' and dtypes['id'] == pa.int16()
+    migration.loader.delete_staging.assert_called_once_with('comunas', job_id)
+
+def _migration_config(**kwargs):
+    return MigrationConfig(
+        source_table=PostgresTableSchema(
+            'shapes.comunas', {'id': 'smallint', 'geom': 'geometry'}, 'geom', 4326
+        ),
+        target_table=GlueTableSchema('comunas', {}, 's3://test-bucket/spatial_data/comunas/'),
+        **kwargs
+    )
+
+def test_run_migration_from_migration_config(sample_config, sample_geodataframe):
+    """Prueba que batch_size fije el tamaño de los bloques y de los row groups"""
+    migration = _migration(sample_config)
+    migration.migration_config = _migration_config(batch_size=500, create_backup=True)
+    source = '(SELECT "id", "geom" AS geometry FROM shapes.comunas) AS "comunas"'
+    migration.extractor.source_query.return_value = source
+    migration.extractor.extract_table_chunks.return_value = iter([sample_geodataframe])
+    sink = pa.BufferOutputStream()
+    migration.loader.load_stream_to_aws.side_effect = (
+        lambda write_parquet, table_name, **kwargs: bool(write_parquet(sink))
+    )
+
+    assert migration.run_migration()
+
+    migration.extractor.source_query.assert_called_once_with('shapes.comunas', geom_col='geom')
+    assert migration.extractor.extract_table_chunks.call_args.args[0] == source
+    assert migration.extractor.extract_table_chunks.call_args.kwargs['chunk_size'] == 500
+    assert migration.loader.load_stream_to_aws.call_args.args[1] == 'comunas'
+    migration.loader.backup_table.assert_called_once_with('comunas', max_concurrency=16)
+    metadata = pq.read_metadata(pa.BufferReader(sink.getvalue()))
+    assert metadata.num_rows == 3
+
+def test_run_migration_config_defaults_with_table_name(sample_config, sample_geodataframe):
+    """Prueba que el MigrationConfig dé los valores por defecto también con una tabla explícita"""
+    migration = _migration(sample_config)
+    migration.migration_config = _migration_config(batch_size=500)
+    migration.extractor.extract_table_chunks.return_value = iter([sample_geodataframe])
+    migration.loader.load_stream_to_aws.side_effect = (
+        lambda write_parquet, table_name, **kwargs: bool(write_parquet(pa.BufferOutputStream()))
+    )
+
+    assert migration.run_migration('shapes.barrios', {'chunk_size': 50})
+
+    migration.extractor.source_query.assert_not_called()
+    extract_args = migration.extractor.extract_table_chunks.call_args
+    assert extract_args.args[0] == 'shapes.barrios'
+    assert extract_args.kwargs['chunk_size'] == 50
+    # El destino del MigrationConfig sólo aplica a su propia tabla de origen
+    assert migration.loader.load_stream_to_aws.call_args.args[1] == 'shapes.barrios'
+
+def test_run_migration_validates_each_batch(sample_config, sample_geodataframe):
+    """Prueba que las geometrías inválidas se omitan o detengan la migración en su bloque"""
+    migration = _migration(sample_config)
+    migration.migration_config = _migration_config(batch_size=2)
+    migration.extractor.source_query.return_value = 'comunas'
+    invalid = sample_geodataframe.copy()
+    invalid.loc[1, 'geometry'] = Polygon([(0, 0), (1, 1), (1, 0), (0, 1)])
+    closed = []
+
+    def chunks():
+        try:
+            yield sample_geodataframe
+            yield invalid
+            yield sample_geodataframe
+        finally:
+            closed.append(True)
+
+    sinks = []
+
+    def load_stream(write_parquet, table_name, **kwargs):
+        sinks.append(pa.BufferOutputStream())
+        return bool(write_parquet(sinks[-1]))
+
+    migration.extractor.extract_table_chunks.return_value = chunks()
+    migration.loader.load_stream_to_aws.side_effect = load_stream
+
+    # Por defecto la fila inválida se omite y el resto se migra
+    assert migration.run_migration()
+    assert pq.read_metadata(pa.BufferReader(sinks[0].getvalue())).num_rows == 8
+
+    migration.extractor.extract_table_chunks.return_value = chunks()
+    closed.clear()
+    with pytest.raises(ValidationError, match="bloque 1"):
+        migration.run_migration(options={'invalid_geometries': 'raise'})
+    assert closed == [True]
+
+    # Con validate_data=False el bloque se migra igual
+    migration.migration_config = _migration_config(batch_size=2, validate_data=False)
+    migration.extractor.extract_table_chunks.return_value = iter([invalid])
+    assert migration.run_migration()
@@ -0,0 +1,84 @@
+# tests/test_pipeline.py
+import threading
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from spatial_migration.core.transformer import SpatialTransformer
+from spatial_migration.utils.pipeline import StageTimer, map_ordered, prefetch
+
+def test_prefetch_is_bounded():
+    """Prueba que el productor no adelante más elementos que la cola"""
+    produced = []
+
+    def source():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    items = prefetch(source(), maxsize=2)
+    assert next(items) == 0
+    time.sleep(0.05)
+    # El elemento entregado, dos en la cola y uno esperando lugar
+    assert len(produced) <= 4
+    assert list(items) == list(range(1, 10))
+
+def test_prefetch_propagates_errors_and_closes_source():
+    """Prueba que los errores del productor lleguen al consumidor y que se cierre la fuente"""
+    def failing():
+        yield 1
+        raise RuntimeError("conexión perdida")
+
+    with pytest.raises(RuntimeError, match="conexión perdida"):
+        list(prefetch(failing()))
+
+    closed = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield 1
+        finally:
+            closed.set()
+
+    items = prefetch(endless())
+    next(items)
+    items.close()
+    assert closed.is_set()
+
+def test_map_ordered_keeps_order_and_overlaps():
+    """Prueba que el orden se conserve y que las etapas se solapen"""
+    def slow_source():
+        for i in range(8):
+            time.sleep(0.02)
+            yield i
+
+    def slow_square(value):
+        time.sleep(0.02)
+        return value * value
+
+    timer = StageTimer()
+    started = time.perf_counter()
+    results = list(map_ordered(
+        slow_square, prefetch(slow_source(), name='fuente', timer=timer),
+        workers=1, name='cuadrado', timer=timer
+    ))
+    elapsed = time.perf_counter() - started
+
+    assert results == [i * i for i in range(8)]
+    assert set(timer.seconds) == {'fuente', 'cuadrado'}
+    # En secuencia tardaría 0.32 s; solapadas, algo más que una sola etapa
+    assert elapsed < 0.28
+
+def test_write_chunks_with_transform_workers(sample_geodataframe):
+    """Prueba que la transformación en hilos escriba los bloques en orden"""
+    transformer = SpatialTransformer()
+    chunks = [sample_geodataframe.assign(id=sample_geodataframe['id'] + 10 * i) for i in range(5)]
+    sink = pa.BufferOutputStream()
+    timer = StageTimer()
+
+    transformer.write_chunks(prefetch(iter(chunks)), sink, transform_workers=2, timer=timer)
+
+    table = pq.read_table(pa.BufferReader(sink.getvalue()))
+    assert table.column('id').to_pylist() == [i + 10 * n for n in range(5) for i in (1, 2, 3)]
+    assert set(timer.seconds) == {'transformación', 'escritura'}
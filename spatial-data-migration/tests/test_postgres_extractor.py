@@ -0,0 +1,482 @@
+# tests/test_postgres_extractor.py
+import struct
+from decimal import Decimal
+import geopandas as gpd
+import pyarrow as pa
+import pytest
+from shapely.geometry import Point
+from sqlalchemy import create_engine, text
+from unittest.mock import MagicMock, patch
+from spatial_migration.core.extractor import (
+    PostgreSQLExtractor,
+    key_range_clause,
+    project_columns,
+    spatial_filter_clause,
+    split_key_range,
+    tile_clause,
+    watermark_clause
+)
+from spatial_migration.core.transformer import SpatialTransformer
+from spatial_migration.core.type_mapping import arrow_column_types
+from spatial_migration.models.schemas import KeyRange, SpatialFilter, TileRange
+from spatial_migration.utils.db import table_schema_from_rows
+from .test_binary_copy import _copy_stream
+from .test_db import SCHEMA_ROWS
+
+def test_extract_table_chunks(sample_config, sample_geodataframe):
+    """Prueba la extracción por bloques con cursor server-side"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    chunks = [sample_geodataframe.iloc[:2], sample_geodataframe.iloc[2:]]
+
+    with patch('geopandas.read_postgis', return_value=iter(chunks)) as mock_read:
+        result = list(extractor.extract_table_chunks('test_table', chunk_size=2))
+
+    assert [len(chunk) for chunk in result] == [2, 1]
+    conn.execution_options.assert_called_once_with(stream_results=True, max_row_buffer=2)
+    assert mock_read.call_args.kwargs['chunksize'] == 2
+    assert mock_read.call_args.args[1] is conn
+
+def test_extract_table_chunks_invalid_size(sample_config):
+    """Prueba que se rechace un tamaño de bloque inválido"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+
+    with pytest.raises(ValueError):
+        next(extractor.extract_table_chunks('test_table', chunk_size=0))
+
+def test_extract_table_wkb_format(sample_config, sample_geodataframe):
+    """Prueba que el modo wkb no duplique la geometría y use el SRID del catálogo"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.scalar.return_value = 4326
+
+    with patch('geopandas.read_postgis', return_value=sample_geodataframe) as mock_read:
+        extractor.extract_table('shapes.comunas', geometry_format='wkb')
+        extractor.extract_table('shapes.comunas', geometry_format='wkb')
+
+    query = str(mock_read.call_args.args[0])
+    assert 'ST_AsText' not in query and 'ST_SRID' not in query
+    assert mock_read.call_args.kwargs['crs'] == 'EPSG:4326'
+    # El SRID se consulta una sola vez por tabla
+    conn.execute.assert_called_once()
+    assert conn.execute.call_args.args[1]['schema'] == 'shapes'
+
+def test_extract_table_invalid_geometry_format(sample_config):
+    """Prueba que se rechace un formato de geometría desconocido"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+
+    with pytest.raises(ValueError):
+        extractor.extract_table('test_table', geometry_format='geojson')
+
+def test_split_key_range():
+    """Prueba que los rangos cubran la clave sin huecos ni rangos vacíos"""
+    ranges = split_key_range([10, 20, 20, 30])
+
+    assert ranges == [
+        KeyRange(None, 10),
+        KeyRange(10, 20),
+        KeyRange(20, 30),
+        KeyRange(30, None)
+    ]
+    assert key_range_clause('id', ranges[1]) == (
+        'id >= :range_lower AND id < :range_upper',
+        {'range_lower': 10, 'range_upper': 20}
+    )
+    assert key_range_clause('id', KeyRange()) == (None, {})
+
+def test_get_key_ranges_minmax(sample_config):
+    """Prueba el cálculo de rangos de igual amplitud entre min y max"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.one.return_value = (1, 101)
+
+    ranges = extractor.get_key_ranges('test_table', partitions=4)
+
+    assert [r.upper for r in ranges] == [26, 51, 76, None]
+
+def test_extract_table_parallel_spawns_workers(sample_config, sample_geodataframe):
+    """Prueba que los procesos se creen con spawn sin cerrar el pool compartido"""
+    from concurrent.futures import ThreadPoolExecutor
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.one.return_value = (1, 101)
+    pools = []
+
+    def executor(max_workers, mp_context):
+        pools.append(mp_context.get_start_method())
+        return ThreadPoolExecutor(max_workers)
+
+    with patch('spatial_migration.core.extractor.ProcessPoolExecutor', side_effect=executor), \
+            patch('spatial_migration.core.extractor._extract_range',
+                  return_value=sample_geodataframe) as mock_range:
+        chunks = list(extractor.extract_table_parallel('test_table', workers=2, consistent=False))
+
+    assert pools == ['spawn']
+    assert len(chunks) == 2 and mock_range.call_count == 2
+    extractor._engine.dispose.assert_not_called()
+
+@pytest.mark.parametrize('reltuples, expected', [(1500.0, 1500), (-1.0, None)])
+def test_estimate_rows(sample_config, reltuples, expected):
+    """Prueba que la cantidad de filas salga de las estadísticas, sin recorrer la tabla"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.scalar.return_value = reltuples
+
+    assert extractor.estimate_rows('shapes.comunas') == expected
+    assert 'reltuples' in str(conn.execute.call_args.args[0])
+    assert extractor.estimate_rows('(SELECT 1) AS "uno"') is None
+
+def test_exported_snapshot(sample_config):
+    """Prueba que la transacción coordinadora exporte su snapshot"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.scalar.return_value = '00000003-0000001B-1'
+
+    with extractor.exported_snapshot() as snapshot_id:
+        assert snapshot_id == '00000003-0000001B-1'
+        conn.rollback.assert_not_called()
+
+    conn.execution_options.assert_called_once_with(
+        isolation_level='REPEATABLE READ',
+        postgresql_readonly=True
+    )
+    assert 'pg_export_snapshot' in str(conn.execute.call_args.args[0])
+    conn.rollback.assert_called_once()
+
+def test_extract_table_with_snapshot(sample_config, sample_geodataframe):
+    """Prueba que la lectura se adjunte al snapshot antes de consultar"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+
+    with patch('geopandas.read_postgis', return_value=sample_geodataframe) as mock_read:
+        extractor.extract_table('test_table', snapshot_id='00000003-0000001B-1')
+
+    statement, params = conn.execute.call_args.args
+    assert 'SET TRANSACTION SNAPSHOT' in str(statement)
+    assert params == {'snapshot_id': '00000003-0000001B-1'}
+    assert mock_read.call_args.args[1] is conn
+
+def test_extract_table_arrow(sample_config):
+    """Prueba la extracción con COPY binario hacia una tabla Arrow"""
+    stream = _copy_stream([
+        [struct.pack('>i', 1), Point(0, 0).wkb, b'12.50'],
+        [struct.pack('>i', 2), Point(1, 1).wkb, None],
+    ])
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    extractor._srid_cache[('shapes.comunas', 'geometry')] = 4326
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    cursor = conn.connection.cursor.return_value
+    # geometry tiene un OID dinámico y numeric (1700) no tiene decodificador
+    cursor.description = [
+        MagicMock(type_code=23), MagicMock(type_code=99999), MagicMock(type_code=1700)
+    ]
+    for column, name in zip(cursor.description, ['id', 'geometry', 'shape_area']):
+        column.name = name
+    cursor.copy_expert.side_effect = lambda sql, buffer: buffer.write(stream)
+
+    table = extractor.extract_table_arrow('shapes.comunas')
+
+    copy_sql = cursor.copy_expert.call_args.args[0]
+    assert 'ST_AsBinary("geometry")' in copy_sql
+    assert '"shape_area"::text' in copy_sql
+    assert 'FORMAT binary' in copy_sql
+    assert table.column('id').to_pylist() == [1, 2]
+    assert table.column('shape_area').to_pylist() == ['12.50', None]
+    assert table.schema.metadata == {b'srid': b'4326'}
+
+def test_watermark_clause():
+    """Prueba el rango [since, until] y la inclusión de NULL en la primera corrida"""
+    assert watermark_clause('fecha_actu', '2024-01-01', '2024-02-01') == (
+        'fecha_actu >= :watermark_since AND fecha_actu <= :watermark_until',
+        {'watermark_since': '2024-01-01', 'watermark_until': '2024-02-01'}
+    )
+    assert watermark_clause('fecha_actu', None, '2024-02-01') == (
+        '(fecha_actu <= :watermark_until OR fecha_actu IS NULL)',
+        {'watermark_until': '2024-02-01'}
+    )
+    assert watermark_clause('fecha_actu') == (None, {})
+
+def test_watermark_rereads_boundary_date(sample_config):
+    """Prueba que una fila modificada el mismo día que la marca guardada entre en la corrida siguiente"""
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE comunas (id INTEGER, fecha_actu DATE)"))
+        conn.execute(text("INSERT INTO comunas VALUES (1, '2024-01-01'), (2, '2024-01-02')"))
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = engine
+
+    def changed_ids(since, until):
+        clause, params = watermark_clause('fecha_actu', since, until)
+        with engine.connect() as conn:
+            rows = conn.execute(text(f"SELECT id FROM comunas WHERE {clause}"), params)
+            return sorted(row[0] for row in rows)
+
+    # Primera corrida: toda la tabla; la marca queda en el 2 de enero
+    until, changed = extractor.get_watermark('comunas', 'fecha_actu')
+    assert (until, changed) == ('2024-01-02', 2)
+    assert changed_ids(None, until) == [1, 2]
+
+    # Más tarde ese mismo día se modifica otra fila
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE comunas SET fecha_actu = '2024-01-02' WHERE id = 1"))
+
+    since = until
+    until, changed = extractor.get_watermark('comunas', 'fecha_actu', since)
+    assert (until, changed) == ('2024-01-02', 2)
+    assert changed_ids(since, until) == [1, 2]
+
+def test_extract_table_changes(sample_config, sample_geodataframe):
+    """Prueba que la extracción incremental enlace las marcas como parámetros"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+
+    with patch('geopandas.read_postgis', return_value=iter([sample_geodataframe])) as mock_read:
+        chunks = list(extractor.extract_table_changes(
+            'shapes.comunas', 'fecha_actu', since='2024-01-01', until='2024-02-01'
+        ))
+
+    assert len(chunks) == 1
+    assert 'fecha_actu >= :watermark_since' in str(mock_read.call_args.args[0])
+    assert mock_read.call_args.kwargs['params'] == {
+        'watermark_since': '2024-01-01',
+        'watermark_until': '2024-02-01'
+    }
+
+def test_profile_table_single_scan(sample_config):
+    """Prueba que el perfil exacto salga de una sola consulta de agregación"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.one.return_value = (
+        10, 9, 1, 2, -75.7, 6.1, -75.4, 6.4, ['POLYGON', 'MULTIPOLYGON'], [4326]
+    )
+
+    profile = extractor.profile_table('shapes.comunas')
+
+    conn.execute.assert_called_once()
+    query = str(conn.execute.call_args.args[0])
+    assert 'count(DISTINCT id)' in query and 'ST_IsValid(geometry)' in query
+    assert profile.duplicate_keys == 1
+    assert profile.invalid_geometries == 2
+    assert profile.extent == (-75.7, 6.1, -75.4, 6.4)
+    assert profile.geometry_types == ['MULTIPOLYGON', 'POLYGON']
+    assert not profile.estimated
+
+def test_profile_table_estimate(sample_config):
+    """Prueba el perfil estimado a partir de reltuples y pg_stats"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.one.return_value = (
+        1000.0, -1.0, 0.01, 'MULTIPOLYGON', 4326, -75.7, 6.1, -75.4, 6.4
+    )
+
+    profile = extractor.profile_table('shapes.comunas', estimate=True)
+
+    query = str(conn.execute.call_args.args[0])
+    assert 'reltuples' in query and 'ST_EstimatedExtent' in query
+    assert conn.execute.call_args.args[1]['schema'] == 'shapes'
+    assert (profile.row_count, profile.distinct_keys, profile.null_geometries) == (1000, 1000, 10)
+    assert profile.invalid_geometries is None
+    assert profile.srids == [4326]
+    assert profile.estimated
+
+def test_spatial_filter_clause_bbox_and_geometry():
+    """Prueba la compilación de bbox y WKB a predicados con parámetros"""
+    clause, params = spatial_filter_clause(SpatialFilter(bbox=(-75.6, 6.2, -75.5, 6.3)), 'geometry', 4326)
+
+    assert clause == (
+        'ST_Intersects(geometry, ST_MakeEnvelope(:sf_xmin, :sf_ymin, :sf_xmax, :sf_ymax, :sf_srid))'
+    )
+    assert params == {'sf_srid': 4326, 'sf_xmin': -75.6, 'sf_ymin': 6.2, 'sf_xmax': -75.5, 'sf_ymax': 6.3}
+
+    polygon = Point(0, 0).buffer(1)
+    clause, params = spatial_filter_clause(
+        SpatialFilter(geometry=polygon.wkb, srid=3116, predicate='bbox'), 'geometry', 4326
+    )
+    # Se transforma el filtro, no la columna, para conservar el índice
+    assert clause == (
+        "geometry && ST_Transform(ST_GeomFromWKB(decode(:sf_geometry, 'hex'), :sf_srid), :sf_table_srid)"
+    )
+    assert params['sf_geometry'] == polygon.wkb_hex.lower()
+    assert (params['sf_srid'], params['sf_table_srid']) == (3116, 4326)
+
+def test_spatial_filter_clause_invalid():
+    """Prueba que se rechacen filtros ambiguos o predicados desconocidos"""
+    with pytest.raises(ValueError):
+        spatial_filter_clause(SpatialFilter(bbox=(0, 0, 1, 1), geometry='POINT(0 0)'))
+    with pytest.raises(ValueError):
+        spatial_filter_clause(SpatialFilter(geometry='POINT(0 0)', predicate='within'))
+
+def test_extract_table_with_reference_table_filter(sample_config, sample_geodataframe):
+    """Prueba el filtro por otra tabla combinado con la cláusula WHERE"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    extractor._srid_cache[('shapes.barrios', 'geometry')] = 4326
+
+    with patch('geopandas.read_postgis', return_value=sample_geodataframe) as mock_read:
+        extractor.extract_table(
+            'shapes.barrios',
+            where_clause='activo = :activo',
+            params={'activo': True},
+            spatial_filter=SpatialFilter(
+                table='shapes.comunas',
+                table_where='sf_ref.codigo = :codigo',
+                table_params={'codigo': '01'}
+            )
+        )
+
+    query = str(mock_read.call_args.args[0])
+    assert '(activo = :activo) AND (EXISTS (SELECT 1 FROM shapes.comunas AS sf_ref' in query
+    assert 'ST_Intersects(shapes.barrios.geometry, sf_ref.geometry)' in query
+    assert 'AND (sf_ref.codigo = :codigo)' in query
+    assert mock_read.call_args.kwargs['params'] == {'activo': True, 'codigo': '01'}
+
+def test_tile_clause():
+    """Prueba el predicado de pertenencia por la esquina inferior izquierda"""
+    clause, params = tile_clause(TileRange(xmin=-75.6, ymax=6.3), 'geometry', 4326)
+
+    assert clause == (
+        'geometry && ST_MakeEnvelope(:tile_xmin_env, :tile_ymin_env, :tile_xmax_env, :tile_ymax_env, :tile_srid) '
+        'AND ST_XMin(geometry) >= :tile_xmin AND ST_YMin(geometry) < :tile_ymax'
+    )
+    assert (params['tile_xmin'], params['tile_ymax']) == (-75.6, 6.3)
+    assert params['tile_xmin_env'] == -75.6 and params['tile_xmax_env'] > 1e12
+    assert params['tile_ymin_env'] < -1e12 and params['tile_srid'] == 4326
+
+    # Sin SRID no se agrega el prefiltro con el índice
+    assert tile_clause(TileRange(xmax=0.0)) == ('ST_XMin(geometry) < :tile_xmax', {'tile_xmax': 0.0})
+    assert tile_clause(TileRange()) == (None, {})
+    assert tile_clause(TileRange(null_only=True)) == ('(geometry IS NULL OR ST_IsEmpty(geometry))', {})
+
+def test_get_tile_ranges(sample_config):
+    """Prueba el muestreo con TABLESAMPLE y el tile de geometrías nulas"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.scalar.return_value = 1000000.0
+    conn.execute.return_value.all.return_value = [
+        (x, y, 100) for x in range(10) for y in range(10)
+    ]
+
+    tiles = extractor.get_tile_ranges('shapes.veredas', tiles=4, where_clause='activo')
+
+    query = str(conn.execute.call_args.args[0])
+    assert 'TABLESAMPLE SYSTEM (:sample_percent)' in query and 'AND (activo)' in query
+    assert conn.execute.call_args.args[1]['sample_percent'] == 1.0
+    assert len(tiles) == 5
+    assert tiles[-1].null_only
+    assert sum(tile.weight for tile in tiles) == 10000
+
+def test_get_key_ranges_rejects_quadtree(sample_config):
+    """Prueba que el método por tiles no se use para rangos de clave"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+
+    with pytest.raises(ValueError):
+        extractor.get_key_ranges('test_table', method='quadtree')
+
+def test_project_columns():
+    """Prueba la proyección por inclusión y exclusión conservando la geometría"""
+    extractor_schema = table_schema_from_rows('shapes.comunas', SCHEMA_ROWS)
+
+    assert project_columns(extractor_schema, columns=['nombre', 'id']) == ['id', 'nombre', 'geometry']
+    assert project_columns(extractor_schema, exclude_columns=['codigos', 'area']) == ['id', 'nombre', 'geometry']
+    with pytest.raises(ValueError):
+        project_columns(extractor_schema, columns=['poblacion'])
+    with pytest.raises(ValueError):
+        project_columns(extractor_schema, exclude_columns=['geometry'])
+
+def test_extract_table_with_columns(sample_config, sample_geodataframe):
+    """Prueba que sólo las columnas pedidas viajen y que el catálogo se lea una vez"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    conn.exec_driver_sql.return_value.mappings.return_value.all.return_value = SCHEMA_ROWS
+
+    with patch('geopandas.read_postgis', return_value=sample_geodataframe) as mock_read:
+        extractor.extract_table('shapes.comunas', geometry_format='wkb', columns=['nombre'])
+        extractor.extract_table('shapes.comunas', geometry_format='wkb', exclude_columns=['codigos'])
+
+    first = str(mock_read.call_args_list[0].args[0])
+    second = str(mock_read.call_args_list[1].args[0])
+    assert 'SELECT "nombre", "geometry"' in first
+    # numeric viaja como texto para no perder precisión en pandas
+    assert 'SELECT "id", "nombre", "area"::text AS "area", "geometry"' in second
+    conn.exec_driver_sql.assert_called_once()
+    # El SRID sale del mismo schema, sin consultar geometry_columns aparte
+    assert extractor.get_srid('shapes.comunas') == 4326
+
+def test_extract_table_keeps_exact_numbers(sample_config):
+    """Prueba que numeric y bigint con nulos lleguen al Parquet sin pasar por float"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    rows = SCHEMA_ROWS[:2] + [
+        {**SCHEMA_ROWS[2], 'numeric_precision': 10, 'numeric_scale': 3},
+        {**SCHEMA_ROWS[0], 'column_name': 'codigo', 'data_type': 'bigint', 'udt_name': 'int8'},
+        SCHEMA_ROWS[-1]
+    ]
+    conn.exec_driver_sql.return_value.mappings.return_value.all.return_value = rows
+    # Lo que entrega pandas para las columnas leídas como texto
+    extracted = gpd.GeoDataFrame({
+        'id': [1, 2],
+        'nombre': ['a', 'b'],
+        'area': ['2.675', None],
+        'codigo': [str(2 ** 53 + 1), None],
+        'geometry': [Point(0, 0), Point(1, 1)]
+    }, geometry='geometry')
+
+    with patch('geopandas.read_postgis', return_value=extracted) as mock_read:
+        gdf = extractor.extract_table('shapes.comunas', geometry_format='wkb')
+
+    query = str(mock_read.call_args.args[0])
+    assert '"area"::text AS "area"' in query and '"codigo"::text AS "codigo"' in query
+    table = SpatialTransformer().to_arrow_table(
+        gdf, 'wkb', preserve_index=False, column_types=arrow_column_types(
+            extractor.get_table_schema('shapes.comunas')
+        )
+    )
+    assert table.schema.field('area').type == pa.decimal128(10, 3)
+    assert table.column('area').to_pylist() == [Decimal('2.675'), None]
+    assert table.column('codigo').to_pylist() == [2 ** 53 + 1, None]
+
+def test_source_query_renames_geometry_and_deduplicates(sample_config, sample_geodataframe):
+    """Prueba el origen derivado con geometría 'geom' y una fila por clave"""
+    extractor = PostgreSQLExtractor(sample_config.postgres)
+    extractor._engine = MagicMock()
+    conn = extractor._engine.connect.return_value.__enter__.return_value
+    rows = SCHEMA_ROWS[:-1] + [{**SCHEMA_ROWS[-1], 'column_name': 'geom'}]
+    conn.exec_driver_sql.return_value.mappings.return_value.all.return_value = rows
+
+    source = extractor.source_query('shapes.comunas', geom_col='geom', dedup_key='id')
+
+    assert source == (
+        '(SELECT DISTINCT ON ("id") "id", "nombre", "area", "codigos", "geom" AS geometry '
+        'FROM shapes.comunas ORDER BY "id") AS "comunas"'
+    )
+    assert list(extractor.get_table_schema(source).columns)[-1] == 'geometry'
+    assert extractor.get_srid(source) == 4326
+
+    with patch('geopandas.read_postgis', return_value=sample_geodataframe) as mock_read:
+        extractor.extract_table(
+            source,
+            geometry_format='wkb',
+            columns=['nombre'],
+            spatial_filter=SpatialFilter(table='shapes.regiones')
+        )
+
+    query = str(mock_read.call_args.args[0])
+    assert query.strip().startswith('SELECT "nombre", "geometry"')
+    assert '"comunas".geometry' in query
+    # Sólo la primera lectura del catálogo; el origen derivado usa el cache
+    conn.exec_driver_sql.assert_called_once()
+    with pytest.raises(ValueError):
+        extractor.source_query('shapes.comunas', geom_col='geom', dedup_key='codigo')
@@ -0,0 +1,143 @@
+# tests/test_replication.py
+import json
+import threading
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+import pyarrow as pa
+from shapely.geometry import Point
+from spatial_migration.core.replication import (
+    ChangeBatcher,
+    LogicalReplicationSource,
+    change_schema,
+    changes_to_table
+)
+from spatial_migration.models.schemas import PostgresTableSchema
+
+def _begin():
+    return json.dumps({'action': 'B'})
+
+def _commit():
+    return json.dumps({'action': 'C'})
+
+def _insert(row_id, table='comunas'):
+    return json.dumps({
+        'action': 'I',
+        'schema': 'shapes',
+        'table': table,
+        'columns': [
+            {'name': 'id', 'type': 'integer', 'value': row_id},
+            {'name': 'geometry', 'type': 'public.geometry(Point,4326)', 'value': Point(row_id, 0).wkb_hex}
+        ]
+    })
+
+def _delete(row_id):
+    return json.dumps({
+        'action': 'D',
+        'schema': 'shapes',
+        'table': 'comunas',
+        'identity': [{'name': 'id', 'type': 'integer', 'value': row_id}]
+    })
+
+def test_change_batcher_closes_on_commit():
+    """Prueba que los lotes se cierren en el COMMIT al llegar al máximo de filas"""
+    batcher = ChangeBatcher(['shapes.comunas'], max_rows=2)
+
+    assert batcher.add(_begin(), 100) is None
+    assert batcher.add(_insert(1), 110) is None
+    assert batcher.add(_insert(2, table='otra'), 115) is None
+    assert batcher.add(_commit(), 120) is None
+    assert batcher.add(_begin(), 130) is None
+    assert batcher.add(_delete(1), 140) is None
+    batch = batcher.add(_commit(), 150)
+
+    assert (batch.start_lsn, batch.end_lsn) == (110, 150)
+    rows = batch.changes['shapes.comunas']
+    assert [row['_op'] for row in rows] == ['I', 'D']
+    assert rows[0]['geometry'].equals(Point(1, 0))
+    assert rows[1] == {'_op': 'D', '_lsn': 140, 'id': 1}
+    assert not batcher.pending
+
+def test_change_batcher_skips_checkpointed_transactions():
+    """Prueba que al reanudar se descarten las transacciones ya cargadas"""
+    batcher = ChangeBatcher(['shapes.comunas'], max_rows=1, start_lsn=150)
+
+    for payload, lsn in [(_begin(), 100), (_insert(1), 110), (_commit(), 150)]:
+        assert batcher.add(payload, lsn) is None
+    for payload, lsn in [(_begin(), 160), (_insert(2), 170)]:
+        batcher.add(payload, lsn)
+    batch = batcher.add(_commit(), 180)
+
+    assert [row['id'] for row in batch.changes['shapes.comunas']] == [2]
+
+def test_change_batcher_max_latency():
+    """Prueba que un lote pequeño se entregue al vencer la latencia máxima"""
+    now = [0.0]
+    batcher = ChangeBatcher(['shapes.comunas'], max_latency=5, clock=lambda: now[0])
+    for payload, lsn in [(_begin(), 100), (_insert(1), 110), (_commit(), 120)]:
+        batcher.add(payload, lsn)
+
+    now[0] = 4.0
+    assert batcher.poll() is None
+    now[0] = 5.0
+    assert batcher.poll().row_count == 1
+
+def test_logical_replication_source_confirms_after_consumer(sample_config):
+    """Prueba que el slot avance sólo cuando se pide el lote siguiente"""
+    messages = [
+        MagicMock(payload=payload, data_start=lsn)
+        for payload, lsn in [(_begin(), 100), (_insert(1), 110), (_commit(), 120)]
+    ]
+    stop = threading.Event()
+    conn = MagicMock()
+    cursor = conn.cursor.return_value
+    cursor.read_message.side_effect = messages + [None] * 10
+
+    source = LogicalReplicationSource(
+        sample_config.postgres, 'spatial_sync', ['shapes.comunas'], max_rows=1
+    )
+    with patch('psycopg2.connect', return_value=conn), patch('select.select'):
+        stream = source.stream(start_lsn=50, stop=stop)
+        batch = next(stream)
+        cursor.send_feedback.assert_not_called()
+        stop.set()
+        assert list(stream) == []
+
+    assert batch.end_lsn == 120
+    cursor.send_feedback.assert_called_once_with(flush_lsn=120)
+    assert cursor.start_replication.call_args.kwargs['options']['add-tables'] == 'shapes.comunas'
+    conn.close.assert_called_once()
+
+def test_changes_to_table_uses_snapshot_types():
+    """Prueba que los cambios se conviertan a los tipos del snapshot y no a los inferidos"""
+    schema = change_schema(PostgresTableSchema(
+        'shapes.comunas',
+        {'id': 'integer', 'area': 'numeric(12,2)', 'fecha_actu': 'date', 'geometry': 'geometry'},
+        'geometry',
+        4326,
+        geometry_columns={'geometry': 4326}
+    ))
+
+    table = changes_to_table([
+        {'_op': 'I', '_lsn': 110, 'id': '1', 'area': '12.50',
+         'fecha_actu': '2024-01-02', 'geometry': Point(1, 0)},
+        {'_op': 'D', '_lsn': 140, 'id': '1'}
+    ], schema)
+
+    assert table.schema == schema
+    assert schema.field('fecha_actu').type == pa.date32()
+    assert table.column('area').to_pylist() == [Decimal('12.50'), None]
+    assert table.column('geometry').to_pylist() == ['POINT (1 0)', None]
+    assert table.column('_op').to_pylist() == ['I', 'D']
+
+def test_changes_to_table_keeps_geometry_precision():
+    """Prueba que la geometría de los cambios conserve la precisión completa, como el snapshot"""
+    schema = change_schema(PostgresTableSchema(
+        'shapes.comunas', {'id': 'integer', 'geometry': 'geometry'}, 'geometry', 4326,
+        geometry_columns={'geometry': 4326}
+    ))
+
+    table = changes_to_table([
+        {'_op': 'U', '_lsn': 110, 'id': '1', 'geometry': Point(-58.123456789012, -34.987654321098)}
+    ], schema)
+
+    assert table.column('geometry').to_pylist() == ['POINT (-58.123456789012 -34.987654321098)']
@@ -0,0 +1,139 @@
+# tests/test_scheduler.py
+import threading
+import time
+from unittest.mock import Mock
+import pytest
+from spatial_migration.exceptions import ConfigurationError
+from spatial_migration.models.schemas import SchedulerLimits
+from spatial_migration.scheduler import MigrationScheduler, load_manifest, parse_manifest
+
+MANIFEST = """
+limits:
+  db_connections: 4
+  cpu_workers: 6
+  upload_bandwidth: 20MB
+defaults:
+  extraction_mode: chunked
+  output_format: geoparquet
+tables:
+  - name: comunas
+    source: shapes.comunas
+    geometry_column: geom
+    dedup_key: id
+    partitioning:
+      method: percentile
+      key_column: id
+      workers: 8
+  - name: barrios_vigentes
+    query: SELECT id, nombre, geometry FROM shapes.barrios WHERE vigente
+    options:
+      output_format: parquet
+"""
+
+def test_load_manifest(tmp_path):
+    """Prueba la lectura del manifiesto con opciones por defecto y límites"""
+    path = tmp_path / 'manifest.yaml'
+    path.write_text(MANIFEST, encoding='utf-8')
+
+    manifest = load_manifest(str(path))
+
+    assert manifest.limits == SchedulerLimits(4, 6, 20 * 1024 ** 2)
+    comunas, barrios = manifest.tables
+    assert comunas.dedup_key == ['id']
+    assert comunas.options == {'extraction_mode': 'chunked', 'output_format': 'geoparquet'}
+    assert barrios.options['output_format'] == 'parquet'
+
+@pytest.mark.parametrize('table', [
+    {'name': 'comunas'},
+    {'name': 'comunas', 'source': 'shapes.comunas', 'query': 'SELECT 1'},
+    {'name': 'comunas', 'query': 'SELECT * FROM shapes.comunas', 'dedup_key': 'id'},
+    {'name': 'comunas', 'source': 'shapes.comunas', 'geometry_column': 'geom',
+     'partitioning': {'method': 'quadtree'}},
+    {'name': 'comunas', 'source': 'shapes.comunas', 'options': {'target_table': 'otra'}},
+    {'name': 'comunas', 'source': 'shapes.comunas', 'destino': 'otra'},
+])
+def test_parse_manifest_invalid_table(table):
+    """Prueba que se rechacen las entradas incoherentes"""
+    with pytest.raises(ConfigurationError):
+        parse_manifest({'tables': [table]})
+
+def test_parse_manifest_duplicated_target():
+    """Prueba que dos entradas no escriban la misma tabla de destino"""
+    table = {'name': 'comunas', 'source': 'shapes.comunas'}
+    with pytest.raises(ConfigurationError):
+        parse_manifest({'tables': [table, dict(table)]})
+
+def _scheduler(limits, run_migration):
+    migration = Mock()
+    migration.extractor.source_query.side_effect = lambda source, **kwargs: source
+    migration.run_migration.side_effect = run_migration
+    return MigrationScheduler(None, limits, migration=migration), migration
+
+def test_scheduler_respects_global_limits():
+    """Prueba que las tablas en curso no superen las conexiones ni los núcleos"""
+    lock = threading.Lock()
+    in_use = {'db': 0, 'cpu': 0}
+    peak = {'db': 0, 'cpu': 0}
+
+    def run_migration(source, options):
+        demand = scheduler.demand(options)
+        with lock:
+            in_use['db'] += demand['db_connections']
+            in_use['cpu'] += demand['cpu_workers']
+            peak['db'] = max(peak['db'], in_use['db'])
+            peak['cpu'] = max(peak['cpu'], in_use['cpu'])
+        time.sleep(0.02)
+        with lock:
+            in_use['db'] -= demand['db_connections']
+            in_use['cpu'] -= demand['cpu_workers']
+        return True
+
+    manifest = parse_manifest({
+        'defaults': {'extraction_mode': 'chunked', 'transform_workers': 2},
+        'tables': [
+            {'name': 'comunas', 'source': 'shapes.comunas', 'partitioning': {'workers': 8}},
+            {'name': 'barrios', 'source': 'shapes.barrios'},
+            {'name': 'manzanas', 'source': 'shapes.manzanas'},
+            {'name': 'predios', 'source': 'shapes.predios'},
+        ]
+    })
+    scheduler, migration = _scheduler(SchedulerLimits(db_connections=3, cpu_workers=6), run_migration)
+
+    results = scheduler.run(manifest.tables)
+
+    assert results == {'comunas': True, 'barrios': True, 'manzanas': True, 'predios': True}
+    assert peak['db'] <= 3 and peak['cpu'] <= 6
+    # Los procesos de la tabla paralela se recortan al límite de conexiones
+    options = {call.args[0]: call.args[1] for call in migration.run_migration.call_args_list}
+    assert options['shapes.comunas']['workers'] == 3
+    assert options['shapes.comunas']['transform_workers'] == 2
+    assert options['shapes.barrios']['target_table'] == 'barrios'
+    assert scheduler.resources.available() == {'db_connections': 3, 'cpu_workers': 6}
+
+def test_scheduler_isolates_failures_and_shares_limiter():
+    """Prueba que el error de una tabla no detenga a las demás"""
+    def run_migration(source, options):
+        if 'barrios' in source:
+            raise RuntimeError("conexión perdida")
+        return True
+
+    manifest = parse_manifest({
+        'limits': {'upload_bandwidth': '1MB/s'},
+        'tables': [
+            {'name': 'comunas', 'source': 'shapes.comunas', 'geometry_column': 'geom'},
+            {'name': 'barrios', 'query': 'SELECT * FROM shapes.barrios'},
+        ]
+    })
+    scheduler, migration = _scheduler(manifest.limits, run_migration)
+
+    assert scheduler.run(manifest.tables) == {'comunas': True, 'barrios': False}
+
+    migration.extractor.source_query.assert_called_once_with(
+        'shapes.comunas', geom_col='geom', dedup_key=None
+    )
+    calls = {call.args[1]['target_table']: call for call in migration.run_migration.call_args_list}
+    assert calls['barrios'].args[0] == '(SELECT * FROM shapes.barrios) AS "barrios"'
+    assert calls['barrios'].args[1]['type_mapping'] is False
+    limiters = {id(call.args[1]['upload_limiter']) for call in calls.values()}
+    assert limiters == {id(scheduler.upload_limiter)}
+    assert scheduler.upload_limiter.rate == 1024 ** 2
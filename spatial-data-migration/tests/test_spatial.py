@@ -0,0 +1,82 @@
+# tests/test_spatial.py
+import numpy as np
+import geopandas as gpd
+import pytest
+from shapely.geometry import Point
+from spatial_migration.utils.spatial import hilbert_index, quadtree_tiles, spatial_sort_key, zorder_index
+
+def test_hilbert_index_is_continuous():
+    """Prueba que celdas consecutivas de la curva de Hilbert sean vecinas"""
+    x, y = np.meshgrid(np.arange(8), np.arange(8))
+    keys = hilbert_index(x.ravel(), y.ravel(), order=3)
+
+    assert sorted(keys.tolist()) == list(range(64))
+    path = np.argsort(keys)
+    steps = np.abs(np.diff(x.ravel()[path])) + np.abs(np.diff(y.ravel()[path]))
+    assert (steps == 1).all()
+
+def test_zorder_index():
+    """Prueba el intercalado de bits del código Z"""
+    assert zorder_index(np.array([0, 1, 0, 1, 3]), np.array([0, 0, 1, 1, 3])).tolist() == [0, 1, 2, 3, 15]
+
+def test_spatial_sort_key_nulls_last():
+    """Prueba que las geometrías nulas queden al final del ordenamiento"""
+    geometries = gpd.GeoSeries([Point(10, 10), None, Point(0, 0), Point(10, 0)])
+
+    keys = spatial_sort_key(geometries, 'hilbert')
+
+    # La curva parte de (0, 0), sube por el borde izquierdo y baja por el derecho
+    assert np.argsort(keys, kind='stable').tolist() == [2, 0, 3, 1]
+    with pytest.raises(ValueError):
+        spatial_sort_key(geometries, 'peano')
+
+def _owners(tiles, x, y):
+    """Cuenta los tiles semiabiertos que contienen cada punto"""
+    def inside(tile):
+        return (
+            (x >= (-np.inf if tile.xmin is None else tile.xmin))
+            & (x < (np.inf if tile.xmax is None else tile.xmax))
+            & (y >= (-np.inf if tile.ymin is None else tile.ymin))
+            & (y < (np.inf if tile.ymax is None else tile.ymax))
+        )
+    return sum(inside(tile).astype(int) for tile in tiles)
+
+def test_quadtree_tiles_cover_plane_exactly_once():
+    """Prueba que cada punto, de la muestra o no, pertenezca a un solo tile"""
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 100, 2000), rng.uniform(0, 100, 2000)
+
+    tiles = quadtree_tiles(x, y, max_tiles=16)
+
+    assert len(tiles) == 16
+    assert (_owners(tiles, x, y) == 1).all()
+    # Puntos fuera de la extensión de la muestra y justo sobre los bordes
+    others_x = np.concatenate([rng.uniform(-1000, 1000, 500), [50.0, 0.0, 100.0]])
+    others_y = np.concatenate([rng.uniform(-1000, 1000, 500), [50.0, 100.0, 0.0]])
+    assert (_owners(tiles, others_x, others_y) == 1).all()
+
+def test_quadtree_tiles_adapt_to_weight():
+    """Prueba que las zonas densas o pesadas queden en tiles pequeños"""
+    rng = np.random.default_rng(1)
+    x = np.concatenate([rng.normal(0, 0.1, 900), rng.uniform(-10, 10, 100)])
+    y = np.concatenate([rng.normal(0, 0.1, 900), rng.uniform(-10, 10, 100)])
+
+    tiles = quadtree_tiles(x, y, max_tiles=8)
+
+    assert sum(tile.weight for tile in tiles) == 1000
+    assert max(tile.weight for tile in tiles) <= 250
+    assert [tile.weight for tile in tiles] == sorted((tile.weight for tile in tiles), reverse=True)
+    assert (_owners(tiles, x, y) == 1).all()
+
+    # Un punto muy pesado queda casi solo en su tile
+    weights = np.ones(1000)
+    weights[0] = 1000
+    tiles = quadtree_tiles(x, y, weights, max_tiles=8)
+    assert 1000 <= tiles[0].weight < 1010
+    assert _owners(tiles[:1], x[:1], y[:1])[0] == 1
+
+def test_quadtree_tiles_without_points():
+    """Prueba que sin muestra se devuelva un único tile ilimitado"""
+    tiles = quadtree_tiles(np.array([]), np.array([]))
+
+    assert len(tiles) == 1 and tiles[0].xmin is None and tiles[0].xmax is None
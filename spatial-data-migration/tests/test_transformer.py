@@ -1,6 +1,11 @@
 # tests/test_transformer.py
+import json
 import pytest
-from spatial_migration.core.transformer import SpatialTransformer
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from shapely.geometry import LineString, Point
+from spatial_migration.core.transformer import SpatialTransformer, encode_geometry
 
 def test_transform_to_parquet(sample_geodataframe):
     """Prueba la transformación a formato Parquet"""
@@ -17,3 +22,106 @@ def test_transform_empty_dataframe():
     
     with pytest.raises(ValueError):
         transformer.transform_to_parquet(empty_gdf)
+
+def test_encode_geometry_nulls():
+    """Prueba la codificación vectorizada con geometrías nulas"""
+    geometries = gpd.GeoSeries([Point(0.123456789, 1), None])
+
+    assert list(encode_geometry(geometries, 'wkt')) == ['POINT (0.123456789 1)', None]
+    assert list(encode_geometry(geometries, 'wkb')) == [Point(0.123456789, 1).wkb, None]
+
+def test_transform_to_parquet_wkb(sample_geodataframe):
+    """Prueba que la geometría se escriba como binario WKB"""
+    transformer = SpatialTransformer()
+    result = transformer.transform_to_parquet(sample_geodataframe, geometry_encoding='wkb')
+
+    table = pq.read_table(result)
+    assert str(table.schema.field('geometry').type) == 'binary'
+    assert table.column('geometry')[1].as_py() == Point(1, 1).wkb
+
+def test_transform_to_geoparquet(sample_geodataframe):
+    """Prueba la escritura GeoParquet 1.1 con metadatos geo y cobertura bbox"""
+    transformer = SpatialTransformer()
+    gdf = sample_geodataframe.set_crs('EPSG:4326')
+    result = transformer.transform_to_geoparquet(gdf)
+
+    table = pq.read_table(result)
+    geo = json.loads(table.schema.metadata[b'geo'])
+    column = geo['columns']['geometry']
+    assert geo['version'] == '1.1.0'
+    assert column['encoding'] == 'WKB'
+    assert column['geometry_types'] == ['Point']
+    assert column['bbox'] == [0.0, 0.0, 2.0, 2.0]
+    assert column['covering']['bbox']['xmin'] == ['bbox', 'xmin']
+    assert table.column('bbox')[2].as_py() == {'xmin': 2.0, 'ymin': 2.0, 'xmax': 2.0, 'ymax': 2.0}
+
+    result.seek(0)
+    assert gpd.read_parquet(result).crs == 'EPSG:4326'
+
+def test_transform_chunks_to_parquet(sample_geodataframe):
+    """Prueba la escritura incremental de bloques como row groups"""
+    transformer = SpatialTransformer()
+    chunks = [
+        sample_geodataframe.iloc[:2],
+        sample_geodataframe.iloc[2:0],
+        sample_geodataframe.iloc[2:]
+    ]
+
+    result = transformer.transform_chunks_to_parquet(iter(chunks))
+
+    parquet_file = pq.ParquetFile(result)
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column('id').to_pylist() == [1, 2, 3]
+    assert table.column('geometry').to_pylist()[2] == 'POINT (2 2)'
+
+def test_transform_chunks_to_geoparquet_null_geometries(sample_geodataframe):
+    """Prueba que un bloque sin geometrías no fije un tipo nulo ni vacíe los metadatos geo"""
+    transformer = SpatialTransformer()
+    first = sample_geodataframe.iloc[:1].copy()
+    first['geometry'] = None
+    chunks = [first.set_crs('EPSG:4326'), sample_geodataframe.iloc[1:].set_crs('EPSG:4326')]
+
+    result = transformer.transform_chunks_to_parquet(chunks, output_format='geoparquet')
+
+    table = pq.read_table(result)
+    assert str(table.schema.field('geometry').type) == 'binary'
+    geo = json.loads(table.schema.metadata[b'geo'])['columns']['geometry']
+    # Los tipos y la extensión se acumulan bloque a bloque y se escriben al cerrar
+    assert geo['geometry_types'] == ['Point']
+    assert geo['bbox'] == [1.0, 1.0, 2.0, 2.0]
+    assert geo['crs'] is not None and 'covering' in geo
+    result.seek(0)
+    assert gpd.read_parquet(result).geometry.isna().tolist() == [True, False, False]
+
+def test_write_chunks_geoparquet_matches_single_file(sample_geodataframe):
+    """Prueba que el GeoParquet escrito por bloques tenga los mismos metadatos geo"""
+    transformer = SpatialTransformer()
+    gdf = sample_geodataframe.set_crs('EPSG:4326')
+    gdf.loc[2, 'geometry'] = LineString([(2, 2), (5, -1)])
+    sink = pa.BufferOutputStream()
+
+    transformer.write_chunks([gdf.iloc[:2], gdf.iloc[2:]], sink, output_format='geoparquet')
+
+    streamed = pq.read_schema(pa.BufferReader(sink.getvalue())).metadata[b'geo']
+    single = pq.read_schema(transformer.transform_to_geoparquet(gdf)).metadata[b'geo']
+    assert json.loads(streamed) == json.loads(single)
+    assert json.loads(streamed)['columns']['geometry']['bbox'] == [0.0, -1.0, 5.0, 2.0]
+
+def test_transform_to_geoparquet_spatial_sort():
+    """Prueba que el orden de Hilbert agrupe row groups por región"""
+    transformer = SpatialTransformer()
+    # Puntos alternando entre dos regiones alejadas, como en orden de id
+    points = [Point(i % 2 * 100 + i / 100, 0) for i in range(8)]
+    gdf = gpd.GeoDataFrame({'id': range(8), 'geometry': points}, crs='EPSG:4326')
+
+    result = transformer.transform_to_geoparquet(gdf, spatial_sort='hilbert', row_group_size=4)
+
+    metadata = pq.ParquetFile(result).metadata
+    xmin = [metadata.schema.column(i).path for i in range(metadata.num_columns)].index('bbox.xmin')
+    ranges = [
+        (metadata.row_group(i).column(xmin).statistics.min,
+         metadata.row_group(i).column(xmin).statistics.max)
+        for i in range(metadata.num_row_groups)
+    ]
+    assert ranges == [(0.0, 0.06), (100.01, 100.07)]
@@ -0,0 +1,121 @@
+# tests/test_type_mapping.py
+import json
+from datetime import date
+from decimal import Decimal
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from shapely.geometry import Point
+from spatial_migration.core.transformer import SpatialTransformer
+from spatial_migration.core.type_mapping import (
+    apply_column_types,
+    arrow_column_types,
+    arrow_type,
+    glue_type,
+    text_transfer_types
+)
+from spatial_migration.utils.db import table_schema_from_rows
+from .test_db import SCHEMA_ROWS
+
+def test_arrow_type_from_postgres():
+    """Prueba la correspondencia de tipos de PostgreSQL con Arrow"""
+    assert arrow_type('smallint') == pa.int16()
+    assert arrow_type('integer') == pa.int32()
+    assert arrow_type('numeric(12,2)') == pa.decimal128(12, 2)
+    assert arrow_type('date') == pa.date32()
+    assert arrow_type('timestamp with time zone') == pa.timestamp('us', tz='UTC')
+    assert arrow_type('character varying(80)') == pa.string()
+    assert arrow_type('int2[]') == pa.list_(pa.int16())
+    # Sin precisión o fuera del rango de Athena el tipo queda como lo infiere Arrow
+    assert arrow_type('numeric') is None
+    assert arrow_type('numeric(40,2)') is None
+    assert arrow_type('geometry') is None
+
+def test_arrow_column_types_skip_geometry():
+    """Prueba que las columnas geométricas no reciban un tipo fijo"""
+    column_types = arrow_column_types(table_schema_from_rows('shapes.comunas', SCHEMA_ROWS))
+
+    assert column_types == {
+        'id': pa.int32(),
+        'nombre': pa.string(),
+        'area': pa.decimal128(12, 2),
+        'codigos': pa.list_(pa.int16())
+    }
+
+def test_apply_column_types_from_float64():
+    """Prueba que un numeric leído como float64 no pierda dígitos al pasar a decimal"""
+    table = pa.table({'area': pa.array([2.675, 0.1 + 0.2, -1.005, 1234567.89, None])})
+
+    result = apply_column_types(table, {'area': pa.decimal128(12, 2)})
+
+    assert result.column('area').to_pylist() == [
+        Decimal('2.68'), Decimal('0.30'), Decimal('-1.01'), Decimal('1234567.89'), None
+    ]
+
+def test_text_transfer_types():
+    """Prueba que bigint y numeric con precisión se extraigan como texto"""
+    rows = SCHEMA_ROWS + [
+        {**SCHEMA_ROWS[0], 'column_name': 'codigo', 'data_type': 'bigint', 'udt_name': 'int8'},
+        {**SCHEMA_ROWS[2], 'column_name': 'valor', 'numeric_precision': None},
+    ]
+    table_schema = table_schema_from_rows('shapes.comunas', rows)
+
+    assert text_transfer_types(table_schema) == {
+        'area': pa.decimal128(12, 2),
+        'codigo': pa.int64()
+    }
+
+def test_glue_type():
+    """Prueba la conversión de tipos Arrow a Glue"""
+    assert glue_type(pa.decimal128(12, 2)) == 'decimal(12,2)'
+    assert glue_type(pa.dictionary(pa.int32(), pa.string())) == 'string'
+    assert glue_type(pa.list_(pa.int16())) == 'array<smallint>'
+    assert glue_type(pa.date32()) == 'date'
+    assert glue_type(pa.timestamp('us', tz='UTC')) == 'timestamp'
+
+def _typed_gdf(n):
+    return gpd.GeoDataFrame({
+        'estrato': [float(i % 6) if i % 7 else None for i in range(n)],
+        'area': [Decimal(f"{i}.25") for i in range(n)],
+        'fecha': [date(2024, 1, 1 + i % 28) for i in range(n)],
+        'comuna': [f"Comuna {i % 16}" for i in range(n)],
+        'nombre': [f"Barrio {i}" for i in range(n)],
+        'geometry': [Point(i, i) for i in range(n)]
+    }, geometry='geometry')
+
+COLUMN_TYPES = {'estrato': pa.int16(), 'area': pa.decimal128(12, 2), 'fecha': pa.date32()}
+
+def test_transform_to_parquet_with_column_types():
+    """Prueba que el Parquet use los tipos de PostgreSQL y diccionarios para texto repetido"""
+    transformer = SpatialTransformer()
+
+    result = transformer.transform_to_parquet(
+        _typed_gdf(2000), column_types=COLUMN_TYPES, dictionary_encoding=True
+    )
+
+    schema = pq.read_schema(result)
+    assert schema.field('estrato').type == pa.int16()
+    assert schema.field('area').type == pa.decimal128(12, 2)
+    assert schema.field('fecha').type == pa.date32()
+    assert pa.types.is_dictionary(schema.field('comuna').type)
+    assert not pa.types.is_dictionary(schema.field('nombre').type)
+    assert not pa.types.is_dictionary(schema.field('geometry').type)
+
+def test_write_chunks_keeps_first_chunk_schema():
+    """Prueba que los bloques siguientes se conviertan al esquema del primero"""
+    transformer = SpatialTransformer()
+    sink = pa.BufferOutputStream()
+
+    schema = transformer.write_chunks(
+        iter([_typed_gdf(2000), _typed_gdf(10)]),
+        sink,
+        output_format='geoparquet',
+        column_types=COLUMN_TYPES,
+        dictionary_encoding=True
+    )
+
+    table = pq.read_table(pa.BufferReader(sink.getvalue()))
+    assert table.num_rows == 2010
+    assert pa.types.is_dictionary(schema.field('comuna').type)
+    assert schema.field('estrato').type == pa.int16()
+    assert json.loads(table.schema.metadata[b'geo'])['primary_column'] == 'geometry'